@@ -3,6 +3,7 @@ from tech import drc, parameter
 import debug
 import design
 import math
+import numpy as np
 from math import log,sqrt,ceil
 import contact
 from pinv import pinv
@@ -1209,7 +1210,7 @@ class bank(design.design):
                      offset=in_pin + self.m2m3_via_offset,
                      rotate=90)
         
-    def analytical_delay(self, slew, load):
+    def analytical_delay(self, slew, load, bl_swing=0.1):
         """ return  analytical delay of the bank"""
         msf_addr_delay = self.msf_address.analytical_delay(slew, self.decoder.input_load())
 
@@ -1217,7 +1218,7 @@ class bank(design.design):
 
         word_driver_delay = self.wordline_driver.analytical_delay(decoder_delay.slew, self.bitcell_array.input_load())
 
-        bitcell_array_delay = self.bitcell_array.analytical_delay(word_driver_delay.slew)
+        bitcell_array_delay = self.bitcell_array.analytical_delay(word_driver_delay.slew, bl_swing=bl_swing)
 
         bl_t_data_out_delay = self.sense_amp_array.analytical_delay(bitcell_array_delay.slew,
                                                                     self.bitcell_array.output_load())
@@ -1228,3 +1229,49 @@ class bank(design.design):
         result = msf_addr_delay + decoder_delay + word_driver_delay \
                  + bitcell_array_delay + bl_t_data_out_delay + data_t_DATA_delay
         return result
+
+    def analytical_min_period(self, slew, load):
+        """ return the analytical minimum clock period of the bank. The
+        bitlines are precharged while the clock is high and read or
+        written while it is low, so the period is twice the longest of
+        these. A read waits for the bitline to swing half way (the sense
+        amp enable waits for a replica bitline) and a write drives the
+        bitline all the way. """
+        bl_wire = self.bitcell_array.gen_bl_wire()
+        bl_c = bl_wire.wire_c * bl_wire.lump_num
+
+        read_delay = self.analytical_delay(slew, load, bl_swing=0.5)
+
+        msf_addr_delay = self.msf_address.analytical_delay(slew, self.decoder.input_load())
+        decoder_delay = self.decoder.analytical_delay(msf_addr_delay.slew, self.wordline_driver.input_load())
+        word_driver_delay = self.wordline_driver.analytical_delay(decoder_delay.slew, self.bitcell_array.input_load())
+        msf_data_delay = self.msf_data_in.analytical_delay(slew)
+        write_driver_delay = self.write_driver_array.analytical_delay(msf_data_delay.slew, bl_c)
+        # the wordline and the bitline of a write must both be driven
+        write_delay = np.maximum((msf_addr_delay + decoder_delay + word_driver_delay).delay,
+                                 (msf_data_delay + write_driver_delay).delay)
+
+        precharge_delay = self.precharge_array.analytical_delay(slew, bl_c, swing=0.5)
+
+        return 2 * np.maximum(np.maximum(read_delay.delay, write_delay), precharge_delay.delay)
+
+    def analytical_switched_c(self, load):
+        """ return the capacitance (ff) that is charged in a read and in a
+        write cycle. Every cycle clocks the flops, switches half of the
+        address bits and the selected wordline. A read lets each column
+        swing half way, which the precharge restores, and drives half of
+        the data outputs. A write drives the bitline of each word bit all
+        the way. """
+        from tech import spice
+        bl_wire = self.bitcell_array.gen_bl_wire()
+        bl_c = bl_wire.wire_c * bl_wire.lump_num
+        wl_wire = self.bitcell_array.gen_wl_wire()
+        wl_c = wl_wire.wire_c * wl_wire.lump_num
+
+        cycle_c = (self.addr_size + self.word_size) * spice["FF_in_cap"] \
+                  + 0.5 * self.addr_size * self.decoder.input_load() \
+                  + self.wordline_driver.input_load() + wl_c
+        read_c = cycle_c + 0.5 * self.num_cols * bl_c + 0.5 * self.word_size * load
+        write_c = cycle_c + 0.5 * self.word_size * spice["FF_in_cap"] \
+                  + self.word_size * bl_c + 0.5 * (self.num_cols - self.word_size) * bl_c
+        return (read_c, write_c)
@@ -0,0 +1,73 @@
+#!/usr/bin/env python2.7
+"""
+Characterization Benchmark
+
+This times the characterization of the Liberty (.lib) file of several
+SRAM sizes. It uses the mock simulator by default so that it measures
+the overhead of the characterization flow (stimulus generation,
+scheduling and parsing) and runs without a simulator. Another backend
+may be given with --backend. The SRAM sizes are given as
+word_size x num_words arguments, for example:
+
+benchmark_lib.py -t freepdk45 -j 8 2x16 4x32 8x64
+"""
+
+import sys,os
+import datetime
+import globals
+from globals import OPTS
+
+# The defaults of the benchmark, which the command line may change
+OPTS.sim_backend = "mock"
+OPTS.use_sim_cache = False
+OPTS.check_lvsdrc = False
+OPTS.analytical_delay = False
+
+(options, args) = globals.parse_args()
+
+import debug
+
+default_sizes = ["2x16", "4x32", "8x64", "16x128"]
+
+sizes = []
+for arg in args or default_sizes:
+    try:
+        (word_size, num_words) = [int(x) for x in arg.lower().split("x")]
+    except ValueError:
+        debug.error("SRAM size {0} is not of the form word_sizexnum_words.".format(arg),-1)
+    sizes.append((word_size, num_words))
+
+# Use the unit test configuration of the technology
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)),"tests"))
+globals.init_openram("config_20_{0}".format(OPTS.tech_name))
+
+import sram
+import characterizer
+from characterizer import lib,mock_sim
+
+results = []
+for (word_size, num_words) in sizes:
+    name = "sram_{0}_{1}_1_{2}".format(word_size, num_words, OPTS.tech_name)
+    s = sram.sram(word_size=word_size,
+                  num_words=num_words,
+                  num_banks=1,
+                  name=name)
+    tempspice = OPTS.openram_temp + name + ".sp"
+    s.sp_write(tempspice)
+    # The mock simulator uses the analytical delay of the SRAM
+    mock_sim.register_model(s.name, mock_sim.analytical_model(s))
+
+    num_runs = mock_sim.num_runs
+    start_time = datetime.datetime.now()
+    lib.lib(libname=OPTS.openram_temp + name + ".lib", sram=s, spfile=tempspice, use_model=False)
+    lib_time = (datetime.datetime.now() - start_time).total_seconds()
+    results.append((name, lib_time, mock_sim.num_runs - num_runs))
+
+sys.stdout.write("Backend: {0}  Jobs: {1}\n".format(OPTS.sim_backend, OPTS.num_sim_jobs))
+sys.stdout.write("{0:<30} {1:>10} {2:>12}\n".format("SRAM", "Seconds", "Simulations"))
+for (name, lib_time, num_sims) in results:
+    if OPTS.sim_backend != "mock":
+        num_sims = "-"
+    sys.stdout.write("{0:<30} {1:>10.2f} {2:>12}\n".format(name, lib_time, num_sims))
+
+globals.end_openram()
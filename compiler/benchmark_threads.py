@@ -0,0 +1,81 @@
+#!/usr/bin/env python2.7
+"""
+Simulation Thread Benchmark
+
+This times the characterization of the Liberty (.lib) file of several
+SRAM sizes for each split of the CPU cores between simulations that run
+at once and threads of each simulator, to find the best split for small
+and large netlists. It needs a simulator (hspice, xa or an ngspice that
+is built with OpenMP), since the mock simulator has no threads. The SRAM
+sizes are given as word_size x num_words arguments and -r simulates the
+whole netlists instead of the trimmed ones, for example:
+
+benchmark_threads.py -t freepdk45 -s ngspice -r 2x16 16x128
+"""
+
+import sys,os
+import datetime
+import globals
+from globals import OPTS
+
+# The defaults of the benchmark, which the command line may change
+OPTS.sim_backend = "batch"
+OPTS.use_sim_cache = False
+OPTS.check_lvsdrc = False
+OPTS.analytical_delay = False
+
+(options, args) = globals.parse_args()
+
+import debug
+
+default_sizes = ["2x16", "16x128"]
+
+sizes = []
+for arg in args or default_sizes:
+    try:
+        (word_size, num_words) = [int(x) for x in arg.lower().split("x")]
+    except ValueError:
+        debug.error("SRAM size {0} is not of the form word_sizexnum_words.".format(arg),-1)
+    sizes.append((word_size, num_words))
+
+# Use the unit test configuration of the technology
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)),"tests"))
+globals.init_openram("config_20_{0}".format(OPTS.tech_name))
+
+import sram
+import characterizer
+from characterizer import lib,sim_pool
+
+# Every split uses all of the cores: 1, 2, 4, ... threads per simulation
+cpus = sim_pool.num_cpus()
+splits = []
+threads = 1
+while threads <= cpus:
+    splits.append((cpus // threads, threads))
+    threads *= 2
+
+results = []
+for (word_size, num_words) in sizes:
+    name = "sram_{0}_{1}_1_{2}".format(word_size, num_words, OPTS.tech_name)
+    s = sram.sram(word_size=word_size,
+                  num_words=num_words,
+                  num_banks=1,
+                  name=name)
+    tempspice = OPTS.openram_temp + name + ".sp"
+    s.sp_write(tempspice)
+
+    for (jobs, threads) in splits:
+        (OPTS.num_sim_jobs, OPTS.sim_threads) = (jobs, threads)
+        start_time = datetime.datetime.now()
+        lib.lib(libname=OPTS.openram_temp + name + ".lib", sram=s, spfile=tempspice, use_model=False)
+        lib_time = (datetime.datetime.now() - start_time).total_seconds()
+        results.append((name, jobs, threads, lib_time))
+
+sys.stdout.write("Simulator: {0}  CPUs: {1}  Trimmed: {2}\n".format(OPTS.spice_name, cpus, OPTS.trim_netlist))
+sys.stdout.write("{0:<30} {1:>6} {2:>8} {3:>10}\n".format("SRAM", "Jobs", "Threads", "Seconds"))
+for (name, jobs, threads, lib_time) in results:
+    best = min(r[3] for r in results if r[0] == name)
+    sys.stdout.write("{0:<30} {1:>6} {2:>8} {3:>10.2f}{4}\n".format(name, jobs, threads, lib_time,
+                                                                   " *" if lib_time == best else ""))
+
+globals.end_openram()
@@ -161,17 +161,14 @@ class bitcell_array(design.design):
             # increments to the next row height
             offset.y += self.cell.height
 
-    def analytical_delay(self, slew, load=0):
+    def analytical_delay(self, slew, load=0, bl_swing=0.1):
         from tech import drc
         wl_wire = self.gen_wl_wire()
-        wl_wire.return_delay_over_wire(slew)
-
         wl_to_cell_delay = wl_wire.return_delay_over_wire(slew)
         # hypothetical delay from cell to bl end without sense amp
         bl_wire = self.gen_bl_wire()
         cell_load = 2 * bl_wire.return_input_cap() # we ingore the wire r
                                                    # hence just use the whole c
-        bl_swing = 0.1
         cell_delay = self.cell.analytical_delay(wl_to_cell_delay.slew, cell_load, swing = bl_swing)
 
         #we do not consider the delay over the wire for now
@@ -10,7 +10,16 @@ debug.info(2,"Initializing characterizer...")
 
 OPTS.spice_exe = ""
 
-if not OPTS.analytical_delay:
+# The results are made up or recorded (or simulated by queue workers
+# on other hosts), so no simulator is needed
+no_simulator = (OPTS.sim_backend in ["mock", "replay"] or
+                (OPTS.sim_backend == "queue" and
+                 (OPTS.sim_queue_workers == 0 or OPTS.sim_queue_backend in ["mock", "replay"])))
+
+if not OPTS.analytical_delay and no_simulator:
+    if OPTS.spice_name == "":
+        OPTS.spice_name = "ngspice"
+elif not OPTS.analytical_delay:
     if OPTS.spice_name != "":
         OPTS.spice_exe=find_exe(OPTS.spice_name)
         if OPTS.spice_exe=="":
@@ -1,6 +1,8 @@
 import re
+import os
 import debug
 from globals import OPTS
+from utils import number_re,spice_number
 
         
 def relative_compare(value1,value2,error_tolerance=0.001):
@@ -8,28 +10,93 @@ def relative_compare(value1,value2,error_tolerance=0.001):
     return (abs(value1 - value2) / max(value1,value2) <= error_tolerance)
 
 
-def parse_output(filename, key):
-    """Parses a hspice output.lis file for a key value"""
+def get_output_file(filename, sim_dir=None):
+    """Returns the name of the spice output file in sim_dir (the temp dir
+    by default)."""
+    if sim_dir == None:
+        sim_dir = OPTS.openram_temp
     if OPTS.spice_name == "xa" :
         # customsim has a different output file name
-        full_filename="{0}xa.meas".format(OPTS.openram_temp)
+        return "{0}xa.meas".format(sim_dir)
     else:
         # ngspice/hspice using a .lis file
-        full_filename="{0}{1}.lis".format(OPTS.openram_temp, filename)
+        return "{0}{1}.lis".format(sim_dir, filename)
+
+
+# A measurement is the first "name = value" of a line in the output
+measurement_re = re.compile(r"^\s*(\w+)\s*=\s*(\S+)", re.MULTILINE)
+
+# The parsed output files by name with their size and modification time
+parsed_outputs = {}
+
+def parse_measurements(filename, sim_dir=None):
+    """Parses all of the measurements in a spice output file into a
+    dictionary of lower case names and value strings in one pass. Failed
+    measurements have the value "Failed". The nth repeat of a measurement
+    (from the nth .ALTER block) has the name "name@n". The result is reused
+    until the file changes."""
+    full_filename = get_output_file(filename, sim_dir)
+    try:
+        stat = os.stat(full_filename)
+    except OSError:
+        debug.error("Unable to open spice output file: {0}".format(full_filename),1)
+    file_key = (stat.st_ino, stat.st_size, stat.st_mtime)
+    if full_filename in parsed_outputs and parsed_outputs[full_filename][0] == file_key:
+        return dict(parsed_outputs[full_filename][1])
 
     try:
         f = open(full_filename, "r")
     except IOError:
         debug.error("Unable to open spice output file: {0}".format(full_filename),1)
     contents = f.read()
-    # val = re.search(r"{0}\s*=\s*(-?\d+.?\d*\S*)\s+.*".format(key), contents)
-    val = re.search(r"{0}\s*=\s*(-?\d+.?\d*[e]?[-+]?[0-9]*\S*)\s+.*".format(key), contents)
-    
-    if val != None:
-        debug.info(4, "Key = " + key + " Val = " + val.group(1))
-        return val.group(1)
-    else:
-        return "Failed"
+    f.close()
+
+    measurements = {}
+    repeats = {}
+    for (key, val) in measurement_re.findall(contents):
+        key = key.lower()
+        if number_re.match(val):
+            pass
+        elif val.lower().startswith("fail"):
+            val = "Failed"
+        else:
+            continue
+        if key in repeats:
+            repeats[key] += 1
+            measurements["{0}@{1}".format(key, repeats[key])] = val
+        else:
+            repeats[key] = 0
+            measurements[key] = val
+    debug.info(4, "Measurements: {0}".format(measurements))
+
+    parsed_outputs[full_filename] = (file_key, measurements)
+    return dict(measurements)
+
+
+def split_sweep(measurements, num_points):
+    """Splits the measurements of a stimulus with .ALTER blocks into a
+    dictionary for each of the num_points runs."""
+    sweep = [{} for i in range(num_points)]
+    for (key, val) in measurements.items():
+        (name, sep, repeat) = key.partition("@")
+        if repeat == "":
+            sweep[0][name] = val
+        elif int(repeat) < num_points:
+            sweep[int(repeat)][name] = val
+    return sweep
+
+
+def get_measurement(measurements, key):
+    """Returns the float value of a measurement or False if it failed."""
+    return convert_to_float(measurements.get(key.lower(), "Failed"))
+
+
+def parse_output(filename, key, sim_dir=None):
+    """Parses a hspice output.lis file for a key value. The file is in
+    sim_dir (the temp dir by default)."""
+    val = parse_measurements(filename, sim_dir).get(key.lower(), "Failed")
+    debug.info(4, "Key = " + key + " Val = " + val)
+    return val
     
 def round_time(time,time_precision=3):
     # times are in ns, so this is how many digits of precision
@@ -48,34 +115,10 @@ def round_voltage(voltage,voltag_precision=5):
     return round(voltage,voltage_precision)
 
 def convert_to_float(number):
-    """Converts a string into a (float) number; also converts units(m,u,n,p)"""
+    """Converts a string into a (float) number; also converts scientific
+    notation and the spice scale factors (meg,t,g,k,m,u,n,p,f,a). Any
+    letters after the scale factor (e.g. a unit) are ignored. A failed
+    measurement is False."""
     if number == "Failed":
         return False
-    
-    # start out with a binary value
-    float_value = False
-    try:  
-        # checks if string is a float without letter units
-        float_value = float(number)
-    except ValueError:
-        # see if it is in scientific notation
-        unit = re.search(r"(-?\d+\.?\d*)e(\-?\+?\d+)", number)
-        if unit != None:
-            float_value=float(unit.group(1)) * (10 ^ float(unit.group(2)))
-            
-        # see if it is in spice notation
-        unit = re.search(r"(-?\d+\.?\d*)(m?u?n?p?f?)", number)
-        if unit != None:
-            float_value = {
-                'm': lambda x: x * 0.001,  # milli
-                'u': lambda x: x * 0.000001,  # micro
-                'n': lambda x: x * 0.000000001,  # nano
-                'p': lambda x: x * 0.000000000001,  # pico
-                'f': lambda x: x * 0.000000000000001  # femto
-                }[unit.group(2)](float(unit.group(1)))
-
-    # if we weren't able to convert it to a float then error out
-    if not type(float_value)==float:
-        debug.error("Invalid number: {0}".format(number),1)
-
-    return float_value
+    return spice_number(number)
@@ -0,0 +1,91 @@
+"""
+This journals the progress of a characterization to a checkpoint file so
+that a run that died can be resumed (with --resume). The delay and
+setup/hold analyses append each finished table point and the bounds of
+each search step. A resumed run skips the finished points and continues
+the searches from their last bounds.
+
+Each line of the journal is a JSON [analysis, item, value]. The analysis
+is a hash of everything its results depend on (the netlist and spice
+models, the corner, the probe, the slews and loads and how the
+simulations run), so an analysis that changed doesn't reuse old entries.
+The last line may be cut short if the run died while writing it. It is
+ignored and cut off before the resumed run appends to the journal.
+"""
+
+import os
+import json
+import hashlib
+import threading
+import debug
+from globals import OPTS
+
+
+class checkpoint():
+    """
+    The journal of the finished items of each analysis.
+    """
+
+    def __init__(self, filename, resume):
+        self.filename = filename
+        self.lock = threading.Lock()
+        self.entries = {}
+        if resume and os.path.isfile(filename):
+            f = open(filename, "r+")
+            # The end of the last complete line
+            end = 0
+            for line in iter(f.readline, ""):
+                if not line.endswith("\n"):
+                    break
+                end += len(line)
+                try:
+                    (analysis, item, value) = json.loads(line)
+                except ValueError:
+                    continue
+                self.entries[(analysis, item)] = value
+            f.truncate(end)
+            f.close()
+            debug.info(1, "Resuming {0} finished items from {1}".format(len(self.entries), filename))
+            self.journal = open(filename, "a")
+        else:
+            self.journal = open(filename, "w")
+
+    def key(self, files, params):
+        """ Returns the key of an analysis from the contents of its files
+        and the repr of its parameters. """
+        digest = hashlib.sha1()
+        for filename in files:
+            f = open(filename, "rb")
+            for block in iter(lambda: f.read(1 << 20), b""):
+                digest.update(block)
+            f.close()
+        digest.update(repr(params))
+        return digest.hexdigest()
+
+    def get(self, analysis, item):
+        """ Returns the journaled value of an item of an analysis or None. """
+        with self.lock:
+            return self.entries.get((analysis, item))
+
+    def put(self, analysis, item, value):
+        """ Journals the value of an item of an analysis. """
+        line = json.dumps([analysis, item, value])
+        with self.lock:
+            self.entries[(analysis, item)] = value
+            self.journal.write(line + "\n")
+            self.journal.flush()
+
+
+journal = None
+journal_lock = threading.Lock()
+
+def get_checkpoint():
+    """ Returns the checkpoint of the run or None if there is no
+    checkpoint file. The journal is started over unless the run resumes. """
+    global journal
+    if OPTS.checkpoint_file == "":
+        return None
+    with journal_lock:
+        if journal == None or journal.filename != OPTS.checkpoint_file:
+            journal = checkpoint(OPTS.checkpoint_file, OPTS.resume)
+        return journal
@@ -0,0 +1,58 @@
+"""
+An operating corner (process, supply voltage and temperature) of the
+characterization. The corners of a run come from the corners option,
+which is a list of (process, voltage, temperature) tuples such as
+[("SS", 0.9, 125), ("TT", 1.0, 25), ("FF", 1.1, -40)]. Without it, there
+is only the nominal corner of the technology.
+"""
+
+import tech
+import debug
+from globals import OPTS
+
+
+class corner():
+    """
+    The spice models, supply voltage and temperature of a corner and the
+    directory of its simulations.
+    """
+
+    def __init__(self, process="TT", voltage=None, temperature=None, name=None):
+        self.process = process.upper()
+        if voltage == None:
+            voltage = tech.spice["supply_voltage"]
+        if temperature == None:
+            temperature = tech.spice["temp"]
+        self.voltage = voltage
+        self.temperature = temperature
+
+        process_models = tech.spice.get("process_models", {"TT": tech.spice["fet_models"]})
+        if self.process not in process_models:
+            debug.error("No spice models of process corner {0} in the technology.".format(self.process),-1)
+        self.models = process_models[self.process]
+
+        if name == None:
+            name = "{0}_{1}V_{2}C".format(self.process, voltage, temperature)
+            name = name.replace(".", "p").replace("-", "m")
+        self.name = name
+        # The simulations of the corner are in the temp dir unless the
+        # corners run at once
+        self.sim_dir = OPTS.openram_temp
+
+    def __str__(self):
+        return self.name
+
+
+def nominal_corner():
+    """ Returns the nominal corner of the technology. """
+    return corner(name="TT")
+
+
+def get_corners():
+    """ Returns the corners of the corners option. """
+    if len(OPTS.corners) == 0:
+        return [nominal_corner()]
+    corners = [corner(*c) for c in OPTS.corners]
+    names = [c.name for c in corners]
+    debug.check(len(set(names)) == len(names), "The corners aren't unique: {0}".format(names))
+    return corners
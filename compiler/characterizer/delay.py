@@ -3,26 +3,42 @@ import re
 import debug
 import tech
 import math
+import hashlib
+import numpy as np
 import stimuli
+import telemetry
 import charutils as ch
 import utils
+import sim_cache
+import checkpoint
+from sim_pool import sim_pool,get_sim_dir,search_points,num_jobs
+from lut_sampler import lut_sampler
+from corner import nominal_corner
 from globals import OPTS
 
 class delay():
     """
     Functions to measure the delay of an SRAM at a given address and
-    data bit.
+    data bit at a corner (the nominal corner by default).
     """
 
-    def __init__(self,sram,spfile):
+    def __init__(self,sram,spfile,corner=None):
+        self.sram = sram
         self.name = sram.name
         self.num_words = sram.num_words
         self.word_size = sram.word_size
         self.addr_size = sram.addr_size
         self.sram_sp_file = spfile
 
-        self.vdd = tech.spice["supply_voltage"]
+        if corner == None:
+            corner = nominal_corner()
+        self.corner = corner
+        self.vdd = corner.voltage
         self.gnd = tech.spice["gnd_voltage"]
+        # The directory of the simulations (each probe of a corner has its own)
+        self.sim_dir = corner.sim_dir
+        # The journal of the finished steps of analyze (see checkpoint)
+        self.checkpoint = None
 
         
     def check_arguments(self):
@@ -39,29 +55,44 @@ class delay():
             debug.error("Given probe_data is not an integer to specify a data bit",1)
 
 
-    def write_stimulus(self, period, load, slew):
+    def write_stimulus(self, period, load, slew, sim_dir=None, sweep=[], measure_power=True, purpose="delay"):
         """ Creates a stimulus file for simulations to probe a bitcell at a given clock period.
         Address and bit were previously set with set_probe().
         Input slew (in ns) and output capacitive load (in fF) are required for charaterization.
+        The stimulus is written to sim_dir (the delay's own dir by default). Each
+        (slew, load) pair in sweep is simulated again in an .ALTER block of
+        the same stimulus. Without measure_power, only the delays and slews
+        are measured. The purpose is recorded in the telemetry.
         """
         self.check_arguments()
 
+        # With a windowed transient, the cycles of the power measurements
+        # are only simulated if they are measured
+        self.measure_power = measure_power or not OPTS.windowed_transient
+
         # obtains list of time-points for each rising clk edge
         self.obtain_cycle_times(period)
 
         # creates and opens stimulus file for writing
-        temp_stim = "{0}/stim.sp".format(OPTS.openram_temp)
+        if sim_dir == None:
+            sim_dir = self.sim_dir
+        temp_stim = "{0}stim.sp".format(sim_dir)
+        telemetry.describe(sim_dir, purpose, self.corner.name,
+                           period=period, load=load, slew=slew,
+                           address=self.probe_address, data_bit=self.probe_data,
+                           points=1 + len(sweep))
         self.sf = open(temp_stim, "w")
         self.sf.write("* Stimulus for period of {0}n load={1}fF slew={2}ns\n\n".format(period,load,slew))
 
         # include files in stimulus file
-        model_list = tech.spice["fet_models"] + [self.sram_sp_file]
+        model_list = self.corner.models + [self.sram_sp_file]
         stimuli.write_include(stim_file=self.sf, models=model_list)
+        stimuli.write_temp(self.sf, self.corner.temperature)
 
         # add vdd/gnd statements
 
         self.sf.write("\n* Global Power Supplies\n")
-        stimuli.write_supply(self.sf)
+        stimuli.write_supply(self.sf, self.vdd)
 
         # instantiate the sram
         self.sf.write("\n* Instantiation of the SRAM\n")
@@ -70,14 +101,42 @@ class delay():
                           dbits=self.word_size, 
                           sram_name=self.name)
 
-        self.sf.write("\n* SRAM output loads\n")
-        for i in range(self.word_size):
-            self.sf.write("CD{0} d[{0}] 0 {1}f\n".format(i,load))
+        self.write_loads(load)
         
         # add access transistors for data-bus
         self.sf.write("\n* Transmission Gates for data-bus and control signals\n")
         stimuli.inst_accesstx(stim_file=self.sf, dbits=self.word_size)
 
+        self.write_sources(period, slew)
+                          
+        self.write_measures(period)
+
+        if OPTS.windowed_transient:
+            # run until the end of the last measurement window
+            windows = self.measure_windows(period)
+            stimuli.write_control(self.sf, max(end for (start, end) in windows), end=False, windows=windows)
+        else:
+            # run until the end of the cycle time
+            stimuli.write_control(self.sf,self.cycle_times[-1] + period, end=False)
+
+        # The loads and sources replace the ones of the same name in each alter
+        for (alter_slew, alter_load) in sweep:
+            stimuli.write_alter(self.sf, "load={0}fF slew={1}ns".format(alter_load, alter_slew))
+            self.write_loads(alter_load)
+            self.write_sources(period, alter_slew)
+
+        stimuli.write_end(self.sf)
+
+        self.sf.close()
+
+    def write_loads(self, load):
+        """ Writes the output load capacitances (in fF) """
+        self.sf.write("\n* SRAM output loads\n")
+        for i in range(self.word_size):
+            self.sf.write("CD{0} d[{0}] 0 {1}f\n".format(i,load))
+
+    def write_sources(self, period, slew):
+        """ Writes the data, address, control and clock sources with the given input slew (in ns) """
         # generate data and addr signals
         self.sf.write("\n* Generation of data and address signals\n")
         for i in range(self.word_size):
@@ -111,13 +170,6 @@ class delay():
                           period=period,
                           t_rise=slew,
                           t_fall=slew)
-                          
-        self.write_measures(period)
-
-        # run until the end of the cycle time
-        stimuli.write_control(self.sf,self.cycle_times[-1] + period)
-
-        self.sf.close()
 
     def write_measures(self,period):
         """
@@ -181,6 +233,9 @@ class delay():
                                trig_td=self.cycle_times[self.read1_cycle],
                                targ_td=self.cycle_times[self.read1_cycle]+0.5*period)
         
+        if not self.measure_power:
+            return
+
         # add measure statements for power
         t_initial = self.cycle_times[self.write0_cycle]
         t_final = self.cycle_times[self.write0_cycle+1]
@@ -210,6 +265,25 @@ class delay():
                                t_initial=t_initial,
                                t_final=t_final)
         
+    def measure_windows(self, period):
+        """
+        Returns the (start, end) time of each measurement window in ns.
+        A read is measured from its negative clock edge. Its output may
+        take up to a period to cross half way and its slew may be up to
+        a period (see check_simulation), so the window runs to the end of
+        the idle cycle after the read, where the unwindowed simulation of
+        the last read ends too.
+        """
+        windows = []
+        for cycle in [self.read0_cycle, self.read1_cycle]:
+            windows.append((self.cycle_times[cycle] + 0.5*period,
+                            self.cycle_times[cycle] + 2*period))
+        if self.measure_power:
+            for cycle in [self.write0_cycle, self.write1_cycle, self.read0_cycle, self.read1_cycle]:
+                windows.append((self.cycle_times[cycle], self.cycle_times[cycle+1]))
+        return windows
+
+
     def find_feasible_period(self, load, slew):
         """
         Uses an initial period and finds a feasible period before we
@@ -219,7 +293,7 @@ class delay():
         starting point. 
         """
 
-        feasible_period = tech.spice["feasible_period"]
+        feasible_period = self.initial_period(load, slew)
         time_out = 8
         while True:
             debug.info(1, "Trying feasible period: {0}ns".format(feasible_period))
@@ -241,6 +315,104 @@ class delay():
             return (feasible_period, feasible_delay1, feasible_delay0)
 
 
+    def initial_period(self, load, slew):
+        """
+        Returns the period that the feasible period search starts at: the
+        feasible period of an earlier run of the same netlist or the
+        analytical delay times a safety factor, but not less than the
+        technology's estimate. A period that is feasible but too short
+        would degrade the delays that the min period search and the delay
+        table are measured against.
+        """
+        period = tech.spice["feasible_period"]
+        if not OPTS.period_warm_start:
+            return period
+
+        record = self.load_periods(load, slew)
+        if record != None and record.get("netlist") == self.netlist_digest():
+            debug.info(1, "Starting at the feasible period of an earlier run: {0}ns".format(record["feasible_period"]))
+            return record["feasible_period"]
+
+        # The analytical delay is in ps
+        analytical_delay = self.sram.analytical_delay(slew, load)
+        estimate = OPTS.period_safety_factor * float(max(analytical_delay.delay, analytical_delay.slew)) / 1e3
+        if estimate > period:
+            period = ch.round_time(estimate)
+        debug.info(1, "Analytical delay {0}ps, starting at {1}ns".format(analytical_delay.delay, period))
+        return period
+
+
+    def min_period_guess(self, load, slew):
+        """
+        Returns the period that the min period search tries first: the
+        min period of an earlier run of the configuration, the analytical
+        min period or None without the warm start.
+        """
+        if not OPTS.period_warm_start:
+            return None
+
+        record = self.load_periods(load, slew)
+        if record != None:
+            return record["min_period"]
+
+        # The analytical min period is in ps
+        period = ch.round_time(float(self.sram.analytical_min_period(slew, load)) / 1e3)
+        debug.info(1, "Analytical min period: {0}ns".format(period))
+        return period
+
+
+    def periods_key(self, load, slew):
+        """ Returns the key of the recorded periods of the configuration:
+        the SRAM size, the corner, the probe, the load and slew and the
+        simulator. The netlist isn't in the key since the min period of a
+        changed design is still a good start. Its feasible period is only
+        used for the same netlist (see netlist_digest) since the delays
+        and power are measured at it. """
+        digest = hashlib.sha1()
+        digest.update(repr([self.word_size,
+                            self.num_words,
+                            self.sram.num_banks,
+                            self.corner.models,
+                            self.vdd,
+                            self.corner.temperature,
+                            self.probe_address,
+                            self.probe_data,
+                            load,
+                            slew,
+                            OPTS.spice_name,
+                            OPTS.sim_backend]))
+        return digest.hexdigest()
+
+
+    def load_periods(self, load, slew):
+        """ Returns the feasible and minimum period of an earlier run of
+        the configuration or None. """
+        store = sim_cache.get_store("periods")
+        if not store or not OPTS.period_warm_start:
+            return None
+        return store.load(self.periods_key(load, slew))
+
+
+    def netlist_digest(self):
+        """ Returns the digest of the simulated netlist or None if the
+        periods aren't recorded. """
+        store = sim_cache.get_store("periods")
+        if not store:
+            return None
+        return store.file_digest(self.sram_sp_file)
+
+
+    def save_periods(self, load, slew, feasible_period, min_period):
+        """ Records the feasible and minimum period of the configuration
+        and the netlist so that later runs start near them. """
+        store = sim_cache.get_store("periods")
+        if store:
+            store.put(self.periods_key(load, slew),
+                      {"feasible_period": feasible_period,
+                       "min_period": min_period,
+                       "netlist": self.netlist_digest()})
+
+
     def run_simulation(self, period, load, slew):
         """ 
         This tries to simulate a period and checks if the result
@@ -248,12 +420,21 @@ class delay():
         """
 
         # Checking from not data_value to data_value
-        self.write_stimulus(period, load, slew)
-        stimuli.run_sim()
-        delay0 = ch.convert_to_float(ch.parse_output("timing", "delay0"))
-        delay1 = ch.convert_to_float(ch.parse_output("timing", "delay1"))        
-        slew0 = ch.convert_to_float(ch.parse_output("timing", "slew0"))
-        slew1 = ch.convert_to_float(ch.parse_output("timing", "slew1"))        
+        self.write_stimulus(period, load, slew, purpose="feasible_period")
+        # The power is also measured, so keep the results
+        self.measurements = stimuli.run_sim(self.sim_dir)
+        return self.check_simulation(period, load, slew, self.measurements)
+
+
+    def check_simulation(self, period, load, slew, measurements):
+        """ 
+        This checks the measurements of a simulation. If it works, it
+        returns True and the delays and slews.
+        """
+        delay0 = ch.get_measurement(measurements, "delay0")
+        delay1 = ch.get_measurement(measurements, "delay1")
+        slew0 = ch.get_measurement(measurements, "slew0")
+        slew1 = ch.get_measurement(measurements, "slew1")
         
         # if it failed or the read was longer than a period
         if type(delay0)!=float or type(delay1)!=float or type(slew1)!=float or type(slew0)!=float:
@@ -295,37 +476,76 @@ class delay():
 
 
 
-    def find_min_period(self,feasible_period, load, slew, feasible_delay1, feasible_delay0):
+    def find_min_period(self,feasible_period, load, slew, feasible_delay1, feasible_delay0, guess=None):
         """
         Searches for the smallest period with output delays being within 5% of 
-        long period. 
+        long period. Each step simulates k evenly spaced periods at once and
+        narrows the interval by a factor of k+1 (k=1 is a binary search).
+        The search starts between the feasible delay (a read can't be
+        shorter) and the feasible period. A guess (e.g. the min period of
+        an earlier run) is tried first along with the period just below it.
         """
 
         previous_period = ub_period = feasible_period
-        lb_period = 0.0
-
-        # Binary search algorithm to find the min period (max frequency) of design
+        # The delays must be within 5% of the feasible delays and shorter
+        # than the period
+        lb_period = 0.95 * max(feasible_delay1, feasible_delay0)
+        k = search_points()
+
+        # A resumed search continues from its last bounds
+        bounds = self.journaled("min_period_bounds")
+        if bounds != None:
+            (lb_period, ub_period) = bounds
+            guess = None
+
+        # K-ary search algorithm to find the min period (max frequency) of design
         time_out = 25
         while True:
             time_out -= 1
             if (time_out <= 0):
                 debug.error("Timed out, could not converge on minimum period.",2)
 
-            target_period = 0.5 * (ub_period + lb_period)
-            debug.info(1, "MinPeriod Search: {0}ns (ub: {1} lb: {2})".format(target_period,
+            if guess != None and lb_period < guess < ub_period:
+                target_periods = [guess / 1.05, guess]
+                guess = None
+            else:
+                target_periods = [lb_period + (ub_period - lb_period) * (i+1) / (k+1) for i in range(k)]
+            debug.info(1, "MinPeriod Search: {0}ns (ub: {1} lb: {2})".format(", ".join(str(p) for p in target_periods),
                                                                              ub_period,
                                                                              lb_period))
 
-            if self.try_period(target_period, load, slew, feasible_delay1, feasible_delay0):
-                ub_period = target_period
-            else:
+            results = self.try_periods(target_periods, load, slew, feasible_delay1, feasible_delay0)
+            # The new upper bound is the smallest period that works and the
+            # lower bound is the period just below it.
+            for (target_period, success) in zip(target_periods, results):
+                if success:
+                    ub_period = target_period
+                    break
                 lb_period = target_period
+            self.journal("min_period_bounds", [lb_period, ub_period])
 
             if ch.relative_compare(ub_period, lb_period, error_tolerance=0.05):
                 # ub_period is always feasible
                 return ub_period
 
 
+    def try_periods(self, periods, load, slew, feasible_delay1, feasible_delay0):
+        """ 
+        This simulates several periods at once and returns whether each
+        of them works (see try_period).
+        """
+        if len(periods) == 1:
+            return [self.try_period(periods[0], load, slew, feasible_delay1, feasible_delay0)]
+
+        sim_dirs = []
+        for (i,period) in enumerate(periods):
+            sim_dir = get_sim_dir("min_period_point{0}".format(i), self.sim_dir)
+            self.write_stimulus(period, load, slew, sim_dir, measure_power=False, purpose="min_period")
+            sim_dirs.append(sim_dir)
+        results = sim_pool().run(sim_dirs)
+        return [self.check_period(period, feasible_delay1, feasible_delay0, measurements) for (period, measurements) in zip(periods, results)]
+
+
     def try_period(self, period, load, slew, feasible_delay1, feasible_delay0):
         """ 
         This tries to simulate a period and checks if the result
@@ -333,12 +553,20 @@ class delay():
         """
 
         # Checking from not data_value to data_value
-        self.write_stimulus(period,load,slew)
-        stimuli.run_sim()
-        delay0 = ch.convert_to_float(ch.parse_output("timing", "delay0"))
-        delay1 = ch.convert_to_float(ch.parse_output("timing", "delay1"))
-        slew0 = ch.convert_to_float(ch.parse_output("timing", "slew0"))
-        slew1 = ch.convert_to_float(ch.parse_output("timing", "slew1"))
+        self.write_stimulus(period,load,slew,measure_power=False,purpose="min_period")
+        measurements = stimuli.run_sim(self.sim_dir)
+        return self.check_period(period, feasible_delay1, feasible_delay0, measurements)
+
+
+    def check_period(self, period, feasible_delay1, feasible_delay0, measurements):
+        """ 
+        This checks the measurements of a period simulation. If it works
+        and the delay is within 5% still, it returns True.
+        """
+        delay0 = ch.get_measurement(measurements, "delay0")
+        delay1 = ch.get_measurement(measurements, "delay1")
+        slew0 = ch.get_measurement(measurements, "slew0")
+        slew1 = ch.get_measurement(measurements, "slew1")
         # if it failed or the read was longer than a period
         if type(delay0)!=float or type(delay1)!=float or type(slew1)!=float or type(slew0)!=float:
             debug.info(2,"Invalid measures: Period {0}, delay0={1}ns, delay1={2}ns slew0={3}ns slew1={4}ns".format(period,
@@ -392,6 +620,11 @@ class delay():
         
         self.set_probe(probe_address, probe_data)
 
+        # The steps that an earlier run finished are skipped
+        self.checkpoint = checkpoint.get_checkpoint()
+        if self.checkpoint:
+            self.analysis = self.analysis_key(slews, loads)
+
         # This is for debugging a full simulation
         # debug.info(0,"Debug simulation running...")
         # target_period=50.0
@@ -403,33 +636,45 @@ class delay():
         # sys.exit(1)
 
         
-        (feasible_period, feasible_delay1, feasible_delay0) = self.find_feasible_period(max(loads), max(slews))
+        feasible = self.journaled("feasible_period")
+        if feasible != None:
+            (feasible_period, feasible_delay1, feasible_delay0, self.measurements) = feasible
+        else:
+            (feasible_period, feasible_delay1, feasible_delay0) = self.find_feasible_period(max(loads), max(slews))
+            self.journal("feasible_period", [feasible_period, feasible_delay1, feasible_delay0, self.measurements])
         debug.check(feasible_delay1>0,"Negative delay may not be possible")
         debug.check(feasible_delay0>0,"Negative delay may not be possible")
 
         # The power variables are just scalars. These use the final feasible period simulation
         # which should have worked.
-        read0_power=ch.convert_to_float(ch.parse_output("timing", "read0_power"))
-        write0_power=ch.convert_to_float(ch.parse_output("timing", "write0_power"))
-        read1_power=ch.convert_to_float(ch.parse_output("timing", "read1_power"))
-        write1_power=ch.convert_to_float(ch.parse_output("timing", "write1_power"))
+        read0_power=ch.get_measurement(self.measurements, "read0_power")
+        write0_power=ch.get_measurement(self.measurements, "write0_power")
+        read1_power=ch.get_measurement(self.measurements, "read1_power")
+        write1_power=ch.get_measurement(self.measurements, "write1_power")
         
         LH_delay = []
         HL_delay = []
         LH_slew = []
         HL_slew = []
-        for slew in slews:
-            for load in loads:
-                (success, delay1, slew1, delay0, slew0) = self.run_simulation(feasible_period, load, slew)
-                debug.check(success,"Couldn't run a simulation. slew={0} load={1}\n".format(slew,load))
-                LH_delay.append(delay1)
-                HL_delay.append(delay0)
-                LH_slew.append(slew1)
-                HL_slew.append(slew0)
+        simulate = lambda points: self.simulate_table_points(feasible_period, points)
+        if OPTS.adaptive_lut:
+            results = lut_sampler(slews, loads, simulate).sample()
+        else:
+            results = simulate([(slew, load) for slew in slews for load in loads])
+        for (delay1, slew1, delay0, slew0) in results:
+            LH_delay.append(delay1)
+            HL_delay.append(delay0)
+            LH_slew.append(slew1)
+            HL_slew.append(slew0)
                 
         # finds the minimum period without degrading the delays by X%
-        min_period = self.find_min_period(feasible_period, max(loads), max(slews), feasible_delay1, feasible_delay0)
+        min_period = self.journaled("min_period")
+        if min_period == None:
+            guess = self.min_period_guess(max(loads), max(slews))
+            min_period = self.find_min_period(feasible_period, max(loads), max(slews), feasible_delay1, feasible_delay0, guess)
+            self.journal("min_period", min_period)
         debug.check(type(min_period)==float,"Couldn't find minimum period.")
+        self.save_periods(max(loads), max(slews), feasible_period, min_period)
         debug.info(1, "Min Period: {0}n with a delay of {1} / {2}".format(min_period, feasible_delay1, feasible_delay0))
 
 
@@ -446,11 +691,95 @@ class delay():
         return data
 
 
+    def simulate_table_points(self, period, points):
+        """ Simulates each (slew, load) point of the delay table and
+        returns its (delay1, slew1, delay0, slew0). The points that are
+        journaled aren't simulated again. """
+        results = {}
+        for (slew, load) in points:
+            result = self.journaled("point {0!r} {1!r}".format(slew, load))
+            if result != None:
+                results[(slew, load)] = tuple(result)
+        todo = [point for point in points if point not in results]
+        if len(todo) > 0:
+            for ((slew, load), measurements) in zip(todo, self.simulate_sweep(period, todo)):
+                (success, delay1, slew1, delay0, slew0) = self.check_simulation(period, load, slew, measurements)
+                debug.check(success,"Couldn't run a simulation. slew={0} load={1}\n".format(slew,load))
+                results[(slew, load)] = (delay1, slew1, delay0, slew0)
+                self.journal("point {0!r} {1!r}".format(slew, load), results[(slew, load)])
+        return [results[point] for point in points]
+
+
+    def analysis_key(self, slews, loads):
+        """ Returns the key of the analysis in the checkpoint: the netlist,
+        the spice models, the corner, the probe, the table and how the
+        simulations run. """
+        return self.checkpoint.key(self.corner.models + [self.sram_sp_file],
+                                   [self.vdd,
+                                    self.corner.temperature,
+                                    self.probe_address,
+                                    self.probe_data,
+                                    [float(slew) for slew in slews],
+                                    [float(load) for load in loads],
+                                    OPTS.spice_name,
+                                    OPTS.sim_backend,
+                                    OPTS.windowed_transient,
+                                    OPTS.adaptive_lut and OPTS.lut_tolerance])
+
+
+    def journaled(self, item):
+        """ Returns the value of an item of the analysis in the checkpoint
+        or None. """
+        if not self.checkpoint:
+            return None
+        return self.checkpoint.get(self.analysis, item)
+
+
+    def journal(self, item, value):
+        """ Records an item of the analysis in the checkpoint. """
+        if self.checkpoint:
+            self.checkpoint.put(self.analysis, item, value)
+
+
+    def simulate_sweep(self, period, points):
+        """ Simulates each (slew, load) point at a period and returns the
+        measurements of each point. If the simulator supports .ALTER, the
+        points are split into one stimulus per simulation slot so that the
+        simulator starts once per batch. Otherwise, each point has its own
+        stimulus. Either way, the stimuli run at once.
+        """
+        if stimuli.supports_alter():
+            num_batches = min(num_jobs(), len(points))
+            batches = [range(i, len(points), num_batches) for i in range(num_batches)]
+        else:
+            batches = [[i] for i in range(len(points))]
+
+        sim_dirs = []
+        for (i,batch) in enumerate(batches):
+            sim_dir = get_sim_dir("delay_sweep{0}".format(i), self.sim_dir)
+            (slew, load) = points[batch[0]]
+            self.write_stimulus(period, load, slew, sim_dir, sweep=[points[j] for j in batch[1:]],
+                                measure_power=False, purpose="delay_table")
+            sim_dirs.append(sim_dir)
+        results = sim_pool().run(sim_dirs)
+
+        measurements = [None] * len(points)
+        for (batch, result) in zip(batches, results):
+            for (j, point_measurements) in zip(batch, ch.split_sweep(result, len(batch))):
+                measurements[j] = point_measurements
+        return measurements
+
+
     def obtain_cycle_times(self, period):
         """Returns a list of key time-points [ns] of the waveform (each rising edge)
         of the cycles to do a timing evaluation. The last time is the end of the simulation
-        and does not need a rising edge."""
+        and does not need a rising edge. The cycle that initializes the
+        cell for the write power is skipped if the power isn't measured."""
 
+        # The cycles of the waveforms below that are simulated
+        self.cycles = range(10)
+        if not self.measure_power:
+            self.cycles.remove(1)
         self.cycle_comments = []
         self.cycle_times = []
         t_current = 0
@@ -463,13 +792,14 @@ class delay():
         self.cycle_times.append(t_current)
         t_current += period
 
-        # One period
-        msg = "W data 1 address 11..11 to initialize cell"
-        self.cycle_times.append(t_current)
-        self.cycle_comments.append("Cycle{0}\t{1}ns:\t{2}".format(len(self.cycle_times)-1,
-                                                                t_current,
-                                                                msg))
-        t_current += period
+        # One period (only needed for a transition in the write power)
+        if self.measure_power:
+            msg = "W data 1 address 11..11 to initialize cell"
+            self.cycle_times.append(t_current)
+            self.cycle_comments.append("Cycle{0}\t{1}ns:\t{2}".format(len(self.cycle_times)-1,
+                                                                    t_current,
+                                                                    msg))
+            t_current += period
 
         # One period
         msg = "W data 0 address 11..11 (to ensure a write of value works)"
@@ -543,39 +873,52 @@ class delay():
 
     def analytical_model(self,sram, slews, loads):
         """ Just return the analytical model results for the SRAM. 
+        The whole slew/load grid is evaluated in one call on arrays.
+        The minimum period and the power are at the largest slew and
+        load like the simulated ones, and the power is at the voltage
+        and temperature of the corner and the minimum period.
         """
-        LH_delay = []
-        HL_delay = []
-        LH_slew = []
-        HL_slew = []
-        for slew in slews:
-            for load in loads:
-                bank_delay = sram.analytical_delay(slew,load)
-                # Convert from ps to ns
-                LH_delay.append(bank_delay.delay/1e3)
-                HL_delay.append(bank_delay.delay/1e3)
-                LH_slew.append(bank_delay.slew/1e3)
-                HL_slew.append(bank_delay.slew/1e3)
+        (slew_grid, load_grid) = np.meshgrid(np.asarray(slews, dtype=float),
+                                             np.asarray(loads, dtype=float),
+                                             indexing="ij")
+        bank_delay = sram.analytical_delay(slew_grid, load_grid)
+        # Convert from ps to ns (a stage may not depend on the slew or load)
+        delays = (np.broadcast_to(bank_delay.delay, slew_grid.shape)/1e3).flatten().tolist()
+        slews = (np.broadcast_to(bank_delay.slew, slew_grid.shape)/1e3).flatten().tolist()
+        LH_delay = delays
+        HL_delay = list(delays)
+        LH_slew = slews
+        HL_slew = list(slews)
+
+        (min_period, read_power, write_power, leakage_power) = sram.analytical_power(np.max(slew_grid),
+                                                                                     np.max(load_grid),
+                                                                                     self.corner.voltage,
+                                                                                     self.corner.temperature)
         
-        data = {"min_period": 0, 
+        data = {"min_period": float(min_period), 
                 "delay1": LH_delay,
                 "delay0": HL_delay,
                 "slew1": LH_slew,
                 "slew0": HL_slew,
-                "read0_power": 0,
-                "read1_power": 0,
-                "write0_power": 0,
-                "write1_power": 0
+                "read0_power": float(read_power),
+                "read1_power": float(read_power),
+                "write0_power": float(write_power),
+                "write1_power": float(write_power),
+                "leakage_power": float(leakage_power)
                 }
         return data
 
+    def cycle_values(self, values):
+        """ Returns the values of a waveform in the simulated cycles. """
+        return [values[i] for i in self.cycles]
+
     def gen_data(self, clk_times, sig_name, period, slew):
         """ Generates the PWL data inputs for a simulation timing test. """
         # values for NOP, W1, W0, W1, R0, NOP, W1, W0, R1, NOP
         # we are asserting the opposite value on the other side of the tx gate during
         # the read to be "worst case". Otherwise, it can actually assist the read.
         values = [0, 1, 0, 1, 1, 1, 1, 0, 0, 0 ]
-        stimuli.gen_pwl(self.sf, sig_name, clk_times, values, period, slew, 0.05)
+        stimuli.gen_pwl(self.sf, sig_name, clk_times, self.cycle_values(values), period, slew, 0.05, self.vdd)
 
     def gen_addr(self, clk_times, addr, period, slew):
         """ 
@@ -589,9 +932,9 @@ class delay():
         for i in range(len(addr)):
             sig_name = "A[{0}]".format(i)
             if addr[i]=="1":
-                stimuli.gen_pwl(self.sf, sig_name, clk_times, ones_values, period, slew, 0.05)
+                stimuli.gen_pwl(self.sf, sig_name, clk_times, self.cycle_values(ones_values), period, slew, 0.05, self.vdd)
             else:
-                stimuli.gen_pwl(self.sf, sig_name, clk_times, zero_values, period, slew, 0.05)
+                stimuli.gen_pwl(self.sf, sig_name, clk_times, self.cycle_values(zero_values), period, slew, 0.05, self.vdd)
 
 
     def gen_csb(self, clk_times, period, slew):
@@ -599,24 +942,37 @@ class delay():
         # values for NOP, W1, W0, W1, R0, NOP, W1, W0, R1, NOP
         # Keep CSb asserted in NOP for measuring >1 period
         values = [1, 0, 0, 0, 0, 0, 0, 0, 0, 0]
-        stimuli.gen_pwl(self.sf, "csb", clk_times, values, period, slew, 0.05)
+        stimuli.gen_pwl(self.sf, "csb", clk_times, self.cycle_values(values), period, slew, 0.05, self.vdd)
 
     def gen_web(self, clk_times, period, slew):
         """ Generates the PWL WEb signal """
         # values for NOP, W1, W0, W1, R0, NOP, W1, W0, R1, NOP
         # Keep WEb deasserted in NOP for measuring >1 period
         values = [1, 0, 0, 0, 1, 1, 0, 0, 1, 1]
-        stimuli.gen_pwl(self.sf, "web", clk_times, values, period, slew, 0.05)
+        stimuli.gen_pwl(self.sf, "web", clk_times, self.cycle_values(values), period, slew, 0.05, self.vdd)
 
         # Keep acc_en deasserted in NOP for measuring >1 period
         values = [1, 0, 0, 0, 1, 1, 0, 0, 1, 1]
-        stimuli.gen_pwl(self.sf, "acc_en", clk_times, values, period, slew, 0)
+        stimuli.gen_pwl(self.sf, "acc_en", clk_times, self.cycle_values(values), period, slew, 0, self.vdd)
         values = [0, 1, 1, 1, 0, 0, 1, 1, 0, 0]
-        stimuli.gen_pwl(self.sf, "acc_en_inv", clk_times, values, period, slew, 0)
+        stimuli.gen_pwl(self.sf, "acc_en_inv", clk_times, self.cycle_values(values), period, slew, 0, self.vdd)
         
     def gen_oeb(self, clk_times, period, slew):
         """ Generates the PWL WEb signal """
         # values for NOP, W1, W0, W1, R0, W1, W0, R1, NOP
         # Keep OEb asserted in NOP for measuring >1 period
         values = [1, 1, 1, 1, 0, 0, 1, 1, 0, 0]
-        stimuli.gen_pwl(self.sf, "oeb", clk_times, values, period, slew, 0.05)
+        stimuli.gen_pwl(self.sf, "oeb", clk_times, self.cycle_values(values), period, slew, 0.05, self.vdd)
+
+
+def worst_case(results):
+    """ Returns the worst case of the delay results of several probes: the
+    longest delays, slews and minimum period and the largest power. """
+    data = {}
+    for key in results[0].keys():
+        values = [result[key] for result in results]
+        if type(values[0]) == list:
+            data[key] = [max(point) for point in zip(*values)]
+        else:
+            data[key] = max(values)
+    return data
@@ -3,16 +3,108 @@ import debug
 import math
 import setup_hold
 import delay
+import telemetry
 import charutils as ch
 import tech
 import numpy as np
 from trim_spice import trim_spice
+from reduce_spice import reduce_spice
+from corner import get_corners,nominal_corner
+from sim_pool import sim_pool,get_sim_dir
 from globals import OPTS
 
+
+def get_probe(sram):
+    """ Returns the address and data bit that are characterized. """
+    return ("1" * sram.addr_size, sram.word_size - 1)
+
+
+def get_probes(sram):
+    """ Returns the (address, data bit) of each probe that is
+    characterized. The first one is the far corner of the array. With the
+    worst case probes, these are also the near corner, the far corner of
+    each bank and the first column mux boundary. """
+    probes = [get_probe(sram)]
+    if not OPTS.worst_case_probes:
+        return probes
+
+    probes.append(("0" * sram.addr_size, 0))
+    bank_bits = sram.addr_size - sram.bank_addr_size
+    for bank in range(sram.num_banks):
+        # The bank address bits follow the bank address (LSB first)
+        bank_address = "{0:0{1}b}".format(bank, bank_bits)[::-1] if bank_bits > 0 else ""
+        probes.append(("1" * sram.bank_addr_size + bank_address, sram.word_size - 1))
+    if sram.col_addr_size > 0:
+        probes.append(("0" * sram.col_addr_size + "1" * (sram.addr_size - sram.col_addr_size),
+                       sram.word_size - 1))
+
+    unique = []
+    for probe in probes:
+        if probe not in unique:
+            unique.append(probe)
+    return unique
+
+
+def write_libs(name, sram, spfile, use_model=OPTS.analytical_delay):
+    """ Writes a .lib of each corner of the corners option and returns
+    their names. The corners share the trimmed netlists and run at once on
+    the simulation slots. A single nominal corner is written to name.lib
+    and the others to name_corner.lib. """
+    corners = get_corners()
+    if len(corners) == 1 and corners[0].name == nominal_corner().name:
+        libname = name + ".lib"
+        lib(libname, sram, spfile, use_model)
+        return [libname]
+
+    netlists = None
+    if not use_model:
+        netlists = simulation_netlists(sram, spfile)
+    for c in corners:
+        c.sim_dir = get_sim_dir(c.name)
+
+    libnames = ["{0}_{1}.lib".format(name, c.name) for c in corners]
+    sim_pool(len(corners)).map(lambda libname, c: lib(libname, sram, spfile, use_model, c, netlists),
+                               zip(libnames, corners))
+    return libnames
+
+
+def simulation_netlists(sram, spfile):
+    """ Writes the netlists that are simulated (trimmed or reduced to the
+    cone of influence if that is enabled) to the temp dir. Returns the
+    (address, data bit, netlist) of each probe. The probes of the same
+    bitcell in different banks share a netlist. """
+    probes = get_probes(sram)
+    if not OPTS.trim_netlist:
+        sim_sp_file = "{}sram.sp".format(OPTS.openram_temp)
+        shutil.copy(spfile, sim_sp_file)
+        return [(address, data_bit, sim_sp_file) for (address, data_bit) in probes]
+
+    sim_sp_file = "{}reduced.sp".format(OPTS.openram_temp)
+    if OPTS.reduce_netlist:
+        trimsp = reduce_spice(spfile, sim_sp_file)
+    else:
+        trimsp = trim_spice(spfile, sim_sp_file)
+    trimsp.set_configuration(sram.num_banks,
+                             sram.num_rows,
+                             sram.num_cols,
+                             sram.word_size)
+    netlists = []
+    files = {}
+    for (address, data_bit) in probes:
+        bitcell = trimsp.probe_names(address, data_bit)
+        if bitcell not in files:
+            if len(files) > 0:
+                trimsp.reduced_spfile = "{0}reduced_probe{1}.sp".format(OPTS.openram_temp, len(files))
+            trimsp.trim(address, data_bit)
+            files[bitcell] = trimsp.reduced_spfile
+        netlists.append((address, data_bit, files[bitcell]))
+    return netlists
+
+
 class lib:
     """ lib file generation."""
     
-    def __init__(self, libname, sram, spfile, use_model=OPTS.analytical_delay):
+    def __init__(self, libname, sram, spfile, use_model=OPTS.analytical_delay, corner=None, netlists=None):
         self.sram = sram
         self.sp_file = spfile        
         self.use_model = use_model
@@ -20,32 +112,25 @@ class lib:
         self.num_words = sram.num_words
         self.word_size = sram.word_size
         self.addr_size = sram.addr_size
-
-        # Set up to trim the netlist here if that is enabled
-        if OPTS.trim_netlist:
-            self.sim_sp_file = "{}reduced.sp".format(OPTS.openram_temp)
-            self.trimsp=trim_spice(self.sp_file, self.sim_sp_file)
-            self.trimsp.set_configuration(self.sram.num_banks,
-                                          self.sram.num_rows,
-                                          self.sram.num_cols,
-                                          self.sram.word_size)
-        else:
-            # Else, use the non-reduced netlist file for simulation
-            self.sim_sp_file = "{}sram.sp".format(OPTS.openram_temp)
-            # Make a copy in temp for debugging
-            shutil.copy(self.sp_file, self.sim_sp_file)
+        if corner == None:
+            corner = nominal_corner()
+        self.corner = corner
+        # The simulations of this .lib are recorded after this one
+        telemetry_start = telemetry.mark()
+
+        # The netlists are only simulated without the model. The corners
+        # share the ones that they prepared.
+        if netlists == None and not use_model:
+            netlists = simulation_netlists(sram, spfile)
+        self.netlists = netlists
         
         # These are the parameters to determine the table sizes
-        #self.load_scales = np.array([0.1, 0.25, 0.5, 1, 2, 4, 8])
-        self.load_scales = np.array([0.25, 1, 8])
-        #self.load_scales = np.array([0.25, 1])
+        self.load_scales = np.array(OPTS.load_scales)
         self.load = tech.spice["FF_in_cap"]
         self.loads = self.load_scales*self.load
         debug.info(1,"Loads: {0}".format(self.loads))
         
-        #self.slew_scales = np.array([0.1, 0.25, 0.5, 1, 2, 4, 8])
-        self.slew_scales = np.array([0.25, 1, 8])        
-        #self.slew_scales = np.array([0.25, 1])
+        self.slew_scales = np.array(OPTS.slew_scales)
         self.slew = tech.spice["rise_time"]        
         self.slews = self.slew_scales*self.slew
         debug.info(1,"Slews: {0}".format(self.slews))
@@ -65,6 +150,9 @@ class lib:
         
         self.lib.close()
 
+        if not use_model:
+            telemetry.write_report(libname, telemetry_start, corner.name)
+
     def write_header(self):
         """ Write the header information """
         self.lib.write("library ({0}_lib)".format(self.name))
@@ -75,7 +163,7 @@ class lib:
         self.write_defaults()
         self.write_LUT_templates()
 
-        self.lib.write("    default_operating_conditions : TT; \n")
+        self.lib.write("    default_operating_conditions : {0}; \n".format(self.corner.name))
         
         self.write_bus()
 
@@ -90,7 +178,12 @@ class lib:
         self.lib.write("    dont_use  : true;\n")
         self.lib.write("    map_only   : true;\n")
         self.lib.write("    dont_touch : true;\n")
-        self.lib.write("    area : {0};\n\n".format(self.sram.width * self.sram.height))
+        self.lib.write("    area : {0};\n".format(self.sram.width * self.sram.height))
+        # Only the analytical model estimates the leakage
+        if self.use_model:
+            self.compute_delay()
+            self.lib.write("    cell_leakage_power : {0};\n".format(self.delay["leakage_power"]))
+        self.lib.write("\n")
         
     
     def write_units(self):
@@ -103,9 +196,9 @@ class lib:
         self.lib.write("    capacitive_load_unit(1 ,fF) ;\n")
         self.lib.write("    leakage_power_unit : \"1mW\" ;\n")
         self.lib.write("    pulling_resistance_unit :\"1kohm\" ;\n")
-        self.lib.write("    operating_conditions(TT){\n")
-        self.lib.write("    voltage : {0} ;\n".format(tech.spice["supply_voltage"]))
-        self.lib.write("    temperature : 25.000 ;\n")
+        self.lib.write("    operating_conditions({0}){{\n".format(self.corner.name))
+        self.lib.write("    voltage : {0} ;\n".format(self.corner.voltage))
+        self.lib.write("    temperature : {0:.3f} ;\n".format(self.corner.temperature))
         self.lib.write("    }\n\n")
 
     def write_defaults(self):
@@ -388,16 +481,26 @@ class lib:
         try:
             self.d
         except AttributeError:
-            self.d = delay.delay(self.sram, self.sim_sp_file)
             if self.use_model:
+                self.d = delay.delay(self.sram, None, self.corner)
                 self.delay = self.d.analytical_model(self.sram,self.slews,self.loads)
             else:
-                probe_address = "1" * self.addr_size
-                probe_data = self.word_size - 1
-                # We must trim based on a specific address and data bit
-                if OPTS.trim_netlist:
-                    self.trimsp.trim(probe_address,probe_data)
-                self.delay = self.d.analyze(probe_address, probe_data, self.slews, self.loads)
+                # The probes run at once and the worst of them is written
+                results = sim_pool(len(self.netlists)).map(self.analyze_probe,
+                                                           list(enumerate(self.netlists)))
+                self.delay = delay.worst_case(results)
+
+    def analyze_probe(self, index, probe):
+        """ Characterizes the delay of a probe (address, data bit and
+        netlist). Each probe of several has its own sim dir. """
+        (address, data_bit, sim_sp_file) = probe
+        d = delay.delay(self.sram, sim_sp_file, self.corner)
+        if len(self.netlists) > 1:
+            d.sim_dir = get_sim_dir("probe{0}".format(index), self.corner.sim_dir)
+            debug.info(1, "Probe {0}: address {1} data bit {2}".format(index, address, data_bit))
+        if index == 0:
+            self.d = d
+        return d.analyze(address, data_bit, self.slews, self.loads)
 
     def compute_setup_hold(self):
         """ Do the analysis if we haven't characterized a FF yet """
@@ -405,9 +508,9 @@ class lib:
         try:
             self.sh
         except AttributeError:
-            self.sh = setup_hold.setup_hold()
+            self.sh = setup_hold.setup_hold(self.corner)
             if self.use_model:
-                self.times = self.sh.analytical_model(self.slews,self.loads)
+                self.times = self.sh.analytical_model(self.slews,self.slews)
             else:
                 self.times = self.sh.analyze(self.slews,self.slews)
                 
@@ -0,0 +1,154 @@
+"""
+This fills the values of a lookup table (NLDM) while simulating only some
+of its points. It simulates the corners and the center of the table, fits
+a smooth surrogate (a thin plate spline) to the samples and then adds
+samples where the surrogate isn't reliable until its estimated error is
+within a tolerance everywhere. The other points come from the surrogate.
+"""
+
+import numpy as np
+import debug
+from globals import OPTS
+from sim_pool import num_jobs
+
+
+def normalize(values):
+    """ Returns the positions of the index values in [0,1]. They are linear
+    in the values (even though the slews and loads grow geometrically)
+    because the delays are close to linear in the slew and load and the
+    spline reproduces linear functions exactly. """
+    values = np.array(values, dtype=float)
+    if len(values) == 1:
+        return np.zeros(1)
+    span = values.max() - values.min()
+    if span == 0:
+        return np.zeros(len(values))
+    return (values - values.min()) / span
+
+
+class surrogate():
+    """
+    A thin plate spline with a linear term through the samples of each
+    output.
+    """
+
+    def __init__(self, points, values):
+        self.points = np.array(points, dtype=float)
+        n = len(self.points)
+        a = np.zeros((n + 3, n + 3))
+        a[:n,:n] = self.kernel(self.points)
+        a[:n,n] = 1
+        a[:n,n+1:] = self.points
+        a[n,:n] = 1
+        a[n+1:,:n] = self.points.T
+        b = np.zeros((n + 3, values.shape[1]))
+        b[:n] = values
+        # least squares in case the samples don't span the plane
+        self.weights = np.linalg.lstsq(a, b, rcond=None)[0]
+
+    def kernel(self, points):
+        r = np.sqrt(((points[:,np.newaxis,:] - self.points[np.newaxis,:,:])**2).sum(axis=2))
+        with np.errstate(divide="ignore", invalid="ignore"):
+            phi = np.where(r > 0, r*r*np.log(r), 0.0)
+        return phi
+
+    def predict(self, points):
+        points = np.array(points, dtype=float)
+        n = len(self.points)
+        return self.kernel(points).dot(self.weights[:n]) \
+            + self.weights[n] + points.dot(self.weights[n+1:])
+
+
+class lut_sampler():
+    """
+    Samples the table of the index values xs (rows) and ys (columns).
+    simulate is called with a list of (x, y) points and returns a tuple of
+    output values for each of them.
+    """
+
+    def __init__(self, xs, ys, simulate, tolerance=None, max_rounds=None):
+        self.xs = list(xs)
+        self.ys = list(ys)
+        self.simulate = simulate
+        self.tolerance = OPTS.lut_tolerance if tolerance == None else tolerance
+        self.max_rounds = OPTS.lut_max_rounds if max_rounds == None else max_rounds
+        self.positions = {}
+        u = normalize(self.xs)
+        v = normalize(self.ys)
+        for i in range(len(self.xs)):
+            for j in range(len(self.ys)):
+                self.positions[(i, j)] = (u[i], v[j])
+        # the simulated outputs by table index
+        self.samples = {}
+
+    def add_samples(self, indices):
+        """ Simulates the points at the table indices. """
+        points = [(self.xs[i], self.ys[j]) for (i, j) in indices]
+        for (index, values) in zip(indices, self.simulate(points)):
+            self.samples[index] = np.array(values, dtype=float)
+
+    def fit(self, exclude=None):
+        indices = [index for index in sorted(self.samples.keys()) if index != exclude]
+        points = [self.positions[index] for index in indices]
+        values = np.array([self.samples[index] for index in indices])
+        return surrogate(points, values)
+
+    def min_scale(self):
+        """ Returns the smallest scale of the errors of each output, a tenth
+        of its largest magnitude, since setup and hold times may be close
+        to zero. """
+        values = np.abs(np.array(self.samples.values()))
+        return np.maximum(0.1*values.max(axis=0), 1e-12)
+
+    def estimate_errors(self, candidates):
+        """ Estimates the relative error of the surrogate at each candidate
+        index as the change of its prediction without the nearest sample. """
+        full = self.fit()
+        min_scale = self.min_scale()
+        errors = {}
+        loo_fits = {}
+        for index in candidates:
+            position = np.array(self.positions[index])
+            nearest = min(self.samples.keys(),
+                          key=lambda s: (((np.array(self.positions[s]) - position)**2).sum(), s))
+            if nearest not in loo_fits:
+                loo_fits[nearest] = self.fit(exclude=nearest)
+            prediction = full.predict([position])[0]
+            diff = prediction - loo_fits[nearest].predict([position])[0]
+            errors[index] = (np.abs(diff) / np.maximum(np.abs(prediction), min_scale)).max()
+        return errors
+
+    def sample(self):
+        """ Returns the output tuples of all the table points in row order. """
+        all_indices = sorted(self.positions.keys())
+        rows = sorted(set([0, len(self.xs)//2, len(self.xs) - 1]))
+        cols = sorted(set([0, len(self.ys)//2, len(self.ys) - 1]))
+        initial = [(i, j) for i in rows for j in cols]
+        # Small tables and tables with a single row or column are simulated fully
+        if len(rows) < 3 or len(cols) < 3 or len(initial) == len(all_indices):
+            initial = all_indices
+        self.add_samples(initial)
+
+        batch_size = max(1, num_jobs())
+        for round in range(self.max_rounds):
+            candidates = [index for index in all_indices if index not in self.samples]
+            if len(candidates) == 0:
+                break
+            errors = self.estimate_errors(candidates)
+            worst = sorted(candidates, key=lambda index: (-errors[index], index))
+            worst = [index for index in worst if errors[index] > self.tolerance][:batch_size]
+            debug.info(2, "LUT sampling round {0}: {1} samples, largest estimated error {2}".format(round,
+                                                                                              len(self.samples),
+                                                                                              errors[max(candidates, key=errors.get)]))
+            if len(worst) == 0:
+                break
+            self.add_samples(worst)
+
+        debug.info(1, "Simulated {0} of {1} LUT points".format(len(self.samples), len(all_indices)))
+        prediction = self.fit().predict([self.positions[index] for index in all_indices])
+        results = []
+        for (index, predicted) in zip(all_indices, prediction):
+            if index in self.samples:
+                predicted = self.samples[index]
+            results.append(tuple(float(x) for x in predicted))
+        return results
@@ -0,0 +1,279 @@
+"""
+This is a deterministic stand-in for the spice simulator. It reads a
+stimulus and writes plausible measurements without simulating the
+circuit so that the characterization flow (and its overhead) can run on
+a machine without a simulator.
+
+The measurements between two sources are exact since the PWL and PULSE
+waveforms are known. The SRAM read delays and slews come from a model of
+the included netlist (see register_model) and degrade when the period
+gets too short. The flip-flop of the setup/hold stimulus latches its data
+if it is stable from the setup time before to the hold time after a
+rising clock edge. The model results get a small amount of noise that
+only depends on the stimulus, so a run can be repeated exactly.
+"""
+
+import os
+import re
+import random
+import hashlib
+import tech
+import debug
+import charutils as ch
+from globals import OPTS
+
+vdd_voltage = tech.spice["supply_voltage"]
+
+# The read delay models of the SRAM netlists by file or SRAM subckt name
+models = {}
+
+def register_model(netlist, model):
+    """ Registers the model of an SRAM netlist file or of an SRAM subckt
+    name (in any netlist, such as the trimmed netlists of its probes). A
+    model is called with an input slew (ns) and an output load (fF) and
+    returns the read delay and output slew (ns). """
+    models[netlist] = model
+
+def analytical_model(sram):
+    """ Returns a model of the SRAM from its analytical delay (in ps). """
+    def model(slew, load):
+        delay = sram.analytical_delay(slew, load)
+        return (delay.delay/1e3, delay.slew/1e3)
+    return model
+
+def default_model(slew, load):
+    """ A model for an unknown netlist: a fixed access time and an RC
+    delay of a minimum size driver into the load. """
+    rc = tech.spice["min_tx_r"] * load * 1e-15 * 1e9
+    return (0.3 + 0.69*rc + 0.5*slew, 0.05 + 2.2*rc + 0.1*slew)
+
+
+# The number of simulations that have been mocked
+num_runs = 0
+
+number = r"[-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?[a-zA-Z]*"
+meas_delay_re = re.compile(r"^\.meas\s+tran\s+(\w+)\s+trig\s+v\((\S+)\)\s+val=({0})\s+(rise|fall)=1\s+td=({0})"
+                           r"\s+targ\s+v\((\S+)\)\s+val=({0})\s+(rise|fall)=1\s+td=({0})".format(number), re.IGNORECASE)
+meas_avg_re = re.compile(r"^\.meas\s+tran\s+(\w+)\s+avg\s+.*from=({0})\s+to=({0})".format(number), re.IGNORECASE)
+supply_re = re.compile(r"^v{0}\s+{0}\s+\S+\s+({1})\s*$".format(re.escape(tech.spice["vdd_name"]), number), re.IGNORECASE)
+source_re = re.compile(r"^v\S+\s+(\S+)\s+\S+\s+(pwl|pulse)\s*\(([^)]*)\)", re.IGNORECASE)
+capacitor_re = re.compile(r"^(c\S*)\s+\S+\s+\S+\s+({0})\s*$".format(number), re.IGNORECASE)
+include_re = re.compile(r"^\.include\s+\"?([^\"\s]+)\"?", re.IGNORECASE)
+
+
+def to_float(value):
+    """ Converts a spice number, dropping the volt unit of the sources. """
+    return ch.convert_to_float(re.sub(r"(?<=\d)v$", "", value, flags=re.IGNORECASE))
+
+
+class waveform():
+    """ The piecewise linear waveform of a source (times in ns). """
+
+    def __init__(self, kind, values, end_time):
+        values = [to_float(v) for v in values.split()]
+        if kind.lower() == "pwl":
+            self.points = [(values[i]/1e-9, values[i+1]) for i in range(0, len(values) - 1, 2)]
+            self.period = None
+            # the rise time is the length of the first transition
+            self.rise = 0
+            for ((t0, v0), (t1, v1)) in zip(self.points, self.points[1:]):
+                if v0 != v1:
+                    self.rise = t1 - t0
+                    break
+        else:
+            (v1, v2, delay, rise, fall, width, period) = values[:7]
+            (delay, rise, fall, width, period) = [x/1e-9 for x in (delay, rise, fall, width, period)]
+            self.points = [(0, v1)]
+            t = delay
+            while t < end_time:
+                self.points += [(t, v1), (t+rise, v2), (t+rise+width, v2), (t+rise+width+fall, v1)]
+                t += period
+            self.period = period
+            self.rise = rise
+
+    def value(self, time):
+        """ Returns the value at a time. """
+        (t0, v0) = self.points[0]
+        for (t1, v1) in self.points[1:]:
+            if time < t1:
+                if t1 == t0:
+                    return v1
+                return v0 + (v1 - v0) * (time - t0) / (t1 - t0)
+            (t0, v0) = (t1, v1)
+        return v0
+
+    def crossing(self, val, direction, after):
+        """ Returns the first time after a time that the waveform crosses a
+        value in a direction or None if it doesn't. """
+        (t0, v0) = self.points[0]
+        for (t1, v1) in self.points[1:]:
+            rising = v0 < val <= v1
+            falling = v0 > val >= v1
+            if (direction == "rise" and rising) or (direction == "fall" and falling):
+                t = t0 + (t1 - t0) * (val - v0) / (v1 - v0)
+                if t >= after:
+                    return t
+            (t0, v0) = (t1, v1)
+        return None
+
+
+class mock_stimulus():
+    """ The sources, loads and measurements of one run of a stimulus. """
+
+    def __init__(self, lines, end_time, model, noise):
+        # the sources by node and the loads (in fF) by name
+        self.sources = {}
+        self.loads = {}
+        self.measures = []
+        self.model = model
+        self.noise = noise
+        self.vdd = vdd_voltage
+        for line in lines:
+            m = supply_re.match(line)
+            if m:
+                self.vdd = to_float(m.group(1))
+                continue
+            m = source_re.match(line)
+            if m:
+                self.sources[m.group(1).lower()] = waveform(m.group(2), m.group(3), end_time)
+                continue
+            m = capacitor_re.match(line)
+            if m:
+                self.loads[m.group(1).lower()] = to_float(m.group(2))/1e-15
+                continue
+            if line.lower().startswith(".meas"):
+                self.measures.append(line)
+
+    def measure(self, line):
+        """ Returns the value of a measurement (in s or W) or None if it fails. """
+        m = meas_delay_re.match(line)
+        if m:
+            (name, trig, trig_val, trig_dir, trig_td, targ, targ_val, targ_dir, targ_td) = m.groups()
+            if trig.lower() not in self.sources:
+                # the transition time of the SRAM output
+                (delay, slew) = self.read_delay()
+                if slew == None or not name.lower().startswith("slew"):
+                    return None
+                return slew * 1e-9
+
+            trig_time = self.crossing(trig, trig_val, trig_dir, trig_td)
+            if trig_time == None:
+                return None
+            if targ.lower() in self.sources:
+                targ_time = self.crossing(targ, targ_val, targ_dir, targ_td)
+            elif name.lower().startswith("clk2q"):
+                targ_time = self.flop_output(trig_time, targ_dir.lower())
+            else:
+                (delay, slew) = self.read_delay()
+                targ_time = None if delay == None else trig_time + delay
+            if targ_time == None:
+                return None
+            return (targ_time - trig_time) * 1e-9
+
+        m = meas_avg_re.match(line)
+        if m:
+            return self.power()
+        return None
+
+    def crossing(self, node, val, direction, td):
+        source = self.sources.get(node.lower())
+        if source == None:
+            return None
+        return source.crossing(to_float(val), direction.lower(), to_float(td)/1e-9)
+
+    def read_delay(self):
+        """ Returns the read delay and slew at the period, load and input
+        slew of the stimulus. The output doesn't settle in a period that
+        is less than twice the delay and slows down below three times. """
+        clk = self.sources.get("clk")
+        (delay, slew) = self.model(clk.rise, max(self.loads.values() + [0]))
+        if clk.period < 2*delay:
+            return (None, None)
+        slowdown = 1 + 0.5 * max(0, 3*delay - clk.period) / delay
+        return (delay * slowdown * self.noise(), slew * slowdown * self.noise())
+
+    def flop_output(self, clk_time, direction):
+        """ Returns the time that the flip-flop output changes in a
+        direction after a clock edge or None if it doesn't. """
+        data = self.sources.get("data")
+        clk = self.sources.get("clk")
+        setup = tech.spice["msflop_setup"]/1e3
+        hold = tech.spice["msflop_hold"]/1e3
+        edges = []
+        t = clk.crossing(0.5*self.vdd, "rise", 0)
+        while t != None and t <= clk_time:
+            edges.append(t)
+            t = clk.crossing(0.5*self.vdd, "rise", t + 1e-6)
+        # The value before the edge is the one latched at the previous edge
+        latched = []
+        for edge in edges[-2:]:
+            before = data.value(edge - setup) > 0.5*self.vdd
+            after = data.value(edge + hold) > 0.5*self.vdd
+            latched.append(before if before == after else None)
+        if len(latched) < 2 or None in latched or latched[0] == latched[1]:
+            return None
+        if (direction == "rise") != latched[1]:
+            return None
+        return clk_time + tech.spice["msflop_delay"]/1e3 * self.noise()
+
+    def power(self):
+        """ Returns an average power of switching the load and a fixed
+        internal capacitance every cycle. """
+        clk = self.sources.get("clk")
+        period = clk.period if clk != None and clk.period else tech.spice["feasible_period"]
+        cap = (50 + max(self.loads.values() + [0])) * 1e-15
+        return cap * self.vdd**2 / (period * 1e-9) * self.noise()
+
+
+def run(temp_stim, output_file):
+    """ Writes the mocked measurements of a stimulus to the output file. """
+    global num_runs
+    num_runs += 1
+
+    f = open(temp_stim, "r")
+    stim = f.read()
+    f.close()
+    lines = [line.strip() for line in stim.splitlines()]
+
+    model = default_model
+    for line in lines:
+        m = include_re.match(line)
+        if m and m.group(1) in models:
+            model = models[m.group(1)]
+            break
+        words = line.split()
+        if len(words) > 1 and words[0].lower() == "xsram" and words[-1] in models:
+            model = models[words[-1]]
+
+    m = re.search(r"^\.tran\s+(.*)$", stim, re.MULTILINE|re.IGNORECASE)
+    debug.check(m != None, "No .tran card in {0}".format(temp_stim))
+    # The stop time of the last interval (the card may have several)
+    end_time = to_float(re.findall(number, m.group(1))[-1])/1e-9
+
+    # The noise only depends on the stimulus and the seed
+    rand = random.Random(hashlib.sha1(stim + str(OPTS.mock_seed)).hexdigest())
+    noise = lambda: 1 + OPTS.mock_noise * rand.gauss(0, 1)
+
+    # Each .ALTER block replaces the sources and loads of the first run
+    blocks = re.split(r"^\.alter\b.*$", "\n".join(lines), flags=re.MULTILINE|re.IGNORECASE)
+    first = mock_stimulus(blocks[0].splitlines(), end_time, model, noise)
+    results = []
+    for (i, block) in enumerate(blocks):
+        if i == 0:
+            alter = first
+        else:
+            alter = mock_stimulus(blocks[0].splitlines() + block.splitlines(), end_time, model, noise)
+        for line in first.measures:
+            value = alter.measure(line)
+            name = line.split()[2].lower()
+            if value == None:
+                results.append("{0} = failed".format(name))
+            else:
+                results.append("{0} = {1:e}".format(name, value))
+
+    # Replace the output file at once so that it is never read half written
+    temp_name = output_file + ".mock"
+    f = open(temp_name, "w")
+    f.write("\n".join(results) + "\n")
+    f.close()
+    os.rename(temp_name, output_file)
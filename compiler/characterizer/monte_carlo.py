@@ -0,0 +1,245 @@
+"""
+This characterizes the statistical read delay of an SRAM. Each Monte
+Carlo variant is a flat copy of the simulated (trimmed) netlist in which
+every transistor, of the ptx cells and of the bitcells alike, has a
+random threshold voltage shift (delvto) and channel length. The Vth shift
+follows the Pelgrom law, so its sigma is the mc_vth_avt coefficient over
+the square root of the gate area, and the length has a relative sigma of
+mc_length_sigma. Variant i is drawn from the seed (mc_seed, i), so a
+variant is the same for any number of samples.
+
+The variants are simulated at once on the simulation pool at the
+feasible period of the nominal netlist. The mean, sigma and quantiles of
+their delay_lh and delay_hl and the number of variants that failed to
+read are written to a JSON report. The model_evaluator stands in for the
+simulations with NumPy only, so the statistics can be checked without a
+simulator.
+"""
+
+import json
+import debug
+import tech
+import numpy as np
+import delay
+import lib
+from reduce_spice import reduce_spice,device_roles
+from utils import spice_number
+from corner import nominal_corner
+from sim_pool import sim_pool,get_sim_dir
+from globals import OPTS
+
+
+class monte_carlo():
+    """
+    The Monte Carlo variants of a netlist of an SRAM that is probed at an
+    address and data bit.
+    """
+
+    def __init__(self, sram, spfile, probe_address, probe_data, corner=None):
+        self.sram = sram
+        self.sp_file = spfile
+        self.probe_address = probe_address
+        self.probe_data = probe_data
+        if corner == None:
+            corner = nominal_corner()
+        self.corner = corner
+
+        # The netlist is flattened to its devices so that each device
+        # varies on its own
+        self.netlist = reduce_spice(spfile, None)
+        self.devices = []
+        top = self.netlist.top
+        self.flatten(top, "", dict((pin, pin) for pin in top.pins))
+
+        # The transistors and their width (times m) and length in um
+        self.transistors = [i for (i, words) in enumerate(self.devices) if words[0][0].upper() == "M"]
+        self.widths = np.zeros(len(self.transistors))
+        self.lengths = np.zeros(len(self.transistors))
+        for (j, i) in enumerate(self.transistors):
+            params = self.params(self.devices[i])
+            self.widths[j] = spice_number(params.get("w", "0")) * 1e6 * spice_number(params.get("m", "1"))
+            self.lengths[j] = spice_number(params.get("l", "0")) * 1e6
+        debug.check(np.all(self.widths > 0) and np.all(self.lengths > 0),
+                    "The transistors of {0} need a width and length to vary.".format(spfile))
+        debug.info(1, "Varying {0} transistors of {1}".format(len(self.transistors), spfile))
+
+    def flatten(self, d, prefix, netmap):
+        """ Adds the devices of a subckt instance to the flat devices. The
+        nets of the instance pins are in the netmap and the other nets
+        get the prefix. """
+        flat_net = lambda net: netmap.get(net) or (net if net == "0" else prefix + net)
+        for words in d.devices:
+            num_pins = len(device_roles.get(words[0][0].upper(), []))
+            nets = [flat_net(net) for net in words[1:1 + num_pins]]
+            self.devices.append([words[0][0] + prefix + words[0]] + nets + words[1 + num_pins:])
+        for (name, nets, subckt) in d.insts:
+            if subckt not in self.netlist.defs:
+                debug.error("Subckt {0} of {1} is not in the netlist".format(subckt, name),-1)
+            child = self.netlist.defs[subckt]
+            child_netmap = dict(zip(child.pins, [flat_net(net) for net in nets]))
+            self.flatten(child, prefix + name + "_", child_netmap)
+
+    def params(self, words):
+        """ Returns the parameters of a device by lower case name. """
+        return dict((w.split("=", 1)[0].lower(), w.split("=", 1)[1]) for w in words if "=" in w)
+
+    def sample(self, num_samples):
+        """ Returns the Vth shifts (V) and channel length changes (um) of
+        each transistor (columns) of each variant (rows). """
+        sigma_vth = OPTS.mc_vth_avt * 1e-3 / np.sqrt(self.widths * self.lengths)
+        sigma_length = OPTS.mc_length_sigma * self.lengths
+        dvth = np.zeros((num_samples, len(self.transistors)))
+        dl = np.zeros((num_samples, len(self.transistors)))
+        for i in range(num_samples):
+            rand = np.random.RandomState([OPTS.mc_seed, i])
+            dvth[i] = rand.standard_normal(len(self.transistors)) * sigma_vth
+            dl[i] = rand.standard_normal(len(self.transistors)) * sigma_length
+        return (dvth, dl)
+
+    def write_variant(self, filename, index, dvth, dl):
+        """ Writes the flat SRAM netlist of a variant with the Vth shifts
+        and length changes of its transistors. """
+        top = self.netlist.top
+        sp = open(filename, "w")
+        sp.write("* Monte Carlo variant {0} (seed {1}) of {2}\n".format(index, OPTS.mc_seed, self.sp_file))
+        sp.write(".SUBCKT {0} {1}\n".format(top.name, " ".join(top.pins)))
+        varied = dict(zip(self.transistors, range(len(self.transistors))))
+        for (i, words) in enumerate(self.devices):
+            if i in varied:
+                j = varied[i]
+                words = [w for w in words if w.split("=", 1)[0].lower() not in ["l", "delvto"]]
+                words.append("l={0:.6g}u".format(self.lengths[j] + dl[j]))
+                words.append("delvto={0:.6g}".format(dvth[j]))
+            sp.write(" ".join(words) + "\n")
+        sp.write(".ENDS {0}\n".format(top.name))
+        sp.close()
+
+    def simulate(self, dvth, dl, period, slew, load):
+        """ Simulates each variant at once at a period, input slew (ns)
+        and load (fF). Returns the delay_lh and delay_hl (ns) of the
+        variants, which are NaN if a variant failed to read. """
+        sim_dirs = []
+        for i in range(len(dvth)):
+            sim_dir = get_sim_dir("mc{0}".format(i), self.corner.sim_dir)
+            variant = "{0}variant.sp".format(sim_dir)
+            self.write_variant(variant, i, dvth[i], dl[i])
+            d = delay.delay(self.sram, variant, self.corner)
+            d.set_probe(self.probe_address, self.probe_data)
+            d.write_stimulus(period, load, slew, sim_dir, measure_power=False, purpose="monte_carlo")
+            sim_dirs.append(sim_dir)
+        results = sim_pool().run(sim_dirs)
+
+        delays = {"delay_lh": np.empty(len(dvth)), "delay_hl": np.empty(len(dvth))}
+        for (i, measurements) in enumerate(results):
+            (success, delay1, slew1, delay0, slew0) = d.check_simulation(period, load, slew, measurements)
+            if not success:
+                (delay1, delay0) = (np.nan, np.nan)
+            delays["delay_lh"][i] = delay1
+            delays["delay_hl"][i] = delay0
+        return delays
+
+    def analyze(self, num_samples, slew, load, evaluator=None):
+        """ Characterizes the delays of num_samples variants at an input
+        slew (ns) and load (fF) and returns the report. The variants are
+        simulated at the feasible period of the nominal netlist unless an
+        evaluator (such as the model_evaluator) stands in for the
+        simulations. """
+        debug.check(num_samples > 0, "No Monte Carlo samples.")
+        (dvth, dl) = self.sample(num_samples)
+        report = {"sram": self.sram.name,
+                  "corner": self.corner.name,
+                  "samples": num_samples,
+                  "seed": OPTS.mc_seed,
+                  "vth_avt": OPTS.mc_vth_avt,
+                  "length_sigma": OPTS.mc_length_sigma,
+                  "transistors": len(self.transistors),
+                  "slew": slew,
+                  "load": load}
+        if evaluator == None:
+            d = delay.delay(self.sram, self.sp_file, self.corner)
+            d.set_probe(self.probe_address, self.probe_data)
+            (period, delay1, delay0) = d.find_feasible_period(load, slew)
+            report.update(period=period, nominal={"delay_lh": delay1, "delay_hl": delay0})
+            delays = self.simulate(dvth, dl, period, slew, load)
+        else:
+            report.update(nominal=evaluator.nominal())
+            delays = evaluator.evaluate(self, dvth, dl)
+
+        for (name, values) in sorted(delays.items()):
+            report[name] = statistics(values)
+            debug.info(1, "{0}: mean {1:.4g}ns sigma {2:.4g}ns failed {3} of {4}".format(name,
+                                                                                       report[name]["mean"],
+                                                                                       report[name]["std"],
+                                                                                       report[name]["failed"],
+                                                                                       num_samples))
+        return report
+
+
+class model_evaluator():
+    """
+    A NumPy stand-in for the simulations of the variants. A transistor
+    slows down by the alpha-power law: its delay scales with its length
+    and with the overdrive (vdd - vth)^-alpha. A variant's delays are
+    the nominal delays times the mean of these factors over its
+    transistors. A variant with a transistor that no longer turns on
+    fails to read.
+    """
+
+    def __init__(self, delay_lh, delay_hl, vth=0.35, alpha=1.3, vdd=None):
+        self.delay_lh = delay_lh
+        self.delay_hl = delay_hl
+        self.vth = vth
+        self.alpha = alpha
+        if vdd == None:
+            vdd = tech.spice["supply_voltage"]
+        self.vdd = vdd
+
+    def nominal(self):
+        return {"delay_lh": self.delay_lh, "delay_hl": self.delay_hl}
+
+    def evaluate(self, mc, dvth, dl):
+        """ Returns the delay_lh and delay_hl (ns) of the variants. """
+        overdrive = self.vdd - self.vth
+        varied_overdrive = overdrive - dvth
+        failed = np.any(varied_overdrive <= 0, axis=1)
+        factors = (1 + dl / mc.lengths) * (overdrive / np.maximum(varied_overdrive, 1e-9))**self.alpha
+        factor = np.where(failed, np.nan, factors.mean(axis=1))
+        return {"delay_lh": self.delay_lh * factor,
+                "delay_hl": self.delay_hl * factor}
+
+
+def statistics(values):
+    """ Returns the mean, sigma and mc_quantiles of the values that aren't
+    NaN and the number that are. """
+    values = np.asarray(values, dtype=float)
+    valid = values[~np.isnan(values)]
+    result = {"failed": int(len(values) - len(valid))}
+    if len(valid) == 0:
+        result.update(mean=np.nan, std=np.nan, quantiles={})
+        return result
+    quantiles = np.percentile(valid, [100.0 * q for q in OPTS.mc_quantiles])
+    result.update(mean=float(valid.mean()),
+                  std=float(valid.std(ddof=1)) if len(valid) > 1 else 0.0,
+                  min=float(valid.min()),
+                  max=float(valid.max()),
+                  quantiles=dict((repr(q), float(v)) for (q, v) in zip(OPTS.mc_quantiles, quantiles)))
+    return result
+
+
+def write_report(filename, report):
+    """ Writes a Monte Carlo report to a JSON file. """
+    f = open(filename, "w")
+    json.dump(report, f, indent=1, sort_keys=True)
+    f.close()
+    return filename
+
+
+def write_monte_carlo(name, sram, spfile):
+    """ Characterizes mc_samples variants of the simulated netlist of the
+    first probe at the nominal corner, the technology's input slew and
+    the flip-flop input load. Writes the report to name.mc.json and
+    returns its name. """
+    (address, data_bit, netlist) = lib.simulation_netlists(sram, spfile)[0]
+    mc = monte_carlo(sram, netlist, address, data_bit)
+    report = mc.analyze(OPTS.mc_samples, tech.spice["rise_time"], tech.spice["FF_in_cap"])
+    return write_report(name + ".mc.json", report)
@@ -0,0 +1,356 @@
+"""
+This measures the simulations from their waveforms instead of the .meas
+statements of the simulator. The batch ngspice backend saves only the
+nodes and supply currents that the .meas statements of a stimulus probe
+(.save) to a binary .raw file, which is read with NumPy. The .meas
+statements are then evaluated in Python as threshold crossings (delays,
+slews and setup/hold times) and averages (power) of the waveforms and
+written to the output file like the simulator writes them, so the rest
+of the characterization doesn't know the difference.
+
+The .raw file stays in the simulation directory, so more metrics can be
+measured from a finished simulation (see load) without simulating again.
+"""
+
+import os
+import re
+import numpy as np
+import debug
+import charutils as ch
+from globals import OPTS
+
+
+def enabled():
+    """ Returns whether the measurements come from the waveforms. """
+    return OPTS.use_raw_waveforms and OPTS.spice_name == "ngspice"
+
+
+def raw_file(sim_dir):
+    """ Returns the name of the .raw file of the waveforms in sim_dir. """
+    return "{0}timing.raw".format(sim_dir)
+
+
+def log_file(sim_dir):
+    """ Returns the name of the simulator log in sim_dir, which is not the
+    output file since the measurements are written there. """
+    return "{0}timing.log".format(sim_dir)
+
+
+def vector_name(name, kind=""):
+    """ Returns the lower case v(node) or i(source) name of a saved vector
+    as it is written by the simulator ("node", "v(node)", "source#branch"
+    or "i(source)"). The time is just "time". """
+    name = name.lower()
+    if kind == "time":
+        return name
+    if re.match(r"^[vi]\(.*\)$", name):
+        return name
+    if name.endswith("#branch"):
+        return "i({0})".format(name[:-len("#branch")])
+    if kind == "current":
+        return "i({0})".format(name)
+    return "v({0})".format(name)
+
+
+class waveforms():
+    """
+    The saved vectors of a transient simulation as NumPy arrays of their
+    values at each time point (s) by v(node) and i(source) name.
+    """
+
+    def __init__(self, time, vectors):
+        self.time = time
+        self.vectors = vectors
+        # The crossings by waveform, value and direction, since many
+        # measurements share a trigger
+        self.crossing_times = {}
+
+    def __getitem__(self, name):
+        key = vector_name(name)
+        if key not in self.vectors:
+            debug.error("No waveform of {0} was saved.".format(name),-1)
+        return self.vectors[key]
+
+    def __contains__(self, name):
+        return vector_name(name) in self.vectors
+
+    def crossings(self, name, value, direction="cross"):
+        """ Returns the times at which a waveform crosses a value in a
+        direction ("rise", "fall" or "cross"). The times are linearly
+        interpolated between the time points. """
+        key = (vector_name(name), value, direction)
+        if key in self.crossing_times:
+            return self.crossing_times[key]
+        v = self[name]
+        above = v > value
+        if direction == "rise":
+            index = np.nonzero(~above[:-1] & above[1:])[0]
+        elif direction == "fall":
+            index = np.nonzero(above[:-1] & ~above[1:])[0]
+        else:
+            index = np.nonzero(above[:-1] != above[1:])[0]
+        (t0, t1) = (self.time[index], self.time[index + 1])
+        (v0, v1) = (v[index], v[index + 1])
+        self.crossing_times[key] = t0 + (value - v0) * (t1 - t0) / (v1 - v0)
+        return self.crossing_times[key]
+
+    def crossing(self, name, value, direction="cross", number=1, after=0.0):
+        """ Returns the time of the nth crossing of a value after a time or
+        None if there aren't n. """
+        times = self.crossings(name, value, direction)
+        times = times[times >= after]
+        if len(times) < number:
+            return None
+        return times[number - 1]
+
+    def window(self, values, start, end):
+        """ Returns the times and values of an array from start to end
+        with interpolated end points. """
+        inside = (self.time > start) & (self.time < end)
+        time = np.concatenate(([start], self.time[inside], [end]))
+        values = np.concatenate(([np.interp(start, self.time, values)],
+                                 values[inside],
+                                 [np.interp(end, self.time, values)]))
+        return (time, values)
+
+    def statistic(self, function, values, start, end):
+        """ Returns a statistic (avg, max, min, pp, rms or integ) of an
+        array from start to end. """
+        (time, values) = self.window(values, start, end)
+        if function == "avg":
+            return np.trapz(values, time) / (end - start)
+        elif function == "integ":
+            return np.trapz(values, time)
+        elif function == "rms":
+            return np.sqrt(np.trapz(values**2, time) / (end - start))
+        elif function == "max":
+            return values.max()
+        elif function == "min":
+            return values.min()
+        elif function == "pp":
+            return values.max() - values.min()
+        debug.error("Unknown measurement function: {0}".format(function),-1)
+
+    def evaluate(self, expression):
+        """ Returns the values of an expression of v() and i() vectors,
+        such as par('(-1*v(vdd)*I(vvdd))'). """
+        m = re.match(r"^par\('(.*)'\)$", expression.strip(), re.IGNORECASE)
+        if m:
+            expression = m.group(1)
+        expression = re.sub(r"\b([vViI])\(([^)]+)\)",
+                            lambda m: "w[{0!r}]".format(vector_name("{0}({1})".format(m.group(1), m.group(2)))),
+                            expression)
+        return eval(expression, {"__builtins__": {}}, {"w": self})
+
+
+def next_line(contents, position):
+    """ Returns the line of the contents at a position with its line end. """
+    end = contents.find(b"\n", position)
+    if end < 0:
+        return contents[position:]
+    return contents[position:end + 1]
+
+
+def read_raw(filename):
+    """ Returns the waveforms of the transient plot of a .raw file of
+    ngspice. The values of a binary file are read at once into an array.
+    Complex (AC) values are read but only their real part is kept. """
+    f = open(filename, "rb")
+    contents = f.read()
+    f.close()
+
+    plots = []
+    position = 0
+    while position < len(contents):
+        # The header of a plot is "Key: value" lines and its vectors
+        header = {}
+        names = []
+        while True:
+            line = next_line(contents, position)
+            debug.check(len(line) > 0, "Truncated waveform file: {0}".format(filename))
+            position += len(line)
+            (key, colon, value) = line.decode("latin-1").partition(":")
+            key = key.strip().lower()
+            if key == "variables":
+                for i in range(int(header["no. variables"])):
+                    line = next_line(contents, position)
+                    position += len(line)
+                    words = line.decode("latin-1").split()
+                    names.append(vector_name(words[1], words[2] if len(words) > 2 else ""))
+            elif key in ["binary", "values"]:
+                break
+            else:
+                header[key] = value.strip()
+
+        num_points = int(header["no. points"])
+        complex_values = "complex" in header.get("flags", "").lower()
+        if key == "binary":
+            dtype = np.dtype("<c16") if complex_values else np.dtype("<f8")
+            values = np.frombuffer(contents, dtype=dtype, count=num_points*len(names), offset=position)
+            position += values.nbytes
+            values = np.real(values).reshape((num_points, len(names)))
+        else:
+            # Each point is its index and the values of the vectors
+            # (a complex value is "real,imaginary")
+            words = []
+            while len(words) < num_points*(len(names) + 1):
+                line = next_line(contents, position)
+                debug.check(len(line) > 0, "Truncated waveform file: {0}".format(filename))
+                position += len(line)
+                words.extend(line.decode("latin-1").split())
+            values = np.array([float(w.split(",")[0]) for w in words], dtype=float)
+            values = values.reshape((num_points, len(names) + 1))[:, 1:]
+        plots.append((header.get("plotname", ""), names, values))
+        while contents[position:position+1] in [b"\n", b"\r"]:
+            position += 1
+
+    debug.check(len(plots) > 0, "No waveforms in {0}".format(filename))
+    transient = [plot for plot in plots if "transient" in plot[0].lower()]
+    (plotname, names, values) = (transient or plots)[-1]
+    debug.check(len(names) > 0 and names[0] == "time",
+                "The first vector of {0} is not the time.".format(filename))
+    vectors = dict((name, values[:, i]) for (i, name) in enumerate(names))
+    return waveforms(values[:, 0], vectors)
+
+
+def write_raw(filename, time, vectors, title="openram"):
+    """ Writes a binary .raw file of a transient simulation with the time
+    (s) and vectors of v(node) and i(source) names. """
+    names = sorted(vectors.keys())
+    values = np.empty((len(time), len(names) + 1))
+    values[:, 0] = time
+    for (i, name) in enumerate(names):
+        values[:, i + 1] = vectors[name]
+    f = open(filename, "wb")
+    f.write("Title: {0}\n".format(title).encode("latin-1"))
+    f.write(b"Plotname: Transient Analysis\n")
+    f.write(b"Flags: real\n")
+    f.write("No. Variables: {0}\n".format(len(names) + 1).encode("latin-1"))
+    f.write("No. Points: {0}\n".format(len(time)).encode("latin-1"))
+    f.write(b"Variables:\n")
+    f.write(b"\t0\ttime\ttime\n")
+    for (i, name) in enumerate(names):
+        kind = "current" if name.lower().startswith("i(") else "voltage"
+        f.write("\t{0}\t{1}\t{2}\n".format(i + 1, name, kind).encode("latin-1"))
+    f.write(b"Binary:\n")
+    f.write(values.astype("<f8").tobytes())
+    f.close()
+
+
+def load(sim_dir):
+    """ Returns the waveforms of the last simulation in sim_dir. """
+    return read_raw(raw_file(sim_dir))
+
+
+meas_re = re.compile(r"^\.meas(?:ure)?\s+tran\s+(\w+)\s+(.*)$", re.IGNORECASE)
+delay_re = re.compile(r"^trig\s+(.*?)\s+targ\s+(.*)$", re.IGNORECASE)
+statistic_re = re.compile(r"^(avg|max|min|pp|rms|integ)\s+(.*?)\s+from=(\S+)\s+to=(\S+)$", re.IGNORECASE)
+signal_re = re.compile(r"\b[vi]\(([^)]+)\)", re.IGNORECASE)
+
+
+def read_measures(temp_stim):
+    """ Returns the .meas tran statements of a stimulus (with their
+    continuation lines) as a list of their names and definitions. """
+    f = open(temp_stim, "r")
+    lines = []
+    for line in f:
+        line = line.strip()
+        if line.startswith("+") and len(lines) > 0:
+            lines[-1] += " " + line[1:].strip()
+        else:
+            lines.append(line)
+    f.close()
+
+    measures = []
+    for line in lines:
+        if line.lower().startswith(".end") and not line.lower().startswith(".ends"):
+            break
+        m = meas_re.match(line)
+        if m:
+            measures.append((m.group(1).lower(), m.group(2).strip()))
+    return measures
+
+
+def parse_probe(definition):
+    """ Returns the waveform, value, direction, number and delay of a
+    trigger or target such as "v(clk) VAL=0.5 FALL=1 TD=2n". """
+    words = definition.split()
+    params = dict((w.split("=", 1)[0].lower(), w.split("=", 1)[1]) for w in words[1:] if "=" in w)
+    value = ch.convert_to_float(params.get("val", "0"))
+    after = ch.convert_to_float(params.get("td", "0"))
+    for direction in ["rise", "fall", "cross"]:
+        if direction in params:
+            return (words[0], value, direction, int(params[direction]), after)
+    return (words[0], value, "cross", 1, after)
+
+
+def measure(w, definition):
+    """ Returns the value of a measurement definition on the waveforms or
+    None if it failed (a crossing that doesn't happen). """
+    m = delay_re.match(definition)
+    if m:
+        times = []
+        for probe in m.groups():
+            (name, value, direction, number, after) = parse_probe(probe)
+            times.append(w.crossing(name, value, direction, number, after))
+        if None in times:
+            return None
+        return times[1] - times[0]
+    m = statistic_re.match(definition)
+    if m:
+        start = ch.convert_to_float(m.group(3))
+        end = ch.convert_to_float(m.group(4))
+        if end <= start or start < w.time[0] or end > w.time[-1]:
+            return None
+        return w.statistic(m.group(1).lower(), w.evaluate(m.group(2)), start, end)
+    debug.error("Unsupported measurement: {0}".format(definition),-1)
+
+
+def saved_signals(measures):
+    """ Returns the v() and i() vectors that the measurements need. """
+    signals = set()
+    for (name, definition) in measures:
+        for m in signal_re.finditer(definition):
+            signals.add(vector_name(m.group(0)))
+    return sorted(signals)
+
+
+def prepare(temp_stim, sim_dir):
+    """ Writes a copy of a stimulus that saves the vectors of its
+    measurements instead of measuring them and returns its name. """
+    measures = read_measures(temp_stim)
+    f = open(temp_stim, "r")
+    lines = f.read().splitlines()
+    f.close()
+
+    stim = "{0}raw_{1}".format(sim_dir, os.path.basename(temp_stim))
+    f = open(stim, "w")
+    # The first line is the title
+    f.write(lines[0] + "\n")
+    signals = saved_signals(measures)
+    if len(signals) > 0:
+        f.write(".save {0}\n".format(" ".join(signals)))
+    skipping = False
+    for line in lines[1:]:
+        card = line.strip().lower()
+        if card.startswith("+") and skipping:
+            continue
+        skipping = card.startswith(".meas")
+        if not skipping:
+            f.write(line + "\n")
+    f.close()
+    return stim
+
+
+def write_measurements(temp_stim, sim_dir):
+    """ Measures the waveforms of sim_dir with the .meas statements of
+    a stimulus and writes them to the output file. """
+    w = load(sim_dir)
+    f = open(ch.get_output_file("timing", sim_dir), "w")
+    for (name, definition) in read_measures(temp_stim):
+        value = measure(w, definition)
+        if value == None or not np.isfinite(value):
+            f.write("{0} = failed\n".format(name))
+        else:
+            f.write("{0} = {1:.6e}\n".format(name, value))
+    f.close()
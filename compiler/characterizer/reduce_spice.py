@@ -0,0 +1,260 @@
+"""
+This reduces an SRAM netlist to the cone of influence of a probed bit.
+The netlist is flattened down to its leaf cells (the subckts without
+instances) and the transistors of the other subckts. Starting from the
+probed data pin and the probed bitcells, it keeps every cell that drives
+(is channel connected to) a kept net, which is the fan-in of the read
+and write paths: the column of the bit, the word line driver and decoder
+of its row and the control logic. The other cells are removed and their
+pins on the kept nets are replaced by lumped capacitances. In
+particular, the other bitcells of the row and column are a gate load on
+the word line and a drain load on the bit lines.
+"""
+
+import debug
+import tech
+import charutils as ch
+from trim_spice import trim_spice
+from utils import spice_number
+
+# The terminal roles of the devices (a channel terminal drives its net)
+device_roles = {"M": ["channel", "gate", "channel", "bulk"],
+                "R": ["channel", "channel"],
+                "L": ["channel", "channel"],
+                "D": ["channel", "channel"],
+                "C": ["cap", "cap"]}
+
+
+class subckt_def():
+    """ The pins, instances and devices of a subckt in the netlist. """
+
+    def __init__(self, name, pins, start):
+        self.name = name
+        self.pins = pins
+        # the (name, nets, subckt) of each instance
+        self.insts = []
+        # the words of each device line
+        self.devices = []
+        # the first and last line of the subckt in the netlist
+        self.start = start
+        self.end = None
+
+
+def device_pins(words):
+    """ Returns the (role, capacitance in fF) of each terminal of a
+    device. The capacitances are the gate or drain capacitance of a
+    transistor of the width relative to a minimum size transistor. """
+    kind = words[0][0].upper()
+    roles = device_roles.get(kind)
+    if roles == None:
+        debug.error("Unsupported device in the netlist: {0}".format(" ".join(words)),-1)
+    params = {}
+    for word in words[1 + len(roles):]:
+        if "=" in word:
+            (key, value) = word.split("=", 1)
+            params[key.lower()] = value
+    gate_c = drain_c = cap_c = 0.0
+    if kind == "C":
+        cap_c = spice_number(words[3]) * 1e15
+    if kind == "M" and "w" in params:
+        size = spice_number(params["w"]) * 1e6 / tech.spice["minwidth_tx"]
+        size *= spice_number(params.get("m", "1"))
+        gate_c = size * tech.spice["min_tx_gate_c"]
+        drain_c = size * tech.spice["min_tx_drain_c"]
+    pins = []
+    for role in roles:
+        if role == "gate":
+            pins.append((role, gate_c))
+        elif role == "channel":
+            pins.append((role, drain_c))
+        elif role == "cap":
+            pins.append((role, cap_c))
+        else:
+            pins.append((role, 0.0))
+    return pins
+
+
+def merge_pins(pins):
+    """ Returns the role and capacitance of a net from the pins on it. A
+    net with a channel pin is driven by it. """
+    roles = [role for (role, c) in pins]
+    if "channel" in roles:
+        role = "channel"
+    elif "gate" in roles:
+        role = "gate"
+    else:
+        role = None
+    return (role, sum(c for (role, c) in pins))
+
+
+class reduce_spice(trim_spice):
+    """
+    Reduces an SRAM spice netlist to the cone of influence of an address
+    and data bit. The output is a flat netlist of the SRAM subckt (with
+    the same pins) and the leaf subckts that it uses.
+    """
+
+    def __init__(self, spfile, reduced_spfile):
+        trim_spice.__init__(self, spfile, reduced_spfile)
+        self.parse()
+        self.flatten()
+
+    def parse(self):
+        """ Reads the subckts of the netlist. """
+        # Join the continuation lines
+        lines = []
+        for (i, line) in enumerate(self.spice):
+            if line.startswith("+") and len(lines) > 0:
+                lines[-1] = (lines[-1][0], lines[-1][1] + " " + line[1:])
+            else:
+                lines.append((i, line))
+
+        self.defs = {}
+        self.order = []
+        current = None
+        for (i, line) in lines:
+            words = line.split()
+            if len(words) == 0 or words[0].startswith("*"):
+                continue
+            key = words[0].upper()
+            if key == ".SUBCKT":
+                current = subckt_def(words[1], words[2:], i)
+            elif key == ".ENDS" and current != None:
+                current.end = i
+                self.defs[current.name] = current
+                self.order.append(current.name)
+                current = None
+            elif current == None or key.startswith("."):
+                continue
+            elif key.startswith("X"):
+                nets = [w for w in words[1:] if "=" not in w]
+                current.insts.append((words[0], nets[:-1], nets[-1]))
+            else:
+                current.devices.append(words)
+
+        # The SRAM is the subckt that isn't instantiated in another one
+        used = set(inst[2] for d in self.defs.values() for inst in d.insts)
+        tops = [name for name in self.order if name not in used]
+        debug.check(len(tops) > 0, "No top level subckt in {0}".format(self.sp_file))
+        self.top = self.defs[tops[-1]]
+
+        # The role and capacitance of each pin of the leaf subckts
+        self.leaf_pins = {}
+        for d in self.defs.values():
+            if len(d.insts) > 0:
+                continue
+            pins = dict((pin, []) for pin in d.pins)
+            for words in d.devices:
+                for (net, pin) in zip(words[1:], device_pins(words)):
+                    if net in pins:
+                        pins[net].append(pin)
+            self.leaf_pins[d.name] = [merge_pins(pins[pin]) for pin in d.pins]
+
+    def flatten(self):
+        """ Flattens the SRAM into units (leaf instances and devices). Each
+        unit is a (name, subckt, nets, pins) tuple with the flat nets and
+        the (role, capacitance) of each of them. The subckt is None for a
+        device and the pins of a leaf are shared by its instances. """
+        self.units = []
+        # the units that are bitcells and their local nets
+        self.bitcells = {}
+        netmap = dict((pin, pin) for pin in self.top.pins)
+        self.flatten_subckt(self.top, "", netmap)
+
+        # The units with a channel pin on each net
+        self.drivers = {}
+        for (index, (name, subckt, nets, pins)) in enumerate(self.units):
+            for (net, (role, c)) in zip(nets, pins):
+                if role == "channel":
+                    self.drivers.setdefault(net, []).append(index)
+
+    def flatten_subckt(self, d, prefix, netmap):
+        """ Adds the units of a subckt instance. The nets of the instance
+        pins are in the netmap and the other nets get the prefix. """
+        flat_net = lambda net: netmap.get(net) or (net if net == "0" else prefix + net)
+        for words in d.devices:
+            pins = device_pins(words)
+            nets = [flat_net(net) for net in words[1:1 + len(pins)]]
+            device = [words[0][0] + prefix + words[0]] + nets + words[1 + len(pins):]
+            self.units.append((" ".join(device), None, nets, pins))
+
+        for (name, nets, subckt) in d.insts:
+            if subckt not in self.defs:
+                debug.error("Subckt {0} of {1} is not in the netlist".format(subckt, name),-1)
+            child = self.defs[subckt]
+            flat_nets = [flat_net(net) for net in nets]
+            if subckt in self.leaf_pins:
+                if d.name == "bitcell_array":
+                    self.bitcells[len(self.units)] = nets
+                self.units.append((prefix + name, subckt, flat_nets, self.leaf_pins[subckt]))
+            else:
+                child_netmap = dict(zip(child.pins, flat_nets))
+                self.flatten_subckt(child, prefix + name + "_", child_netmap)
+
+    def is_supply(self, net):
+        """ Returns whether a net is a supply, which isn't followed. """
+        return net in ["0", tech.spice["vdd_name"], tech.spice["gnd_name"]]
+
+    def trim(self, address, data_bit):
+        """ Reduce the spice netlist to the cone of influence of the
+        given bit at the address """
+        (wl_name, bl_name) = self.probe_names(address, data_bit)
+        header = self.get_header(address, data_bit, wl_name, bl_name)
+
+        # The probed bitcell of each bank is kept
+        probed = set(index for (index, nets) in self.bitcells.items()
+                     if wl_name in nets and bl_name in nets)
+        debug.check(len(probed) > 0, "No bitcell on {0} and {1} in {2}".format(wl_name, bl_name, self.sp_file))
+
+        # Keep the drivers of every net of a kept unit starting from the
+        # data pin (the data pins are first in the SRAM pins)
+        kept = set(probed)
+        work = [self.top.pins[data_bit]]
+        for index in probed:
+            work.extend(self.units[index][2])
+        kept_nets = set()
+        while len(work) > 0:
+            net = work.pop()
+            if net in kept_nets or self.is_supply(net):
+                continue
+            kept_nets.add(net)
+            for index in self.drivers.get(net, []):
+                if index in kept or index in self.bitcells:
+                    continue
+                kept.add(index)
+                (name, subckt, nets, pins) = self.units[index]
+                work.extend(n for (n, (role, c)) in zip(nets, pins) if role in ["channel", "gate"])
+
+        # The loads of the removed units on the kept nets
+        loads = {}
+        for (index, (name, subckt, nets, pins)) in enumerate(self.units):
+            if index in kept:
+                continue
+            for (net, (role, c)) in zip(nets, pins):
+                if c > 0 and net in kept_nets and not self.is_supply(net):
+                    loads[net] = loads.get(net, 0.0) + c
+
+        debug.info(1, "Kept {0} of {1} cells and devices in the cone of influence".format(len(kept), len(self.units)))
+        header.append("* Reduced to the cone of influence: {0} of {1} cells and devices".format(len(kept), len(self.units)))
+
+        # The leaf subckts of the kept cells (and the subckts they use)
+        leafs = set(self.units[index][1] for index in kept) - set([None])
+
+        sp = open(self.reduced_spfile, "w")
+        sp.write("\n".join(header) + "\n")
+        for name in self.order:
+            if name in leafs:
+                d = self.defs[name]
+                sp.write("\n" + "\n".join(self.spice[d.start:d.end + 1]) + "\n")
+        sp.write("\n.SUBCKT {0} {1}\n".format(self.top.name, " ".join(self.top.pins)))
+        for index in sorted(kept):
+            (name, subckt, nets, pins) = self.units[index]
+            if subckt == None:
+                sp.write(name + "\n")
+            else:
+                sp.write("{0} {1} {2}\n".format(name, " ".join(nets), subckt))
+        sp.write("* Lumped loads of the removed cells\n")
+        for (i, net) in enumerate(sorted(loads.keys())):
+            sp.write("Cload{0} {1} {2} {3}f\n".format(i, net, tech.spice["gnd_name"], loads[net]))
+        sp.write(".ENDS {0}\n".format(self.top.name))
+        sp.close()
@@ -1,37 +1,64 @@
 import sys
+import copy
+import hashlib
 import tech
 import stimuli
+import telemetry
 import debug
 import charutils as ch
 import ms_flop
+import sim_cache
+import checkpoint
+from lut_sampler import lut_sampler
+from corner import nominal_corner
+from sim_pool import sim_pool,get_sim_dir,search_points
 from globals import OPTS
 
 
 class setup_hold():
     """
     Functions to calculate the setup and hold times of the SRAM
-    (Bisection Methodology)
+    (Bisection Methodology) at a corner (the nominal corner by default)
     """
 
-    def __init__(self):
+    def __init__(self, corner=None):
         # This must match the spice model order
         self.pins = ["data", "dout", "dout_bar", "clk", "vdd", "gnd"]
         self.model_name = "ms_flop"
         self.model_location = OPTS.openram_tech + "sp_lib/ms_flop.sp"
         self.period = tech.spice["feasible_period"]
-        self.vdd = tech.spice["supply_voltage"]
+        if corner == None:
+            corner = nominal_corner()
+        self.corner = corner
+        self.vdd = corner.voltage
         self.gnd = tech.spice["gnd_voltage"]
+        # The directory of the stimulus and output
+        self.sim_dir = corner.sim_dir
+        # The number of points each search step simulates at once (None picks it from the jobs)
+        self.num_search_points = None
+        # The journal of the finished searches of analyze and the item of
+        # the running search (see checkpoint)
+        self.checkpoint = None
+        self.search_item = None
 
         debug.info(2,"Feasible period from technology file: {0} ".format(self.period))
 
                 
 
 
-    def write_stimulus(self, mode, target_time, correct_value):
-        """Creates a stimulus file for SRAM setup/hold time calculation"""
+    def write_stimulus(self, mode, target_time, correct_value, sim_dir=None):
+        """Creates a stimulus file for SRAM setup/hold time calculation in
+        sim_dir (the search's own directory by default)"""
 
         # creates and opens the stimulus file for writing
-        temp_stim = OPTS.openram_temp + "stim.sp"
+        if sim_dir == None:
+            sim_dir = self.sim_dir
+        temp_stim = sim_dir + "stim.sp"
+        telemetry.describe(sim_dir, mode.lower(), self.corner.name,
+                           period=self.period, target_time=target_time,
+                           related_slew=self.related_input_slew,
+                           constrained_slew=self.constrained_input_slew,
+                           correct_value=correct_value)
         self.sf = open(temp_stim, "w")
 
         self.write_header(correct_value)
@@ -61,13 +88,14 @@ class setup_hold():
         self.sf.write("\n* Stimulus for setup/hold: data {0} period {1}n\n".format(correct_value, self.period))
 
         # include files in stimulus file
-        self.model_list = tech.spice["fet_models"] + [self.model_location]
+        self.model_list = self.corner.models + [self.model_location]
         stimuli.write_include(stim_file=self.sf,
                               models=self.model_list)
+        stimuli.write_temp(self.sf, self.corner.temperature)
 
         # add vdd/gnd statements
         self.sf.write("\n* Global Power Supplies\n")
-        stimuli.write_supply(self.sf)
+        stimuli.write_supply(self.sf, self.vdd)
 
 
     def write_data(self, mode, target_time, correct_value):
@@ -93,7 +121,8 @@ class setup_hold():
                         data_values=[init_value, start_value, end_value],
                         period=target_time,
                         slew=self.constrained_input_slew,
-                        setup=0)        
+                        setup=0,
+                        vdd=self.vdd)
 
     def write_clock(self):
         """ Create the clock signal for setup/hold analysis. First period initializes the FF
@@ -109,7 +138,8 @@ class setup_hold():
                         data_values=[0, 1, 0, 1],
                         period=2*self.period,
                         slew=self.constrained_input_slew,
-                        setup=0)        
+                        setup=0,
+                        vdd=self.vdd)
 
 
 
@@ -182,58 +212,82 @@ class setup_hold():
             infeasible_bound = 1.5*self.period
             feasible_bound = 2.75*self.period
 
-        # Initial check if reference feasible bound time passes for correct_value, if not, we can't start the search!
-        self.write_stimulus(mode=mode, 
-                            target_time=feasible_bound, 
-                            correct_value=correct_value)
-        stimuli.run_sim()
-        ideal_clk_to_q = ch.convert_to_float(ch.parse_output("timing", "clk2q_delay"))
-        setuphold_time = ch.convert_to_float(ch.parse_output("timing", "setup_hold_time"))
-        debug.info(2,"*** {0} CHECK: {1} Ideal Clk-to-Q: {2} Setup/Hold: {3}".format(mode, correct_value,ideal_clk_to_q,setuphold_time))
+        # A resumed search continues from its last bounds
+        state = self.journaled()
+        if state != None:
+            (feasible_bound, infeasible_bound, passing_setuphold_time, ideal_clk_to_q) = state
+            debug.info(2,"Resuming {0} search between {1} and {2}".format(mode, feasible_bound, infeasible_bound))
+        else:
+            # Initial check if reference feasible bound time passes for correct_value, if not, we can't start the search!
+            self.write_stimulus(mode=mode, 
+                                target_time=feasible_bound, 
+                                correct_value=correct_value)
+            measurements = stimuli.run_sim(self.sim_dir)
+            ideal_clk_to_q = ch.get_measurement(measurements, "clk2q_delay")
+            setuphold_time = ch.get_measurement(measurements, "setup_hold_time")
+            debug.info(2,"*** {0} CHECK: {1} Ideal Clk-to-Q: {2} Setup/Hold: {3}".format(mode, correct_value,ideal_clk_to_q,setuphold_time))
 
-        if type(ideal_clk_to_q)!=float or type(setuphold_time)!=float:
-            debug.error("Initial hold time fails for data value feasible bound {0} Clk-to-Q {1} Setup/Hold {2}".format(feasible_bound,ideal_clk_to_q,setuphold_time),2)
+            if type(ideal_clk_to_q)!=float or type(setuphold_time)!=float:
+                debug.error("Initial hold time fails for data value feasible bound {0} Clk-to-Q {1} Setup/Hold {2}".format(feasible_bound,ideal_clk_to_q,setuphold_time),2)
 
-        if mode == "SETUP": # SETUP is clk-din, not din-clk
-            setuphold_time *= -1e9
-        else:
-            setuphold_time *= 1e9
+            if mode == "SETUP": # SETUP is clk-din, not din-clk
+                setuphold_time *= -1e9
+            else:
+                setuphold_time *= 1e9
             
-        passing_setuphold_time = setuphold_time
-        debug.info(2,"Checked initial {0} time {1}, data at {2}, clock at {3} ".format(mode,
-                                                                                       setuphold_time,
-                                                                                       feasible_bound,
-                                                                                       2*self.period))
+            passing_setuphold_time = setuphold_time
+            debug.info(2,"Checked initial {0} time {1}, data at {2}, clock at {3} ".format(mode,
+                                                                                           setuphold_time,
+                                                                                           feasible_bound,
+                                                                                           2*self.period))
+            self.journal([feasible_bound, infeasible_bound, passing_setuphold_time, ideal_clk_to_q])
         #raw_input("Press Enter to continue...")
-            
+
+        # Each step simulates k evenly spaced times from the feasible to the
+        # infeasible bound at once (k=1 is a bisection).
+        k = self.num_search_points
+        if k == None:
+            k = search_points()
+        if k == 1:
+            sim_dirs = [self.sim_dir]
+        else:
+            sim_dirs = [get_sim_dir("point{0}".format(i), self.sim_dir) for i in range(k)]
+
         while True:
-            target_time = (feasible_bound + infeasible_bound)/2
-            self.write_stimulus(mode=mode, 
-                                target_time=target_time, 
-                                correct_value=correct_value)
+            target_times = [feasible_bound + (infeasible_bound - feasible_bound) * (i+1) / (k+1) for i in range(k)]
+            for (target_time, sim_dir) in zip(target_times, sim_dirs):
+                self.write_stimulus(mode=mode, 
+                                    target_time=target_time, 
+                                    correct_value=correct_value,
+                                    sim_dir=sim_dir)
 
             debug.info(2,"{0} value: {1} Target time: {2} Infeasible: {3} Feasible: {4}".format(mode,
                                                                                                 correct_value,
-                                                                                                target_time,
+                                                                                                ", ".join(str(t) for t in target_times),
                                                                                                 infeasible_bound,
                                                                                                 feasible_bound))
 
 
-            stimuli.run_sim()
-            clk_to_q = ch.convert_to_float(ch.parse_output("timing", "clk2q_delay"))
-            setuphold_time = ch.convert_to_float(ch.parse_output("timing", "setup_hold_time"))
-            if type(clk_to_q)==float and (clk_to_q<1.1*ideal_clk_to_q) and type(setuphold_time)==float:
-                if mode == "SETUP": # SETUP is clk-din, not din-clk
-                    setuphold_time *= -1e9
+            results = sim_pool(k).run(sim_dirs)
+            # Move the feasible bound to the last passing time and the
+            # infeasible bound to the first failing one.
+            for (target_time, measurements) in zip(target_times, results):
+                clk_to_q = ch.get_measurement(measurements, "clk2q_delay")
+                setuphold_time = ch.get_measurement(measurements, "setup_hold_time")
+                if type(clk_to_q)==float and (clk_to_q<1.1*ideal_clk_to_q) and type(setuphold_time)==float:
+                    if mode == "SETUP": # SETUP is clk-din, not din-clk
+                        setuphold_time *= -1e9
+                    else:
+                        setuphold_time *= 1e9
+
+                    debug.info(2,"PASS Clk-to-Q: {0} Setup/Hold: {1}".format(clk_to_q,setuphold_time))
+                    passing_setuphold_time = setuphold_time
+                    feasible_bound = target_time
                 else:
-                    setuphold_time *= 1e9
-
-                debug.info(2,"PASS Clk-to-Q: {0} Setup/Hold: {1}".format(clk_to_q,setuphold_time))
-                passing_setuphold_time = setuphold_time
-                feasible_bound = target_time
-            else:
-                debug.info(2,"FAIL Clk-to-Q: {0} Setup/Hold: {1}".format(clk_to_q,setuphold_time))
-                infeasible_bound = target_time
+                    debug.info(2,"FAIL Clk-to-Q: {0} Setup/Hold: {1}".format(clk_to_q,setuphold_time))
+                    infeasible_bound = target_time
+                    break
+            self.journal([feasible_bound, infeasible_bound, passing_setuphold_time, ideal_clk_to_q])
 
             #raw_input("Press Enter to continue...")
             if ch.relative_compare(feasible_bound, infeasible_bound, error_tolerance=0.001):
@@ -267,39 +321,134 @@ class setup_hold():
         return self.bidir_search(0, "HOLD")
 
 
+    def search(self, related_slew, constrained_slew, correct_value, mode):
+        """ Runs one setup or hold search for a pair of slews. The search
+        has its own copy of the characterizer and its own simulation
+        directory so that several searches can run at once.
+        """
+        job = copy.copy(self)
+        job.related_input_slew = related_slew
+        job.constrained_input_slew = constrained_slew
+        job.sim_dir = get_sim_dir("setup_hold_{0}_{1}_{2}_{3}".format(mode.lower(),
+                                                                      correct_value,
+                                                                      related_slew,
+                                                                      constrained_slew),
+                                  self.corner.sim_dir)
+        # A search that an earlier run finished isn't run again
+        job.search_item = "{0} {1} {2!r} {3!r}".format(mode.lower(), correct_value, related_slew, constrained_slew)
+        result = job.journaled(finished=True)
+        if result == None:
+            result = job.bidir_search(correct_value, mode)
+            job.journal(result, finished=True)
+        return result
+
+
+    def journaled(self, finished=False):
+        """ Returns the last bounds of the running search in the checkpoint
+        (or its result if finished) or None. """
+        if not self.checkpoint or self.search_item == None:
+            return None
+        return self.checkpoint.get(self.analysis, self.search_item + (" result" if finished else ""))
+
+
+    def journal(self, value, finished=False):
+        """ Records the bounds of the running search in the checkpoint (or
+        its result if finished). """
+        if self.checkpoint and self.search_item != None:
+            self.checkpoint.put(self.analysis, self.search_item + (" result" if finished else ""), value)
+
+
     def analyze(self, related_slews, constrained_slews):
         """main function to calculate both setup and hold time for the
         DFF and returns a dictionary that contains 4 lists for both
         setup/hold times for high_to_low and low_to_high transitions
         for all the slew combinations of the data and clock.
         """
-        LH_setup = []
-        HL_setup = []
-        LH_hold = []
-        HL_hold = []
-        for self.related_input_slew in related_slews:
-            for self.constrained_input_slew in constrained_slews:
-                debug.info(1, "Clock slew: {0} Data slew: {1}".format(self.related_input_slew,self.constrained_input_slew))
-                LH_setup_time = self.setup_LH_time()
-                debug.info(1, "  Setup Time for low_to_high transistion: {0}".format(LH_setup_time))
-                HL_setup_time = self.setup_HL_time()
-                debug.info(1, "  Setup Time for high_to_low transistion: {0}".format(HL_setup_time))
-                LH_hold_time = self.hold_LH_time()
-                debug.info(1, "  Hold Time for low_to_high transistion: {0}".format(LH_hold_time))
-                HL_hold_time = self.hold_HL_time()
-                debug.info(1, "  Hold Time for high_to_low transistion: {0}".format(HL_hold_time))
-                LH_setup.append(LH_setup_time)
-                HL_setup.append(HL_setup_time)
-                LH_hold.append(LH_hold_time)
-                HL_hold.append(HL_hold_time)
-                
-        times = {"setup_times_LH": LH_setup,
-                 "setup_times_HL": HL_setup,
-                 "hold_times_LH": LH_hold,
-                 "hold_times_HL": HL_hold
+        # The flip-flop is the same in every SRAM of the technology, so
+        # its tables are reused from earlier runs.
+        store = sim_cache.get_store("setup_hold")
+        if store:
+            key = self.table_key(store, related_slews, constrained_slews)
+            times = store.load(key)
+            if times != None:
+                debug.info(1, "Reusing the setup/hold times {0}".format(key))
+                return dict((str(k), v) for (k, v) in times.items())
+
+        # The searches that an earlier run finished are skipped
+        self.checkpoint = checkpoint.get_checkpoint()
+        if self.checkpoint:
+            self.analysis = self.checkpoint.key(self.corner.models + [self.model_location],
+                                                self.table_params(related_slews, constrained_slews))
+
+        times = self.simulate_tables(related_slews, constrained_slews)
+        if store:
+            store.put(key, times)
+        return times
+
+    def table_key(self, store, related_slews, constrained_slews):
+        """ Returns the key of the setup/hold tables. It depends on the
+        flip-flop netlist, the spice models, the supply, the temperature,
+        the slews and how the simulations run. """
+        digest = hashlib.sha1()
+        for filename in self.corner.models + [self.model_location]:
+            digest.update(store.file_digest(filename))
+        digest.update(repr(self.table_params(related_slews, constrained_slews)))
+        return digest.hexdigest()
+
+    def table_params(self, related_slews, constrained_slews):
+        """ Returns the parameters of the tables besides the netlists. """
+        return [self.vdd,
+                self.gnd,
+                self.corner.temperature,
+                self.period,
+                list(related_slews),
+                list(constrained_slews),
+                OPTS.spice_name,
+                OPTS.sim_backend,
+                OPTS.adaptive_lut and OPTS.lut_tolerance]
+
+    def simulate_tables(self, related_slews, constrained_slews):
+        """ Simulates the setup/hold times of analyze. """
+        if OPTS.adaptive_lut:
+            results = lut_sampler(related_slews, constrained_slews, self.simulate_points).sample()
+        else:
+            results = self.simulate_points([(related_slew, constrained_slew)
+                                            for related_slew in related_slews
+                                            for constrained_slew in constrained_slews])
+        times = {"setup_times_LH": [r[0] for r in results],
+                 "setup_times_HL": [r[1] for r in results],
+                 "hold_times_LH": [r[2] for r in results],
+                 "hold_times_HL": [r[3] for r in results]
                  }
         return times
 
+    def simulate_points(self, slew_points):
+        """ Simulates the setup/hold times at each (related slew,
+        constrained slew) point and returns the (LH setup, HL setup, LH
+        hold, HL hold) of each. """
+        # All of the searches are independent, so run them at once and
+        # put the results back in the table order.
+        searches = [(1, "SETUP"), (0, "SETUP"), (1, "HOLD"), (0, "HOLD")]
+        jobs = []
+        for (related_slew, constrained_slew) in slew_points:
+            for (correct_value, mode) in searches:
+                jobs.append((related_slew, constrained_slew, correct_value, mode))
+        # Spare simulation slots go to the points of each search step
+        self.num_search_points = search_points(len(jobs))
+        results = sim_pool().map(self.search, jobs)
+
+        times = []
+        for i in range(0, len(results), len(searches)):
+            (related_slew, constrained_slew, correct_value, mode) = jobs[i]
+            (LH_setup_time, HL_setup_time, LH_hold_time, HL_hold_time) = results[i:i+len(searches)]
+            debug.info(1, "Clock slew: {0} Data slew: {1}".format(related_slew,constrained_slew))
+            debug.info(1, "  Setup Time for low_to_high transistion: {0}".format(LH_setup_time))
+            debug.info(1, "  Setup Time for high_to_low transistion: {0}".format(HL_setup_time))
+            debug.info(1, "  Hold Time for low_to_high transistion: {0}".format(LH_hold_time))
+            debug.info(1, "  Hold Time for high_to_low transistion: {0}".format(HL_hold_time))
+            times.append((LH_setup_time, HL_setup_time, LH_hold_time, HL_hold_time))
+        return times
+
     def analytical_model(self,related_slews, constrained_slews):
         """ Just return the fixed setup/hold times from the technology.
         """
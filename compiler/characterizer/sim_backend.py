@@ -0,0 +1,583 @@
+"""
+The simulator backends run a stimulus file and leave the measurements in
+the timing file of its simulation directory, where charutils parses them.
+
+The batch backend starts a new simulator process for every stimulus. The
+session backend keeps interactive ngspice processes (in pipe mode) alive
+between simulations. When a stimulus only differs from the circuit that a
+session has loaded in the values of its sources and capacitors, the
+changed elements are altered and the transient is run again, so the models
+and the SRAM netlist aren't parsed again. Otherwise, the stimulus is
+sourced into the session.
+
+The mock and replay backends write measurements without a simulator, from
+a model of the circuit or from a recording of earlier simulations. The
+queue backend has workers on any host simulate them (see sim_queue).
+
+The simulators are watched (see simulate): a simulator that runs longer
+than sim_timeout is killed with the processes it started, and a
+simulation that fails, times out or has no measurements is retried with
+relaxed options. If every attempt fails, the simulation has no measurements, so
+the analysis treats it like any failed point.
+"""
+
+import os
+import re
+import atexit
+import signal
+import threading
+import subprocess
+import debug
+import mock_sim
+import sim_pool
+import sim_cache
+import sim_queue
+import raw_waveforms
+import charutils as ch
+from globals import OPTS
+
+
+class batch_backend():
+    """
+    Runs each stimulus in a new simulator process.
+    """
+
+    def command(self, temp_stim, sim_dir):
+        """ Returns the simulator command line and its largest valid return code. """
+        debug.check(OPTS.spice_exe!="","No spice simulator has been found.")
+        if OPTS.spice_name == "xa":
+            # Output the xa configurations here. FIXME: Move this to write it once.
+            xa_cfg = open("{}xa.cfg".format(sim_dir), "w")
+            xa_cfg.write("set_sim_level -level 7\n")
+            xa_cfg.write("set_powernet_level 7 -node vdd\n")
+            xa_cfg.close()
+            cmd = "{0} {1} -c {2}xa.cfg -o {2}xa -mt {3}".format(OPTS.spice_exe,
+                                                                 temp_stim,
+                                                                 sim_dir,
+                                                                 sim_pool.num_threads())
+            valid_retcode=0
+        elif OPTS.spice_name == "hspice":
+            cmd = "{0} -mt {3} -i {1} -o {2}timing".format(OPTS.spice_exe,
+                                                           temp_stim,
+                                                           sim_dir,
+                                                           sim_pool.num_threads())
+            valid_retcode=0
+        else:
+            if raw_waveforms.enabled():
+                # The waveforms are measured instead (see run)
+                cmd = "{0} -b -r {2} -o {3} {1}".format(OPTS.spice_exe,
+                                                        temp_stim,
+                                                        raw_waveforms.raw_file(sim_dir),
+                                                        raw_waveforms.log_file(sim_dir))
+            else:
+                cmd = "{0} -b -o {2}timing.lis {1}".format(OPTS.spice_exe,
+                                                           temp_stim,
+                                                           sim_dir)
+            # for some reason, ngspice-25 returns 1 when it only has acceptable warnings
+            valid_retcode=1
+        return (cmd, valid_retcode)
+
+    # The simulator may hang or fail to converge (see simulate)
+    watched = True
+
+    def run(self, temp_stim, sim_dir):
+        """ Simulates the stimulus and writes the measurements to sim_dir.
+        Returns the return code of the simulator or None if it failed. """
+        raw = raw_waveforms.enabled()
+        if raw:
+            # Only the waveforms of the measurements are saved
+            stim = raw_waveforms.prepare(temp_stim, sim_dir)
+            if os.path.isfile(raw_waveforms.raw_file(sim_dir)):
+                os.remove(raw_waveforms.raw_file(sim_dir))
+        else:
+            stim = temp_stim
+        (cmd, valid_retcode) = self.command(stim, sim_dir)
+        spice_stdout = open("{0}spice_stdout.log".format(sim_dir), 'w')
+        spice_stderr = open("{0}spice_stderr.log".format(sim_dir), 'w')
+
+        debug.info(3, cmd)
+        # The simulator gets its own process group so that the watchdog
+        # kills the shell and the simulator
+        process = subprocess.Popen(cmd, stdout=spice_stdout, stderr=spice_stderr, shell=True,
+                                   preexec_fn=os.setsid)
+        dog = watchdog(process)
+        retcode = process.wait()
+        self.timed_out = dog.stop()
+
+        spice_stdout.close()
+        spice_stderr.close()
+
+        if self.timed_out:
+            debug.warning("Spice simulation timed out after {0}s: {1}".format(OPTS.sim_timeout, cmd))
+            return None
+        if (retcode > valid_retcode):
+            debug.warning("Spice simulation error {0}: {1}".format(retcode, cmd))
+            return None
+        if raw:
+            if not os.path.isfile(raw_waveforms.raw_file(sim_dir)):
+                debug.warning("Spice simulation wrote no waveforms: {0}".format(cmd))
+                return None
+            raw_waveforms.write_measurements(temp_stim, sim_dir)
+        return retcode
+
+
+class watchdog():
+    """
+    Kills the process group of a simulator that runs longer than
+    sim_timeout seconds (0 is no limit).
+    """
+
+    def __init__(self, process):
+        self.process = process
+        self.expired = False
+        self.timer = None
+        if OPTS.sim_timeout > 0:
+            self.timer = threading.Timer(OPTS.sim_timeout, self.kill)
+            self.timer.daemon = True
+            self.timer.start()
+
+    def kill(self):
+        self.expired = True
+        try:
+            os.killpg(self.process.pid, signal.SIGKILL)
+        except OSError:
+            pass
+
+    def stop(self):
+        """ Stops watching and returns whether the process was killed. """
+        if self.timer:
+            self.timer.cancel()
+            self.timer.join()
+        return self.expired
+
+
+# The parameter of each kind of independent source that alter changes
+source_params = ["pwl", "pulse", "dc"]
+
+class ngspice_session():
+    """
+    An interactive ngspice process that simulates one stimulus at a time.
+    The .tran and .meas cards of a stimulus are run as commands, so the
+    circuit that is loaded doesn't include them.
+    """
+
+    # Printed after each group of commands to find the end of their output
+    sentinel = "openram_session_done"
+
+    def __init__(self):
+        debug.check(OPTS.spice_exe!="","No spice simulator has been found.")
+        cmd = "{0} -p".format(OPTS.spice_exe)
+        debug.info(3, cmd)
+        self.process = subprocess.Popen(cmd,
+                                        shell=True,
+                                        stdin=subprocess.PIPE,
+                                        stdout=subprocess.PIPE,
+                                        stderr=subprocess.STDOUT,
+                                        preexec_fn=os.setsid)
+        # The structure and element values of the loaded circuit
+        self.structure = None
+        self.elements = {}
+        self.log = None
+        # Whether the process ended (or was killed) and whether the last
+        # simulation ran out of time
+        self.ended = False
+        self.timed_out = False
+        self.command(["set noaskquit", "set nomoremode",
+                      "set num_threads={0}".format(sim_pool.num_threads())])
+
+    def command(self, cmds):
+        """ Sends the commands to ngspice and returns their output lines. """
+        try:
+            for cmd in cmds:
+                debug.info(4, cmd)
+                self.process.stdin.write(cmd + "\n")
+            self.process.stdin.write("echo {0}\n".format(self.sentinel))
+            self.process.stdin.flush()
+        except (IOError, OSError):
+            self.ended = True
+            debug.error("The ngspice session ended unexpectedly.", -1)
+
+        lines = []
+        while True:
+            line = self.process.stdout.readline()
+            if line == "":
+                self.ended = True
+                debug.error("The ngspice session ended unexpectedly:\n{0}".format("".join(lines)), -1)
+            if line.strip() == self.sentinel:
+                break
+            if self.log:
+                self.log.write(line)
+            lines.append(line)
+        return lines
+
+    def close(self):
+        """ Ends the ngspice process. """
+        try:
+            self.process.stdin.write("quit\n")
+            self.process.stdin.close()
+        except (IOError, OSError):
+            pass
+        self.process.wait()
+
+    def run(self, temp_stim, sim_dir):
+        """ Simulates the stimulus and writes the measurements to sim_dir. """
+        (circuit, tran, measures) = split_stimulus(temp_stim)
+        (structure, elements) = circuit_structure(circuit)
+        self.log = open("{0}spice_stdout.log".format(sim_dir), 'w')
+
+        # A killed session ends, which fails the command that waits on it
+        dog = watchdog(self.process)
+        try:
+            if not self.alter(structure, elements):
+                self.load(circuit, structure, elements, sim_dir)
+
+            self.command([tran])
+            measure_names = [m.split()[2].lower() for m in measures]
+            lines = self.command(measures + ["destroy all"])
+        finally:
+            self.timed_out = dog.stop()
+            if self.timed_out:
+                debug.warning("Spice simulation timed out after {0}s: {1}".format(OPTS.sim_timeout, temp_stim))
+            self.log.close()
+            self.log = None
+
+        # Only keep the results of the measurements. A measurement that
+        # ngspice couldn't make has no result and is marked as failed.
+        results = {}
+        for line in lines:
+            (name, sep, value) = line.partition("=")
+            name = name.strip().lower()
+            if sep and name in measure_names and name not in results:
+                results[name] = line.strip()
+        timing = open("{0}timing.lis".format(sim_dir), "w")
+        for name in measure_names:
+            timing.write(results.get(name, "{0} = failed".format(name)) + "\n")
+        timing.close()
+
+    def alter(self, structure, elements):
+        """ Changes the elements of the loaded circuit to the given values.
+        Returns False if the circuit has to be loaded again instead. """
+        if structure != self.structure:
+            return False
+
+        cmds = []
+        for (name, value) in elements.items():
+            if value != self.elements[name]:
+                cmd = alter_command(name, value)
+                if cmd == None:
+                    return False
+                cmds.append(cmd)
+        if len(cmds) == 0:
+            return True
+
+        debug.info(3, "Altering {0} elements of the ngspice session".format(len(cmds)))
+        lines = self.command(cmds)
+        if any("error" in line.lower() for line in lines):
+            debug.info(2, "Unable to alter the ngspice session: {0}".format("".join(lines)))
+            return False
+        self.elements = elements
+        return True
+
+    def load(self, circuit, structure, elements, sim_dir):
+        """ Sources the circuit into the session in place of the loaded one. """
+        circuit_name = "{0}session.sp".format(sim_dir)
+        circuit_file = open(circuit_name, "w")
+        circuit_file.write("\n".join(circuit))
+        circuit_file.write("\n.end\n")
+        circuit_file.close()
+
+        cmds = []
+        if self.structure != None:
+            cmds.append("remcirc")
+        cmds.append("source {0}".format(circuit_name))
+        debug.info(3, "Loading {0} in the ngspice session".format(circuit_name))
+        self.command(cmds)
+        self.structure = structure
+        self.elements = elements
+
+
+def split_stimulus(temp_stim):
+    """ Splits a stimulus into the lines of its circuit, the transient
+    command and the measurement commands. Continuation lines are joined. """
+    f = open(temp_stim, "r")
+    lines = []
+    for line in f:
+        line = line.rstrip()
+        if line.startswith("+") and len(lines) > 0:
+            lines[-1] += " " + line[1:]
+        else:
+            lines.append(line)
+    f.close()
+
+    circuit = []
+    tran = None
+    measures = []
+    for line in lines:
+        card = line.strip().lower()
+        if card.startswith(".tran"):
+            tran = "tran " + line.strip().split(None, 1)[1]
+        elif card.startswith(".meas"):
+            measures.append("meas " + line.strip().split(None, 1)[1])
+        elif card.startswith(".end") and not card.startswith(".ends"):
+            break
+        else:
+            circuit.append(line)
+    debug.check(tran != None, "No .tran card in {0}".format(temp_stim))
+    return (circuit, tran, measures)
+
+
+def circuit_structure(circuit):
+    """ Returns the circuit with the values of its top-level capacitors and
+    voltage sources left out and a dictionary of those values by name. Two
+    circuits with the same structure only differ in these values. """
+    structure = []
+    elements = {}
+    subckt = False
+    for line in circuit:
+        words = line.split(None, 3)
+        card = line.strip().lower()
+        if card.startswith(".subckt"):
+            subckt = True
+        elif card.startswith(".ends"):
+            subckt = False
+        elif not subckt and len(words) == 4 and words[0][0].lower() in "cv":
+            name = words[0].lower()
+            structure.append(" ".join(words[0:3]).lower())
+            elements[name] = words[3].strip()
+            continue
+        elif card.startswith(".include"):
+            # an included file may change without changing its name
+            filename = line.split(None, 1)[1].strip().strip('"')
+            if os.path.isfile(filename):
+                stat = os.stat(filename)
+                line = "{0} {1} {2}".format(line, stat.st_size, stat.st_mtime)
+        # comments don't change the circuit
+        if not card.startswith("*"):
+            structure.append(line)
+    return ("\n".join(structure), elements)
+
+
+def alter_command(name, value):
+    """ Returns the ngspice command that sets an element to a value or None
+    if it can't be altered. """
+    if name.startswith("c"):
+        return "alter {0} = {1}".format(name, value)
+
+    if re.match(r"^[-+]?[\d.]+\w*$", value):
+        return "alter {0} dc = {1}".format(name, value)
+    m = re.match(r"^(\w+)\s*\(?([^)]*)\)?\s*$", value)
+    if not m or m.group(1).lower() not in source_params:
+        return None
+    param = m.group(1).lower()
+    # ngspice vectors don't take the volt units of the cards
+    values = [re.sub(r"(?<=\d)v$", "", v, flags=re.IGNORECASE) for v in m.group(2).split()]
+    if param == "dc":
+        return "alter {0} dc = {1}".format(name, " ".join(values))
+    return "alter {0} {1} = [ {2} ]".format(name, param, " ".join(values))
+
+
+# The idle sessions. A thread takes one (or starts one) for each simulation
+# and returns it after, so there is one session per running simulation.
+session_lock = threading.Lock()
+idle_sessions = []
+
+class session_backend():
+    """
+    Runs each stimulus on an idle ngspice session.
+    """
+
+    # The simulator may hang or fail to converge (see simulate)
+    watched = True
+
+    def run(self, temp_stim, sim_dir):
+        with session_lock:
+            if len(idle_sessions) > 0:
+                session = idle_sessions.pop()
+            else:
+                session = None
+        if session == None:
+            session = ngspice_session()
+
+        self.timed_out = False
+        try:
+            session.run(temp_stim, sim_dir)
+        except AssertionError:
+            session.close()
+            # A session that ended or was killed fails the simulation.
+            # Any other error is a bug.
+            if session.ended:
+                self.timed_out = session.timed_out
+                return None
+            raise
+        except:
+            # The state of the session is unknown after an error
+            session.close()
+            raise
+        with session_lock:
+            idle_sessions.append(session)
+        return 0
+
+
+def close_sessions():
+    """ Ends all the idle ngspice sessions. """
+    with session_lock:
+        sessions = list(idle_sessions)
+        del idle_sessions[:]
+    for session in sessions:
+        session.close()
+
+atexit.register(close_sessions)
+
+
+class mock_backend():
+    """
+    Writes the measurements of the mock simulator (see mock_sim).
+    """
+
+    def run(self, temp_stim, sim_dir):
+        mock_sim.run(temp_stim, ch.get_output_file("timing", sim_dir))
+        return 0
+
+
+class replay_backend():
+    """
+    Writes the measurements that were recorded for the same stimulus in
+    the simulation cache of sim_replay_dir. Any run with that directory as
+    its sim_cache_dir records them.
+    """
+
+    def __init__(self):
+        self.recording = sim_cache.sim_cache(OPTS.sim_replay_dir, OPTS.sim_cache_size)
+
+    def run(self, temp_stim, sim_dir):
+        measurements = self.recording.get(self.recording.key(temp_stim))
+        if measurements == None:
+            debug.error("No recorded simulation of {0} in {1}".format(temp_stim, OPTS.sim_replay_dir), -1)
+        write_measurements(measurements, ch.get_output_file("timing", sim_dir))
+        return 0
+
+
+class queue_backend():
+    """
+    Submits each stimulus to the queue directory and waits for a worker
+    to simulate it (see sim_queue). The workers watch and retry their
+    simulations, so this backend isn't watched again. A job that runs
+    past its deadline has no measurements.
+    """
+
+    def run(self, temp_stim, sim_dir):
+        queue = sim_queue.get_queue()
+        result = queue.collect(queue.submit(temp_stim))
+        if result == None:
+            write_measurements({}, ch.get_output_file("timing", sim_dir))
+            return None
+        if "error" in result:
+            debug.error("Simulation job {0} of {1} failed on {2}:\n{3}".format(result["id"],
+                                                                            temp_stim,
+                                                                            result["host"],
+                                                                            result["error"]), -1)
+        debug.info(3, "Job {0} ran on {1} in {2:.1f}s".format(result["id"], result["host"], result["wall_time"]))
+        write_measurements(result["measurements"], ch.get_output_file("timing", sim_dir))
+        return result["return_code"]
+
+
+def simulate(backend, temp_stim, sim_dir):
+    """ Simulates the stimulus with a backend and leaves the measurements
+    in sim_dir. A watched simulation that fails (or times out) or has no
+    measurements is retried with relaxed options up to sim_retries times.
+    The time steps only shrink after a failure; a simulation that timed out
+    would take even longer with them. Returns the return code of the simulator or None if every attempt
+    failed, in which case there are no measurements. """
+    if not getattr(backend, "watched", False):
+        return backend.run(temp_stim, sim_dir)
+
+    output_file = ch.get_output_file("timing", sim_dir)
+    stim = temp_stim
+    timed_out = False
+    for attempt in range(OPTS.sim_retries + 1):
+        if attempt > 0:
+            stim = relax_stimulus(temp_stim, sim_dir, attempt, timed_out)
+            debug.warning("Retrying the failed simulation of {0} with relaxed options: {1}".format(temp_stim, stim))
+        # A failed simulator may leave the output of the last attempt
+        if os.path.isfile(output_file):
+            os.remove(output_file)
+        return_code = backend.run(stim, sim_dir)
+        if return_code != None and os.path.isfile(output_file) and len(ch.parse_measurements("timing", sim_dir)) > 0:
+            return return_code
+        timed_out = getattr(backend, "timed_out", False)
+
+    debug.warning("Simulation of {0} failed after {1} attempts.".format(temp_stim, OPTS.sim_retries + 1))
+    write_measurements({}, output_file)
+    return None
+
+
+def relax_stimulus(temp_stim, sim_dir, attempt, timed_out=False):
+    """ Writes a copy of a stimulus with relaxed simulator options for a
+    retry and returns its name. The first retry uses the other
+    integration method (trapezoid or gear) with a looser relative
+    tolerance. The later ones use gear with a looser tolerance yet and
+    halve the time steps for each retry, unless the last attempt timed
+    out. """
+    f = open(temp_stim, "r")
+    lines = f.read().splitlines()
+    f.close()
+
+    method = "gear"
+    for line in lines:
+        if line.upper().startswith(".OPTIONS") and "method=gear" in line.lower():
+            method = "trap"
+    if attempt == 1:
+        options = "method={0} reltol=0.005".format(method)
+        step_scale = 1.0
+    else:
+        options = "method=gear reltol=0.01"
+        step_scale = 1.0 if timed_out else 0.5**(attempt - 1)
+
+    relaxed = []
+    for line in lines:
+        words = line.split()
+        if len(words) > 0 and words[0].upper() == ".OPTIONS":
+            words = [w for w in words if not w.lower().startswith(("method=", "reltol="))]
+            line = " ".join(words)
+        elif len(words) > 0 and words[0].upper() == ".TRAN":
+            # The time steps are the odd words (the stop times are the even ones)
+            for i in range(1, len(words), 2):
+                if words[i].upper() != "UIC":
+                    words[i] = "{0:g}".format(ch.convert_to_float(words[i]) * step_scale)
+            line = " ".join(words) + "\n.OPTIONS {0}".format(options)
+        relaxed.append(line)
+
+    relaxed_stim = "{0}stim_retry{1}.sp".format(sim_dir, attempt)
+    f = open(relaxed_stim, "w")
+    f.write("\n".join(relaxed) + "\n")
+    f.close()
+    return relaxed_stim
+
+
+def write_measurements(measurements, output_file):
+    """ Writes parsed measurements as an output file that parses to the
+    same measurements. The repeats of a measurement (name@n) follow it. """
+    def order(name):
+        (base, sep, repeat) = name.partition("@")
+        return (base, int(repeat or 0))
+    f = open(output_file, "w")
+    for name in sorted(measurements.keys(), key=order):
+        f.write("{0} = {1}\n".format(name.partition("@")[0], measurements[name]))
+    f.close()
+
+
+def get_backend():
+    """ Returns the backend of the simulator option. """
+    if OPTS.sim_backend == "session":
+        if OPTS.spice_name == "ngspice":
+            return session_backend()
+        debug.info(1, "Simulator sessions need ngspice. Running {0} in batch mode.".format(OPTS.spice_name))
+    elif OPTS.sim_backend == "mock":
+        return mock_backend()
+    elif OPTS.sim_backend == "replay":
+        return replay_backend()
+    elif OPTS.sim_backend == "queue":
+        return queue_backend()
+    elif OPTS.sim_backend != "batch":
+        debug.error("Unknown simulator backend: {0}".format(OPTS.sim_backend), -1)
+    return batch_backend()
@@ -0,0 +1,172 @@
+"""
+This is an on-disk cache of simulation results. The key of a result is
+a hash of the stimulus, the files that it includes (the netlist and the
+spice models) and the simulator so that an unchanged simulation never
+runs twice. The least recently used results are evicted when the cache
+has more than a given number of entries.
+"""
+
+import os
+import re
+import json
+import hashlib
+import threading
+import debug
+import raw_waveforms
+from globals import OPTS
+
+
+class sim_cache():
+    """
+    Stores a dictionary of measurements for each simulation key.
+    """
+
+    def __init__(self, cache_dir, max_entries):
+        self.cache_dir = cache_dir
+        if not self.cache_dir.endswith('/'):
+            self.cache_dir += "/"
+        self.max_entries = max_entries
+        try:
+            os.makedirs(self.cache_dir, 0o750)
+        except OSError as e:
+            if e.errno != 17:  # errno.EEXIST
+                debug.error("Unable to make simulation cache directory: {0}".format(self.cache_dir),-1)
+
+        self.lock = threading.Lock()
+        # The digests of included files by name, size and modification time
+        # so that a big netlist is only read once.
+        self.file_digests = {}
+        self.num_entries = len(self.entries())
+
+    def entries(self):
+        """ Returns the names of the cache entries. """
+        return [f for f in os.listdir(self.cache_dir) if f.endswith(".json")]
+
+    def file_digest(self, filename):
+        """ Returns the digest of the contents of a file. """
+        stat = os.stat(filename)
+        file_key = (filename, stat.st_size, stat.st_mtime)
+        with self.lock:
+            if file_key in self.file_digests:
+                return self.file_digests[file_key]
+        digest = hashlib.sha1()
+        f = open(filename, "rb")
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+        f.close()
+        with self.lock:
+            self.file_digests[file_key] = digest.hexdigest()
+        return digest.hexdigest()
+
+    def key(self, stim_name):
+        """ Returns the key of a stimulus file and everything it includes. """
+        f = open(stim_name, "r")
+        stim = f.read()
+        f.close()
+        # The included files are identified by their contents and not by
+        # their names since the temp dir changes in every run.
+        stim = re.sub(r"^(\.include\s+)\"?([^\"\s]+)\"?",
+                      lambda m: m.group(1) + self.file_digest(m.group(2)),
+                      stim,
+                      flags=re.MULTILINE|re.IGNORECASE)
+        # The threads of the simulator don't change the results
+        stim = re.sub(r"\s+num_threads=\d+", "", stim, flags=re.IGNORECASE)
+        digest = hashlib.sha1()
+        digest.update(OPTS.spice_name)
+        if raw_waveforms.enabled():
+            # The measurements of the waveforms may differ in the last digits
+            digest.update("raw")
+        digest.update(stim)
+        return digest.hexdigest()
+
+    def entry_name(self, key):
+        return "{0}{1}.json".format(self.cache_dir, key)
+
+    def load(self, key):
+        """ Returns the cached value of a key or None if it isn't cached. """
+        name = self.entry_name(key)
+        try:
+            f = open(name, "r")
+            value = json.load(f)
+            f.close()
+        except (IOError, ValueError):
+            return None
+        # Mark the entry as recently used
+        try:
+            os.utime(name, None)
+        except OSError:
+            pass
+        return value
+
+    def get(self, key):
+        """ Returns the cached measurements of a key or None if they aren't cached. """
+        measurements = self.load(key)
+        if measurements == None:
+            return None
+        return dict((str(k), str(v)) for (k, v) in measurements.items())
+
+    def put(self, key, measurements):
+        """ Stores the measurements (or any JSON value) of a key. """
+        name = self.entry_name(key)
+        # Write to a temporary file and rename it so that other jobs never
+        # see a partial entry.
+        temp_name = "{0}.{1}.{2}".format(name, os.getpid(), threading.current_thread().ident)
+        f = open(temp_name, "w")
+        json.dump(measurements, f)
+        f.close()
+        os.rename(temp_name, name)
+
+        with self.lock:
+            self.num_entries += 1
+            evict = self.num_entries > self.max_entries
+        if evict:
+            self.evict()
+
+    def evict(self):
+        """ Removes the least recently used entries until the cache has
+        a tenth less than the maximum number of entries. """
+        with self.lock:
+            entries = []
+            for f in self.entries():
+                try:
+                    entries.append((os.path.getmtime(self.cache_dir + f), f))
+                except OSError:
+                    pass
+            entries.sort()
+            num_remove = max(0, len(entries) - int(0.9 * self.max_entries))
+            debug.info(2,"Evicting {0} simulation cache entries".format(num_remove))
+            for (mtime, f) in entries[:num_remove]:
+                try:
+                    os.remove(self.cache_dir + f)
+                except OSError:
+                    pass
+            self.num_entries = len(entries) - num_remove
+
+
+# The cache of this run. It is created on first use so that the config
+# file and the command line can change the options.
+cache = None
+
+def get_cache():
+    """ Returns the simulation cache or None if it is disabled. """
+    global cache
+    if not OPTS.use_sim_cache:
+        return None
+    if cache == None or cache.cache_dir.rstrip('/') != OPTS.sim_cache_dir.rstrip('/') or cache.max_entries != OPTS.sim_cache_size:
+        cache = sim_cache(OPTS.sim_cache_dir, OPTS.sim_cache_size)
+    return cache
+
+
+# The stores of characterization results by directory
+stores = {}
+
+def get_store(name):
+    """ Returns the store of a kind of characterization result in the
+    technology (a cache in a subdirectory of the simulation cache) or None
+    if the cache is disabled. """
+    if not OPTS.use_sim_cache:
+        return None
+    store_dir = "{0}/{1}/{2}/".format(OPTS.sim_cache_dir.rstrip('/'), name, OPTS.tech_name)
+    if store_dir not in stores:
+        stores[store_dir] = sim_cache(store_dir, OPTS.sim_cache_size)
+    return stores[store_dir]
@@ -0,0 +1,139 @@
+"""
+This runs independent simulations concurrently. Each simulation job
+gets its own working directory so that the stimulus and output files of
+different jobs don't overwrite each other.
+"""
+
+import os
+import re
+import threading
+import multiprocessing
+from multiprocessing.pool import ThreadPool
+import debug
+import stimuli
+from globals import OPTS
+
+# Bounds the number of simulator processes that run at once. It is
+# created on first use so that the config file can set num_sim_jobs.
+slot_lock = threading.Lock()
+slots = None
+slots_size = 0
+
+# The environment variables with the number of CPUs that a batch
+# scheduler gave the job (Slurm, Grid Engine, LSF and PBS)
+scheduler_cpus = ["SLURM_CPUS_PER_TASK", "NSLOTS", "LSB_DJOB_NUMPROC", "NCPUS", "PBS_NP"]
+
+def num_cpus():
+    """ Returns the number of CPUs that the simulations may use: the CPUs
+    of the batch scheduler job or else the CPUs that this process may run
+    on (its affinity), which may be fewer than the CPUs of the host. """
+    for name in scheduler_cpus:
+        try:
+            cpus = int(os.environ.get(name, ""))
+        except ValueError:
+            continue
+        if cpus > 0:
+            return cpus
+    try:
+        f = open("/proc/self/status", "r")
+        status = f.read()
+        f.close()
+        m = re.search(r"^Cpus_allowed_list:\s*(\S+)", status, re.MULTILINE)
+        cpus = 0
+        for span in m.group(1).split(","):
+            (first, sep, last) = span.partition("-")
+            cpus += int(last or first) - int(first) + 1
+        if cpus > 0:
+            return cpus
+    except (IOError, AttributeError, ValueError):
+        pass
+    return multiprocessing.cpu_count()
+
+# The threads of each simulator if neither num_sim_jobs nor sim_threads is
+# set (hspice and xa always ran with -mt 2)
+default_threads = 2
+
+def split():
+    """ Returns the number of simulations that may run at once and the
+    number of threads of each simulator. The options that aren't set
+    share the CPUs: by default, each simulation has default_threads
+    threads and there is a simulation for every default_threads CPUs. """
+    cpus = num_cpus()
+    if OPTS.num_sim_jobs > 0 and OPTS.sim_threads > 0:
+        return (OPTS.num_sim_jobs, OPTS.sim_threads)
+    if OPTS.num_sim_jobs > 0:
+        return (OPTS.num_sim_jobs, max(1, cpus // OPTS.num_sim_jobs))
+    if OPTS.sim_threads > 0:
+        return (max(1, cpus // OPTS.sim_threads), OPTS.sim_threads)
+    return (max(1, cpus // default_threads), default_threads)
+
+def num_jobs():
+    """ Returns the number of simulations that may run at once. """
+    return split()[0]
+
+def num_threads():
+    """ Returns the number of threads of each simulator process. """
+    return split()[1]
+
+def get_slots():
+    """ Returns the semaphore that bounds the running simulations. """
+    global slots, slots_size
+    with slot_lock:
+        if slots == None or slots_size != num_jobs():
+            slots_size = num_jobs()
+            slots = threading.BoundedSemaphore(slots_size)
+    return slots
+
+def search_points(num_searches=1):
+    """ Returns how many candidate points each of num_searches concurrent
+    searches should simulate at once so that the searches together fill
+    the simulation slots. """
+    if OPTS.num_search_points > 0:
+        return OPTS.num_search_points
+    return max(1, num_jobs() // num_searches)
+
+def get_sim_dir(name, parent=None):
+    """ Returns the working directory of a simulation job in the parent
+    directory (the temp dir by default). It is created if needed. """
+    if parent == None:
+        parent = OPTS.openram_temp
+    sim_dir = "{0}{1}/".format(parent, name)
+    try:
+        os.makedirs(sim_dir, 0o750)
+    except OSError as e:
+        if e.errno != 17:  # errno.EEXIST
+            debug.error("Unable to make simulation directory: {0}".format(sim_dir),-1)
+    return sim_dir
+
+
+class sim_pool():
+    """
+    Runs jobs on a pool of threads. The threads mostly wait on simulator
+    processes, so the number of running simulators is bounded by the slots
+    taken in stimuli.run_sim and not by the number of threads.
+    """
+
+    def __init__(self, num_threads=None):
+        if num_threads == None:
+            num_threads = num_jobs()
+        self.num_threads = num_threads
+
+    def map(self, func, args_list):
+        """ Calls func with each tuple of arguments and returns the results in order. """
+        num_threads = min(self.num_threads, len(args_list))
+        if num_threads <= 1:
+            return [func(*args) for args in args_list]
+
+        debug.info(2,"Running {0} jobs on {1} threads".format(len(args_list), num_threads))
+        pool = ThreadPool(num_threads)
+        try:
+            # map_async+get lets a KeyboardInterrupt reach the main thread
+            results = pool.map_async(lambda args: func(*args), args_list).get(1e9)
+        finally:
+            pool.terminate()
+        return results
+
+    def run(self, sim_dirs):
+        """ Runs the stimulus in each of the simulation directories and
+        returns the measurements of each. """
+        return self.map(stimuli.run_sim, [(sim_dir,) for sim_dir in sim_dirs])
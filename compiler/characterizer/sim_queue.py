@@ -0,0 +1,440 @@
+"""
+This runs the simulations on workers that share a queue directory with
+the characterization, so the workers may be on other hosts. Each
+simulation is a job: its stimulus (the deck) in jobs/ and its metadata
+(how to simulate it) in pending/. A worker claims a job by moving its
+metadata to running/, simulates the deck in a local directory and writes
+the measurements to done/, where the characterization collects them.
+Every file is written under a temporary name and renamed, so a reader
+never sees a partial file and only one worker can claim a job.
+
+Each worker has a file in workers/ and touches it and its claim every
+heartbeat_interval. A claim whose modification time doesn't advance for
+stale_time belongs to a worker that died, so the characterization moves it back to pending/.
+The characterization stops if a job waits for stale_time without any
+live worker and gives up on a claimed job that runs longer than the
+workers may simulate it (sim_timeout for every attempt).
+
+The files that a deck includes (the netlist and the spice models) are
+copied to files/ by their digest, so a worker doesn't need the temp
+directory of the characterization. Files that the models include in
+turn must have the same path on the workers, such as a PDK on a shared
+disk. The decks of the mock and replay backends, which don't read the
+included files, are left as they are so they give the same results as
+without the queue.
+
+The "queue" sim_backend submits the jobs and waits for them. Workers are
+started on any host with sim_worker.py or as local processes of the
+characterization (sim_queue_workers). The local workers are forked, so
+they know the mock models registered before the first simulation.
+"""
+
+import os
+import re
+import sys
+import json
+import time
+import uuid
+import signal
+import shutil
+import socket
+import hashlib
+import tempfile
+import threading
+import multiprocessing
+import debug
+import sim_backend
+import charutils as ch
+from globals import OPTS,find_exe
+
+# The seconds between two looks at the queue directory. The wait starts
+# short and doubles while nothing changes, so short simulations don't
+# wait long and idle workers don't keep the shared disk busy.
+min_poll_interval = 0.002
+max_poll_interval = 0.1
+# The seconds between two touches of the files of a worker and the
+# seconds without one after which a worker counts as dead. The seconds
+# are measured by this host's clock between looks at the files, since the
+# clocks of the workers and of the file server may differ.
+heartbeat_interval = 1.0
+stale_time = 30.0
+
+include_re = re.compile(r'^[ \t]*\.include[ \t]+"?([^"\s]+)"?[ \t]*$', re.IGNORECASE | re.MULTILINE)
+
+
+def write_atomic(filename, contents):
+    """ Writes a file under a temporary name and renames it, so the file
+    appears complete. """
+    temp_name = "{0}.{1}.tmp".format(filename, uuid.uuid4().hex)
+    f = open(temp_name, "w")
+    f.write(contents)
+    f.close()
+    os.rename(temp_name, filename)
+
+
+def read_json(filename):
+    """ Returns the contents of a JSON file. """
+    f = open(filename, "r")
+    contents = json.load(f)
+    f.close()
+    return contents
+
+
+class sim_queue():
+    """
+    A queue directory that the simulation jobs are submitted to and that
+    the workers run them from.
+    """
+
+    subdirs = ["files", "jobs", "pending", "running", "done", "workers"]
+
+    def __init__(self, queue_dir):
+        self.queue_dir = queue_dir
+        for subdir in self.subdirs:
+            path = self.path(subdir)
+            try:
+                os.makedirs(path, 0o750)
+            except OSError as e:
+                if e.errno != 17:  # errno.EEXIST
+                    debug.error("Unable to make queue directory: {0}".format(path),-1)
+        self.lock = threading.Lock()
+        # The copies of the included files by name, size and modification time
+        self.copies = {}
+        # The last modification time of the watched files and the time of
+        # this host when it last changed
+        self.touches = {}
+
+    def path(self, subdir, name=""):
+        """ Returns the path of a file in a subdirectory of the queue. """
+        return "{0}{1}/{2}".format(self.queue_dir, subdir, name)
+
+    def copy_include(self, filename):
+        """ Returns the copy of an included file in the queue. The copy is
+        named by the digest of the contents, so it is only made once. """
+        stat = os.stat(filename)
+        file_key = (filename, stat.st_size, stat.st_mtime)
+        with self.lock:
+            if file_key in self.copies:
+                return self.copies[file_key]
+
+        digest = hashlib.sha1()
+        f = open(filename, "rb")
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+        f.close()
+        copy = self.path("files", digest.hexdigest() + os.path.splitext(filename)[1])
+        if not os.path.isfile(copy):
+            temp_name = "{0}.{1}.tmp".format(copy, uuid.uuid4().hex)
+            shutil.copyfile(filename, temp_name)
+            os.rename(temp_name, copy)
+        with self.lock:
+            self.copies[file_key] = copy
+        return copy
+
+    def include_copy(self, m):
+        """ Returns an include line of the deck with the copy of its file. """
+        if not os.path.isfile(m.group(1)):
+            return m.group(0)
+        return ".include \"{0}\"".format(self.copy_include(m.group(1)))
+
+    def submit(self, temp_stim):
+        """ Submits the stimulus as a job and returns the job id. """
+        f = open(temp_stim, "r")
+        deck = f.read()
+        f.close()
+        if OPTS.sim_queue_backend not in ["mock", "replay"]:
+            deck = include_re.sub(self.include_copy, deck)
+
+        job_id = uuid.uuid4().hex
+        write_atomic(self.path("jobs", job_id + ".sp"), deck)
+        job = {"id": job_id,
+               "stimulus": temp_stim,
+               "submit_host": socket.gethostname(),
+               "backend": OPTS.sim_queue_backend,
+               "spice_name": OPTS.spice_name,
+               "raw_waveforms": OPTS.use_raw_waveforms,
+               "sim_timeout": OPTS.sim_timeout,
+               "sim_retries": OPTS.sim_retries,
+               "mock_noise": OPTS.mock_noise,
+               "mock_seed": OPTS.mock_seed}
+        write_atomic(self.path("pending", job_id + ".json"), json.dumps(job))
+        debug.info(3, "Submitted {0} as job {1}".format(temp_stim, job_id))
+        return job_id
+
+    def collect(self, job_id):
+        """ Waits for the result of a job and removes the job. The result
+        has the measurements and return code of the simulation or an
+        error, and the host and wall time of the worker. Returns None if
+        the job ran past its deadline. """
+        done = self.path("done", job_id + ".json")
+        pending = self.path("pending", job_id + ".json")
+        running = self.path("running", job_id + ".json")
+        wait_time = time.time()
+        claim_time = None
+        interval = min_poll_interval
+        while not os.path.isfile(done):
+            time.sleep(interval)
+            interval = min(2*interval, max_poll_interval)
+            now = time.time()
+            if os.path.isfile(pending):
+                claim_time = None
+                # The workers are watched from the start of the wait
+                if not self.has_workers() and now - wait_time > stale_time:
+                    self.cancel(job_id)
+                    debug.error("No worker runs the jobs of {0}. Start sim_worker.py on a host "
+                                "that shares it or set sim_queue_workers.".format(self.queue_dir), -1)
+                continue
+            if claim_time == None:
+                claim_time = now
+            if self.is_stale(running):
+                debug.warning("Worker of job {0} died, queueing it again.".format(job_id))
+                self.requeue(job_id)
+                wait_time = now
+            elif OPTS.sim_timeout > 0 and now - claim_time > (OPTS.sim_retries + 1) * OPTS.sim_timeout + stale_time:
+                debug.warning("Simulation job {0} didn't finish in {1:.0f}s.".format(job_id, now - claim_time))
+                self.cancel(job_id)
+                return None
+        result = read_json(done)
+        os.remove(done)
+        # A requeued job may be pending or run by another worker
+        self.cancel(job_id)
+        return result
+
+    def is_stale(self, filename):
+        """ Returns whether the modification time of a file didn't change
+        for stale_time while this process watched it. The time is compared
+        with the earlier ones of the file and not with the clock of this
+        host. A file that is gone isn't stale. """
+        now = time.time()
+        try:
+            mtime = os.path.getmtime(filename)
+        except OSError:
+            with self.lock:
+                self.touches.pop(filename, None)
+            return False
+        with self.lock:
+            (last_mtime, touch_time) = self.touches.get(filename, (None, now))
+            if mtime != last_mtime:
+                self.touches[filename] = (mtime, now)
+                return False
+            return now - touch_time > stale_time
+
+    def requeue(self, job_id):
+        """ Moves the claim of a job back to pending/. """
+        try:
+            os.rename(self.path("running", job_id + ".json"), self.path("pending", job_id + ".json"))
+        except OSError:
+            pass
+
+    def cancel(self, job_id):
+        """ Removes a job and its claims. A worker that still runs it
+        doesn't write its result. """
+        for filename in [self.path("pending", job_id + ".json"),
+                         self.path("running", job_id + ".json"),
+                         self.path("jobs", job_id + ".sp")]:
+            try:
+                os.remove(filename)
+            except OSError:
+                pass
+
+    def has_workers(self):
+        """ Returns whether a worker touched its file within stale_time of
+        watching it. The files of the dead workers are removed. """
+        alive = False
+        for name in os.listdir(self.path("workers")):
+            filename = self.path("workers", name)
+            if not self.is_stale(filename):
+                alive = True
+            else:
+                try:
+                    os.remove(filename)
+                except OSError:
+                    pass
+                with self.lock:
+                    self.touches.pop(filename, None)
+        return alive
+
+    def claim(self):
+        """ Returns the metadata of a pending job that this worker now
+        runs or None if there is none. """
+        try:
+            names = sorted(os.listdir(self.path("pending")))
+        except OSError:
+            return None
+        for name in names:
+            if not name.endswith(".json"):
+                continue
+            try:
+                # The claim is fresh even if the job waited a long time
+                os.utime(self.path("pending", name), None)
+                # Only one worker can move the file
+                os.rename(self.path("pending", name), self.path("running", name))
+            except OSError:
+                continue
+            return read_json(self.path("running", name))
+        return None
+
+    def run(self, job):
+        """ Simulates a claimed job in a local directory and writes its result. """
+        sim_dir = tempfile.mkdtemp(prefix="openram_job_") + "/"
+        result = {"id": job["id"],
+                  "host": socket.gethostname(),
+                  "pid": os.getpid()}
+        start_time = time.time()
+        try:
+            configure(job)
+            temp_stim = sim_dir + "stim.sp"
+            shutil.copyfile(self.path("jobs", job["id"] + ".sp"), temp_stim)
+            result["return_code"] = sim_backend.simulate(sim_backend.get_backend(), temp_stim, sim_dir)
+            result["measurements"] = ch.parse_measurements("timing", sim_dir)
+        except Exception as e:
+            result["error"] = str(e) or failure_message(sim_dir)
+        finally:
+            shutil.rmtree(sim_dir, ignore_errors=True)
+        result["wall_time"] = time.time() - start_time
+        if not os.path.isfile(self.path("jobs", job["id"] + ".sp")):
+            # The job was collected from another worker or cancelled
+            return
+        write_atomic(self.path("done", job["id"] + ".json"), json.dumps(result))
+        try:
+            os.remove(self.path("running", job["id"] + ".json"))
+        except OSError:
+            # The claim was taken for dead and moved back to pending/
+            pass
+
+    def heartbeat(self, worker_file):
+        """ Touches the file of this worker and its claim so that they
+        aren't taken for dead. """
+        while True:
+            filenames = [worker_file]
+            if self.job_id != None:
+                filenames.append(self.path("running", self.job_id + ".json"))
+            for filename in filenames:
+                try:
+                    os.utime(filename, None)
+                except OSError:
+                    pass
+            time.sleep(heartbeat_interval)
+
+    def work(self):
+        """ Runs the pending jobs one at a time until the process is stopped. """
+        debug.info(1, "Worker {0} running jobs from {1}".format(os.getpid(), self.queue_dir))
+        worker_file = self.path("workers", "{0}.{1}".format(socket.gethostname(), os.getpid()))
+        write_atomic(worker_file, "")
+        self.job_id = None
+        heartbeat = threading.Thread(target=self.heartbeat, args=(worker_file,))
+        heartbeat.daemon = True
+        heartbeat.start()
+        interval = min_poll_interval
+        while True:
+            job = self.claim()
+            if job == None:
+                time.sleep(interval)
+                interval = min(2*interval, max_poll_interval)
+            else:
+                self.job_id = job["id"]
+                self.run(job)
+                self.job_id = None
+                interval = min_poll_interval
+
+
+def configure(job):
+    """ Sets the options of this worker to simulate a job like its
+    characterization would. The simulator is found on this host. """
+    debug.check(job["backend"] != "queue", "Queue workers can't run the queue backend.")
+    OPTS.sim_backend = job["backend"]
+    OPTS.mock_noise = job["mock_noise"]
+    OPTS.mock_seed = job["mock_seed"]
+    OPTS.use_raw_waveforms = job.get("raw_waveforms", False)
+    OPTS.sim_timeout = job.get("sim_timeout", OPTS.sim_timeout)
+    OPTS.sim_retries = job.get("sim_retries", OPTS.sim_retries)
+    if job["backend"] in ["mock", "replay"]:
+        OPTS.spice_name = job["spice_name"]
+    elif job["spice_name"] != OPTS.spice_name or OPTS.spice_exe == "":
+        OPTS.spice_exe = find_exe(job["spice_name"]) or ""
+        debug.check(OPTS.spice_exe!="", "{0} not found on {1}.".format(job["spice_name"], socket.gethostname()))
+        OPTS.spice_name = job["spice_name"]
+
+
+def failure_message(sim_dir):
+    """ Returns the last lines that the simulator wrote to its error log
+    of a failed job. """
+    log = "{0}spice_stderr.log".format(sim_dir)
+    if os.path.isfile(log):
+        f = open(log, "r")
+        lines = f.read().strip().splitlines()
+        f.close()
+        if len(lines) > 0:
+            return "\n".join(lines[-5:])
+    return "The simulation failed"
+
+
+def queue_path(queue_dir):
+    """ Returns the queue directory of an option (the temp dir by default). """
+    if queue_dir == "":
+        queue_dir = OPTS.openram_temp + "sim_queue/"
+    if not queue_dir.endswith("/"):
+        queue_dir += "/"
+    return queue_dir
+
+
+queue = None
+queue_lock = threading.Lock()
+
+def get_queue():
+    """ Returns the queue of the sim_queue_dir option and starts the
+    local workers (sim_queue_workers) that aren't running. """
+    global queue
+    queue_dir = queue_path(OPTS.sim_queue_dir)
+    with queue_lock:
+        if queue == None or queue.queue_dir != queue_dir:
+            queue = sim_queue(queue_dir)
+        start_workers(queue_dir, OPTS.sim_queue_workers)
+        return queue
+
+
+# The local worker processes
+workers = []
+worker_lock = threading.Lock()
+
+def start_workers(queue_dir, num_workers):
+    """ Starts local worker processes until num_workers are running. """
+    with worker_lock:
+        workers[:] = [p for p in workers if p.is_alive()]
+        while len(workers) < num_workers:
+            # Daemon processes are stopped when the characterization exits
+            p = multiprocessing.Process(target=work, args=(queue_dir,))
+            p.daemon = True
+            p.start()
+            workers.append(p)
+
+
+def stop_workers():
+    """ Stops the local worker processes. """
+    with worker_lock:
+        for p in workers:
+            p.terminate()
+        for p in workers:
+            p.join()
+        del workers[:]
+
+
+def work(queue_dir):
+    """ Runs the jobs of a queue directory in this process. """
+    sim_queue(queue_path(queue_dir)).work()
+
+
+def run_workers(queue_dir, num_workers):
+    """ Runs the jobs of a queue directory in num_workers local processes
+    until they are stopped. """
+    if num_workers <= 1:
+        work(queue_dir)
+        return
+    # Stopping this process (with SIGTERM) stops its workers
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(1))
+    start_workers(queue_path(queue_dir), num_workers)
+    try:
+        for p in list(workers):
+            p.join()
+    finally:
+        stop_workers()
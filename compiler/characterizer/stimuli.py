@@ -10,6 +10,11 @@ import subprocess
 import os
 import sys
 import numpy as np
+import sim_pool
+import sim_cache
+import sim_backend
+import telemetry
+import charutils as ch
 from globals import OPTS
 
 vdd_voltage = tech.spice["supply_voltage"]
@@ -136,19 +141,19 @@ def gen_pulse(stim_file, sig_name, v1=gnd_voltage, v2=vdd_voltage, offset=0, per
                                         period))
 
 
-def gen_pwl(stim_file, sig_name, clk_times, data_values, period, slew, setup):
+def gen_pwl(stim_file, sig_name, clk_times, data_values, period, slew, setup, vdd=vdd_voltage):
     """ 
     Generate a PWL stimulus given a signal name and data values at each period.
     Automatically creates slews and ensures each data occurs a setup before the clock
     edge. The first clk_time should be 0 and is the initial time that corresponds
-    to the initial value.
+    to the initial value. A value of 1 is the vdd voltage.
     """
     # the initial value is not a clock time
     debug.check(len(clk_times)==len(data_values),"Clock and data value lengths don't match.")
     
     # shift signal times earlier for setup time
     times = np.array(clk_times) - setup*period
-    values = np.array(data_values) * vdd_voltage
+    values = np.array(data_values) * vdd
     half_slew = 0.5 * slew
     stim_file.write("* (time, data): {}\n".format(zip(clk_times, data_values)))
     stim_file.write("V{0} {0} 0 PWL (0n {1}v ".format(sig_name, values[0]))
@@ -205,16 +210,21 @@ def gen_meas_power(stim_file, meas_name, t_initial, t_final):
                                                                         t_initial,
                                                                         t_final))
     
-def write_control(stim_file, end_time):
-    """ Write the control cards to run and end the simulation """
+def write_control(stim_file, end_time, end=True, windows=[]):
+    """ Write the control cards to run and end the simulation. If end is
+    False, the stimulus is left open for .ALTER blocks and write_end.
+    The (start, end) measurement windows (in ns) are simulated with the
+    fine time step and the rest with the coarse one if the simulator
+    supports several intervals. """
     # UIC is needed for ngspice to converge
-    stim_file.write(".TRAN 5p {0}n UIC\n".format(end_time))
+    stim_file.write(".TRAN {0} UIC\n".format(tran_intervals(end_time, windows)))
     if OPTS.spice_name == "ngspice":
         # ngspice sometimes has convergence problems if not using gear method
         # which is more accurate, but slower than the default trapezoid method
         # Do not remove this or it may not converge due to some "pa_00" nodes
         # unless you figure out what these are.
-        stim_file.write(".OPTIONS POST=1 RUNLVL=4 PROBE method=gear\n")
+        # The options are also variables of ngspice, such as its threads
+        stim_file.write(".OPTIONS POST=1 RUNLVL=4 PROBE method=gear num_threads={0}\n".format(sim_pool.num_threads()))
     else:
         stim_file.write(".OPTIONS POST=1 RUNLVL=4 PROBE\n")
 
@@ -229,7 +239,46 @@ def write_control(stim_file, end_time):
         stim_file.write("*.probe V(*)\n")
         stim_file.write("*.plot V(*)\n")
 
-    # end the stimulus file
+    if end:
+        write_end(stim_file)
+
+
+def tran_intervals(end_time, windows=[]):
+    """ Returns the time step and stop time of each interval of a
+    transient analysis. hspice and xa take several intervals, where the
+    ones outside the measurement windows get the coarse time step. """
+    if len(windows) == 0 or OPTS.coarse_time_step <= 0 or OPTS.spice_name not in ["hspice", "xa"]:
+        return "5p {0}n".format(end_time)
+
+    intervals = []
+    time = 0
+    for (start, stop) in sorted(windows):
+        if stop <= time:
+            continue
+        if start > time:
+            intervals.append("{0}p {1}n".format(OPTS.coarse_time_step, start))
+        intervals.append("5p {0}n".format(stop))
+        time = stop
+    if end_time > time:
+        intervals.append("{0}p {1}n".format(OPTS.coarse_time_step, end_time))
+    return " ".join(intervals)
+
+
+def supports_alter():
+    """ Returns whether several points may be simulated in one stimulus
+    with .ALTER blocks. ngspice doesn't support .ALTER and the alter results
+    of xa aren't written to the same measurement file. """
+    return OPTS.batch_sweeps and OPTS.spice_name == "hspice"
+
+
+def write_alter(stim_file, title):
+    """ Starts an .ALTER block. The element statements that follow replace
+    the ones with the same name for another run of the simulation. """
+    stim_file.write("\n.ALTER {0}\n".format(title))
+
+
+def write_end(stim_file):
+    """ Writes the end of the stimulus file """
     stim_file.write(".end\n\n")
 
 
@@ -242,60 +291,59 @@ def write_include(stim_file, models):
             debug.error("Could not find spice model: {0}\nSet SPICE_MODEL_DIR to over-ride path.\n".format(item))
 
 
-def write_supply(stim_file):
+def write_supply(stim_file, vdd=vdd_voltage):
     """ Writes supply voltage statements """
-    stim_file.write("V{0} {0} 0.0 {1}\n".format(vdd_name, vdd_voltage))
+    stim_file.write("V{0} {0} 0.0 {1}\n".format(vdd_name, vdd))
     stim_file.write("V{0} {0} 0.0 {1}\n".format(gnd_name, gnd_voltage))
     # This is for the test power supply
-    stim_file.write("V{0} {0} 0.0 {1}\n".format("test"+vdd_name, vdd_voltage))
+    stim_file.write("V{0} {0} 0.0 {1}\n".format("test"+vdd_name, vdd))
     stim_file.write("V{0} {0} 0.0 {1}\n".format("test"+gnd_name, gnd_voltage))
 
 
-def run_sim():
-    """ Run hspice in batch mode and output rawfile to parse. """
-    temp_stim = "{0}stim.sp".format(OPTS.openram_temp)
-    import datetime
-    start_time = datetime.datetime.now()
-    debug.check(OPTS.spice_exe!="","No spice simulator has been found.")
-    
-    if OPTS.spice_name == "xa":
-        # Output the xa configurations here. FIXME: Move this to write it once.
-        xa_cfg = open("{}xa.cfg".format(OPTS.openram_temp), "w")
-        xa_cfg.write("set_sim_level -level 7\n")
-        xa_cfg.write("set_powernet_level 7 -node vdd\n")
-        xa_cfg.close()
-        cmd = "{0} {1} -c {2}xa.cfg -o {2}xa -mt 2".format(OPTS.spice_exe,
-                                               temp_stim,
-                                               OPTS.openram_temp)
-        valid_retcode=0
-    elif OPTS.spice_name == "hspice":
-        # TODO: Should make multithreading parameter a configuration option
-        cmd = "{0} -mt 2 -i {1} -o {2}timing".format(OPTS.spice_exe,
-                                                     temp_stim,
-                                                     OPTS.openram_temp)
-        valid_retcode=0
-    else:
-        cmd = "{0} -b -o {2}timing.lis {1}".format(OPTS.spice_exe,
-                                                   temp_stim,
-                                                   OPTS.openram_temp)
-        # for some reason, ngspice-25 returns 1 when it only has acceptable warnings
-        valid_retcode=1
+def write_temp(stim_file, temp):
+    """ Writes the temperature (in Celsius) of the simulation """
+    stim_file.write(".TEMP {0}\n".format(temp))
 
-        
-    spice_stdout = open("{0}spice_stdout.log".format(OPTS.openram_temp), 'w')
-    spice_stderr = open("{0}spice_stderr.log".format(OPTS.openram_temp), 'w')
 
-    debug.info(3, cmd)
-    retcode = subprocess.call(cmd, stdout=spice_stdout, stderr=spice_stderr, shell=True)
+def run_sim(sim_dir=None):
+    """ Run the simulator on the stimulus in sim_dir (the temp dir by
+    default) with the backend of the sim_backend option. Returns the
+    dictionary of measurements. """
+    if sim_dir == None:
+        sim_dir = OPTS.openram_temp
+    temp_stim = "{0}stim.sp".format(sim_dir)
+    import datetime
 
-    spice_stdout.close()
-    spice_stderr.close()
+    # An unchanged simulation doesn't need to run again
+    cache = sim_cache.get_cache()
+    if cache:
+        cache_key = cache.key(temp_stim)
+        measurements = cache.get(cache_key)
+        if measurements != None:
+            debug.info(2,"*** Spice: cached {}".format(cache_key))
+            telemetry.record(sim_dir, 0.0, 0, measurements, cached=True)
+            return measurements
     
-    if (retcode > valid_retcode):
-        debug.error("Spice simulation error: " + cmd, -1)
-    else:
+    backend = sim_backend.get_backend()
+    # Only a limited number of simulations may run at once
+    with sim_pool.get_slots():
+        start_time = datetime.datetime.now()
+        try:
+            # The return code is None if the simulation failed
+            return_code = sim_backend.simulate(backend, temp_stim, sim_dir)
+        except:
+            wall_time = (datetime.datetime.now()-start_time).total_seconds()
+            telemetry.record(sim_dir, wall_time, None, {})
+            raise
         end_time = datetime.datetime.now()
-        delta_time = round((end_time-start_time).total_seconds(),1)
-        debug.info(2,"*** Spice: {} seconds".format(delta_time))
+    wall_time = (end_time-start_time).total_seconds()
+    debug.info(2,"*** Spice: {} seconds".format(round(wall_time,1)))
+
+    measurements = ch.parse_measurements("timing", sim_dir)
+    telemetry.record(sim_dir, wall_time, return_code, measurements)
+    # A failed simulation is tried again in the next run
+    if cache and return_code != None:
+        cache.put(cache_key, measurements)
+    return measurements
 
     
@@ -0,0 +1,138 @@
+"""
+This records every simulation of a characterization: what it is for
+(the feasible period, the min period search, a delay table point or a
+setup/hold search), its parameters, its wall time, the return code of the
+simulator, whether it converged and the measurements that have no value.
+The records are summed up by purpose in a table and written to a JSON file
+next to the .lib.
+
+A stimulus is described (see describe) when it is written to its
+simulation directory and run_sim adds the record when it runs it.
+"""
+
+import os
+import json
+import threading
+import debug
+import sim_pool
+import charutils as ch
+from globals import OPTS
+
+# The records of the simulations in the order that they finished
+records = []
+# The description of the stimulus in each simulation directory
+descriptions = {}
+lock = threading.Lock()
+
+
+def describe(sim_dir, purpose, corner, **params):
+    """ Describes the stimulus in a simulation directory: its purpose,
+    the name of its corner and parameters such as the period, slew and
+    load. """
+    if sim_dir == None:
+        sim_dir = OPTS.openram_temp
+    with lock:
+        descriptions[sim_dir] = dict(purpose=purpose, corner=corner, **params)
+
+
+def record(sim_dir, wall_time, return_code, measurements, cached=False):
+    """ Adds the record of a simulation of the stimulus in sim_dir. The
+    return code is None if the simulator failed (or timed out) in every
+    attempt, otherwise the simulation converged. A measurement may still
+    have no value, e.g. the delay of a period that is too short, so these
+    are recorded separately. """
+    missing = [name for name in sorted(measurements.keys())
+               if type(ch.get_measurement(measurements, name)) != float]
+    with lock:
+        entry = dict(descriptions.get(sim_dir, {"purpose": "unknown", "corner": None}))
+        entry.update(sim_dir=sim_dir,
+                     wall_time=wall_time,
+                     return_code=return_code,
+                     converged=return_code != None,
+                     missing_measures=missing,
+                     cached=cached)
+        records.append(entry)
+
+
+def mark():
+    """ Returns the position of the next record. """
+    with lock:
+        return len(records)
+
+
+def get_records(start=0, corner=None):
+    """ Returns the records from a position (see mark), only of a corner
+    name if it is given. """
+    with lock:
+        return [r for r in records[start:] if corner == None or r["corner"] == corner]
+
+
+def summarize(selected):
+    """ Returns the number of simulations, cached ones, ones that didn't
+    converge, ones with missing measurements and the total and mean wall
+    time of each purpose. """
+    summary = {}
+    for r in selected:
+        row = summary.setdefault(r["purpose"], {"count": 0,
+                                                "cached": 0,
+                                                "failed": 0,
+                                                "missing": 0,
+                                                "wall_time": 0.0})
+        row["count"] += 1
+        row["cached"] += int(r["cached"])
+        row["failed"] += int(not r["converged"])
+        row["missing"] += int(r["converged"] and len(r["missing_measures"]) > 0)
+        row["wall_time"] += r["wall_time"]
+    for row in summary.values():
+        row["mean_wall_time"] = row["wall_time"] / row["count"]
+    return summary
+
+
+def summary_table(summary):
+    """ Returns the lines of a table of the summary. """
+    lines = ["{0:<16} {1:>6} {2:>6} {3:>6} {4:>7} {5:>10} {6:>10}".format("purpose", "sims", "cached",
+                                                                         "failed", "missing",
+                                                                         "time (s)", "mean (s)")]
+    total = {"count": 0, "cached": 0, "failed": 0, "missing": 0, "wall_time": 0.0}
+    for purpose in sorted(summary.keys()):
+        row = summary[purpose]
+        lines.append("{0:<16} {1:>6} {2:>6} {3:>6} {4:>7} {5:>10.1f} {6:>10.2f}".format(purpose,
+                                                                                        row["count"],
+                                                                                        row["cached"],
+                                                                                        row["failed"],
+                                                                                        row["missing"],
+                                                                                        row["wall_time"],
+                                                                                        row["mean_wall_time"]))
+        for key in total.keys():
+            total[key] += row[key]
+    lines.append("{0:<16} {1:>6} {2:>6} {3:>6} {4:>7} {5:>10.1f}".format("total",
+                                                                         total["count"],
+                                                                         total["cached"],
+                                                                         total["failed"],
+                                                                         total["missing"],
+                                                                         total["wall_time"]))
+    return lines
+
+
+def write_report(libname, start=0, corner=None):
+    """ Writes the records and summary of the simulations of a .lib
+    (from a position, only of a corner name if given) to a JSON file next
+    to it and returns its name. """
+    selected = get_records(start, corner)
+    summary = summarize(selected)
+    for line in summary_table(summary):
+        debug.info(1, line)
+
+    filename = os.path.splitext(libname)[0] + ".sim.json"
+    f = open(filename, "w")
+    json.dump({"lib": os.path.basename(libname),
+               "corner": corner,
+               "spice_name": OPTS.spice_name,
+               "sim_backend": OPTS.sim_backend,
+               "sim_jobs": sim_pool.num_jobs(),
+               "sim_threads": sim_pool.num_threads(),
+               "summary": summary,
+               "simulations": selected},
+              f, indent=1, sort_keys=True)
+    f.close()
+    return filename
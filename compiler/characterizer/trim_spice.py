@@ -1,34 +1,53 @@
+import bisect
 import debug
 from math import log
 
 class trim_spice():
     """
-    A utility to trim redundant parts of an SRAM spice netlist. 
+    A utility to trim redundant parts of an SRAM spice netlist.
     Input is an SRAM spice file. Output is an equivalent netlist
     that works for a single address and range of data bits.
     """
 
     def __init__(self, spfile, reduced_spfile):
         self.sp_file = spfile
-        self.reduced_spfile = reduced_spfile        
+        self.reduced_spfile = reduced_spfile
 
         debug.info(1,"Trimming non-critical cells to speed-up characterization: {}.".format(reduced_spfile))
-        
+
         # Load the file into a buffer for performance
         sp = open(self.sp_file, "r")
         self.spice = sp.readlines()
+        sp.close()
         for i in range(len(self.spice)):
             self.spice[i] = self.spice[i].rstrip(" \n")
-        
 
-        self.sp_buffer = self.spice
+        # The first and last line of each subckt
+        self.subckts = {}
+        subckt_start = None
+        for (i, line) in enumerate(self.spice):
+            if not line.startswith("."):
+                continue
+            words = line.split()
+            if len(words) < 2:
+                continue
+            if words[0].upper() == ".SUBCKT":
+                subckt_start = i
+            elif words[0].upper() == ".ENDS" and subckt_start != None:
+                if words[1] not in self.subckts:
+                    self.subckts[words[1]] = (subckt_start, i)
+                subckt_start = None
+
+        # The instance index of each subckt that is trimmed. It is built
+        # on first use and doesn't change, so we can do multiple reductions.
+        self.indices = {}
 
     def set_configuration(self, banks, rows, columns, word_size):
         """ Set the configuration of SRAM sizes that we are simulating.
-        Need the: number of banks, number of rows in each bank, number of 
+        Need the: number of banks, number of rows in each bank, number of
         columns in each bank, and data word size."""
         self.num_banks = banks
-        self.num_rows = rows        
+        self.num_rows = rows
         self.num_columns = columns
         self.word_size = word_size
 
@@ -43,35 +62,13 @@ class trim_spice():
         """ Reduce the spice netlist but KEEP the given bits at the
         address (and things that will add capacitive load!)"""
 
-        # Always start fresh if we do multiple reductions
-        self.sp_buffer = self.spice
+        # The instances that are kept in each trimmed subckt
+        self.kept = {}
 
-        # Split up the address and convert to an int
-        wl_address = int(address[self.col_addr_size:],2)
-        if self.col_addr_size>1:
-            col_address = int(address[0:self.col_addr_size],2)
-        else:
-            col_address = 0
         # 1. Keep cells in the bitcell array based on WL and BL
-        wl_name = "wl[{}]".format(wl_address)
-        bl_name = "bl[{}]".format(self.words_per_row*data_bit + col_address)
+        (wl_name, bl_name) = self.probe_names(address, data_bit)
+        header = self.get_header(address, data_bit, wl_name, bl_name)
 
-        # Prepend info about the trimming
-        addr_msg = "Keeping {} address".format(address)
-        self.sp_buffer.insert(0, "* "+addr_msg)
-        debug.info(1,addr_msg)
-        data_msg = "Keeping {} data bit".format(data_bit)
-        self.sp_buffer.insert(0, "* "+data_msg)
-        debug.info(1,data_msg)
-        bl_msg = "Keeping {} (trimming other BLs)".format(bl_name)
-        wl_msg = "Keeping {} (trimming other WLs)".format(wl_name)
-        self.sp_buffer.insert(0, "* "+bl_msg)
-        debug.info(1,bl_msg)
-        self.sp_buffer.insert(0, "* "+wl_msg)
-        debug.info(1,wl_msg)
-        self.sp_buffer.insert(0, "* It should NOT be used for LVS!!")
-        self.sp_buffer.insert(0, "* WARNING: This is a TRIMMED NETLIST.")
-        
         self.remove_insts("bitcell_array",[wl_name,bl_name])
 
         # 2. Keep sense amps basd on BL
@@ -80,7 +77,7 @@ class trim_spice():
 
         # 3. Keep column muxes basd on BL
         self.remove_insts("column_mux_array",[bl_name])
-        
+
         # 4. Keep write driver based on DATA
         data_name = "data[{}]".format(data_bit)
         self.remove_insts("write_driver_array",[data_name])
@@ -88,41 +85,93 @@ class trim_spice():
         # 5. Keep wordline driver based on WL
         # Need to keep the gater too
         #self.remove_insts("wordline_driver",wl_name)
-        
+
         # 6. Keep precharges based on BL
         self.remove_insts("precharge_array",[bl_name])
-        
+
         # Everything else isn't worth removing. :)
-        
-        # Finally, write out the buffer as the new reduced file
+
+        # Finally, write out the kept lines as the new reduced file
         sp = open(self.reduced_spfile, "w")
-        sp.write("\n".join(self.sp_buffer))
+        sp.write("\n".join(header))
+        position = 0
+        for (subckt_name, kept_lines) in sorted(self.kept.items(), key=lambda x: self.subckts[x[0]]):
+            (start, end) = self.subckts[subckt_name]
+            lines = self.spice[position:start + 1] + [self.spice[i] for i in kept_lines]
+            sp.write("\n" + "\n".join(lines))
+            position = end
+        sp.write("\n" + "\n".join(self.spice[position:]))
+        sp.close()
+
+
+    def probe_names(self, address, data_bit):
+        """ Returns the names of the word line and bit line of the bitcell
+        of a data bit at an address in the bitcell array. """
+        # Split up the address and convert to an int (the bank address
+        # bits don't select a word line)
+        wl_address = int(address[self.col_addr_size:self.bank_addr_size],2)
+        if self.col_addr_size>1:
+            col_address = int(address[0:self.col_addr_size],2)
+        else:
+            col_address = 0
+        wl_name = "wl[{}]".format(wl_address)
+        bl_name = "bl[{}]".format(self.words_per_row*data_bit + col_address)
+        return (wl_name, bl_name)
+
+    def get_header(self, address, data_bit, wl_name, bl_name):
+        """ Returns the comment lines about the trimming that start the
+        reduced netlist. """
+        header = ["* WARNING: This is a TRIMMED NETLIST.",
+                  "* It should NOT be used for LVS!!"]
+        wl_msg = "Keeping {} (trimming other WLs)".format(wl_name)
+        header.append("* "+wl_msg)
+        debug.info(1,wl_msg)
+        bl_msg = "Keeping {} (trimming other BLs)".format(bl_name)
+        header.append("* "+bl_msg)
+        debug.info(1,bl_msg)
+        data_msg = "Keeping {} data bit".format(data_bit)
+        header.append("* "+data_msg)
+        debug.info(1,data_msg)
+        addr_msg = "Keeping {} address".format(address)
+        header.append("* "+addr_msg)
+        debug.info(1,addr_msg)
+        return header
 
-        
     def remove_insts(self, subckt_name, keep_inst_list):
-        """This will remove all of the instances in the list from the named
-        subckt that DO NOT contain a term in the list.  It just does a
-        match of the line with a term so you can search for a single
-        net connection, the instance name, anything..
+        """This will remove all of the instances in the named subckt
+        that DO NOT contain a term in the list. A term matches a word of
+        the instance line, so you can search for a single net connection,
+        the instance name, anything..
         """
-        start_name = ".SUBCKT {}".format(subckt_name)
-        end_name = ".ENDS {}".format(subckt_name)
-
-        in_subckt=False
-        new_buffer=[]
-        for line in self.sp_buffer:
-            if start_name in line:
-                new_buffer.append(line)
-                in_subckt=True
-            elif end_name in line:
-                new_buffer.append(line)
-                in_subckt=False
-            elif in_subckt:
-                for k in keep_inst_list:
-                    if k in line:
-                        new_buffer.append(line)
-                        break
-            else:
-                new_buffer.append(line)
-
-        self.sp_buffer = new_buffer
+        if subckt_name not in self.subckts:
+            return
+        (text, offsets) = self.get_index(subckt_name)
+        (start, end) = self.subckts[subckt_name]
+
+        kept = set()
+        for k in keep_inst_list:
+            position = text.find(k)
+            while position >= 0:
+                after = position + len(k)
+                # The term must be a whole word
+                if (position == 0 or text[position - 1].isspace()) and (after == len(text) or text[after].isspace()):
+                    kept.add(start + bisect.bisect_right(offsets, position))
+                position = text.find(k, after)
+        self.kept[subckt_name] = sorted(kept)
+
+    def get_index(self, subckt_name):
+        """ Returns the index of the instances in a subckt: the text of
+        its instance lines and the offset of each line in the text. Terms
+        are found in the text at once instead of line by line. """
+        if subckt_name in self.indices:
+            return self.indices[subckt_name]
+
+        (start, end) = self.subckts[subckt_name]
+        lines = self.spice[start + 1:end]
+        offsets = []
+        offset = 0
+        for line in lines:
+            offsets.append(offset)
+            offset += len(line) + 1
+        self.indices[subckt_name] = ("\n".join(lines), offsets)
+        return self.indices[subckt_name]
@@ -49,7 +49,17 @@ def parse_args():
         optparse.make_option("-c", "--characterize", action="store_false", dest="analytical_delay",
                              help="Perform characterization to calculate delays (default is analytical models)"),
         optparse.make_option("-d", "--dontpurge", action="store_false", dest="purge_temp",
-                             help="Don't purge the contents of the temp directory after a successful run")
+                             help="Don't purge the contents of the temp directory after a successful run"),
+        optparse.make_option("-j", "--jobs", type="int", dest="num_sim_jobs",
+                             help="Number of simulations to run at once (default is one per CPU core)"),
+        optparse.make_option("--threads", type="int", dest="sim_threads",
+                             help="Number of threads of each simulation (default shares the CPU cores)"),
+        optparse.make_option("--no-sim-cache", action="store_false", dest="use_sim_cache",
+                             help="Don't reuse cached simulation results"),
+        optparse.make_option("--backend", dest="sim_backend",
+                             help="How to run the simulator: batch, session, mock, replay or queue"),
+        optparse.make_option("--resume", action="store_true", dest="resume",
+                             help="Resume the characterization of an earlier run from its checkpoint")
         # -h --help is implicit.
     }
 
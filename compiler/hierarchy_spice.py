@@ -3,6 +3,7 @@ import re
 import os
 import math
 import verilog
+from utils import spice_number
 
 class spice(verilog.verilog):
     """
@@ -192,7 +193,9 @@ class spice(verilog.verilog):
     def cal_delay_with_rc(self, r, c ,slew, swing = 0.5):
         """ 
         Calculate the delay of a mosfet by 
-        modeling it as a resistance driving a capacitance
+        modeling it as a resistance driving a capacitance.
+        The r, c and slew can be NumPy arrays (of the same shape or
+        broadcastable) to calculate a grid of delays at once.
         """
         swing_factor = abs(math.log(1-swing)) # time constant based on swing
         delay = swing_factor * r * c #c is in ff and delay is in fs
@@ -212,6 +215,58 @@ class spice(verilog.verilog):
     def return_delay(self, delay, slew):
         return delay_data(delay, slew)
 
+    def transistor_widths(self):
+        """
+        Returns the total width (um) of the nmos and pmos transistors
+        of the module: the devices of a library cell or those of the
+        instances of a generated module. It is only counted once.
+        """
+        try:
+            return self.tx_widths
+        except AttributeError:
+            pass
+        from tech import spice
+        widths = {"nmos": 0.0, "pmos": 0.0}
+        for line in self.spice:
+            words = line.split()
+            if len(words) < 6 or words[0][0] not in "mM":
+                continue
+            params = dict((w.split("=", 1)[0].lower(), w.split("=", 1)[1]) for w in words[6:] if "=" in w)
+            width = spice_number(params.get("w", "0")) * spice_number(params.get("m", "1")) * 1e6
+            if words[5].lower() == spice["pmos"].lower():
+                widths["pmos"] += width
+            else:
+                widths["nmos"] += width
+        for (inst, conns) in zip(self.insts, self.conns):
+            # empty instances are wires and paths
+            if conns == []:
+                continue
+            inst_widths = inst.mod.transistor_widths()
+            for tx_type in widths:
+                widths[tx_type] += inst_widths[tx_type]
+        self.tx_widths = widths
+        return widths
+
+    def analytical_leakage(self, vdd, temp):
+        """
+        Returns the leakage power (mW) of the module at a supply voltage
+        and temperature. Half of the transistors are taken to be off
+        and to leak the current per um of width of the technology, which
+        doubles every 10C above the nominal temperature.
+        """
+        from tech import spice
+        widths = self.transistor_widths()
+        current = 0.5 * (widths["nmos"]*spice["nmos_leakage"] + widths["pmos"]*spice["pmos_leakage"]) # nA
+        current = current * 2**((temp - spice["temp"]) / 10.0)
+        return current * vdd * 1e-6 # nW to mW
+
+    def cal_dynamic_power(self, c, vdd, period):
+        """
+        Returns the average power (mW) of charging a capacitance c (fF)
+        to vdd once in a period (ns). The c can be a NumPy array.
+        """
+        return c * vdd**2 / period * 1e-3 # uW to mW
+
     def generate_rc_net(self,lump_num, wire_length, wire_width):
         return wire_spice_model(lump_num, wire_length, wire_width)
 
@@ -220,6 +275,7 @@ class delay_data:
     This is the delay class to represent the delay information
     Time is 50% of the signal to 50% of reference signal delay.
     Slew is the 10% of the signal to 90% of signal
+    Both are floats or NumPy arrays of a grid of slews and loads.
     """
     def __init__(self, delay=0.0, slew=0.0):
         """ init function support two init method"""
@@ -251,6 +307,7 @@ class delay_data:
 class wire_spice_model:
     """
     This is the spice class to represent a wire
+    The wire length and width can be NumPy arrays of several wires.
     """
     def __init__(self, lump_num, wire_length, wire_width):
         self.lump_num = lump_num # the number of segment the wire delay has
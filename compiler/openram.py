@@ -95,8 +95,10 @@ if OPTS.use_pex:
 
 # Characterize the design
 from characterizer import lib
-libname = OPTS.output_path + s.name + ".lib"
-print("LIB: Writing to {0}".format(libname))
+if len(OPTS.corners) > 0:
+    print("LIB: Writing {0} corners to {1}_*.lib".format(len(OPTS.corners), OPTS.output_path + s.name))
+else:
+    print("LIB: Writing to {0}".format(OPTS.output_path + s.name + ".lib"))
 if OPTS.analytical_delay:
     print("Using analytical delay models (no characterization)")
 else:
@@ -104,9 +106,22 @@ else:
         print("Performing simulation-based characterization with {}".format(OPTS.spice_name))
     if OPTS.trim_netlist:
         print("Trimming netlist to speed up characterization.")
-lib.lib(libname,s,sram_file)
+    # The characterization steps are journaled so that a run can resume
+    if OPTS.checkpoint_file == "":
+        OPTS.checkpoint_file = OPTS.output_path + s.name + ".ckpt"
+    if OPTS.resume:
+        print("Resuming the characterization from {0}".format(OPTS.checkpoint_file))
+lib.write_libs(OPTS.output_path + s.name,s,sram_file)
 last_time=print_time("Characterization", datetime.datetime.now(), last_time)
 
+# Characterize the delay distribution of the process variations
+if OPTS.mc_samples > 0 and not OPTS.analytical_delay:
+    from characterizer import monte_carlo
+    mcname = OPTS.output_path + s.name + ".mc.json"
+    print("MC: Writing {0} Monte Carlo samples to {1}".format(OPTS.mc_samples, mcname))
+    monte_carlo.write_monte_carlo(OPTS.output_path + s.name, s, sram_file)
+    last_time=print_time("Monte Carlo", datetime.datetime.now(), last_time)
+
 # Write the layout
 gdsname = OPTS.output_path + s.name + ".gds"
 print("GDS: Writing to {0}".format(gdsname))
@@ -34,6 +34,12 @@ class options(optparse.Values):
     use_pex = False
     # Remove noncritical memory cells for characterization speed-up
     trim_netlist = True
+    # Trim the netlist to the cone of influence of the probed bit and
+    # replace the removed cells with their loads (see characterizer/reduce_spice.py)
+    reduce_netlist = False
+    # Characterize several probes (the far and near corners, each bank and
+    # a column mux boundary) and write the worst case of them to the .lib
+    worst_case_probes = False
     # Use detailed LEF blockages
     detailed_blockages = True
     # Define the output file paths
@@ -44,6 +50,90 @@ class options(optparse.Values):
     analytical_delay = True
     # Purge the temp directory after a successful run (doesn't purge on errors, anyhow)
     purge_temp = True
+    # Number of simulations to run at once and number of threads of each
+    # simulator. The one that is 0 shares out the CPU cores of the host (or
+    # of the batch scheduler job) and by default each simulation has two
+    # threads and there is one simulation per two cores.
+    num_sim_jobs = 0
+    sim_threads = 0
+    # Number of candidate points simulated at once in each step of the
+    # period and setup/hold searches (0 picks it from num_sim_jobs)
+    num_search_points = 0
+    # Simulate several table points in one simulator run with .ALTER blocks (hspice only)
+    batch_sweeps = True
+    # Only simulate the cycles of the measurements that are needed and stop
+    # after the last measurement window
+    windowed_transient = True
+    # The time step (ps) outside the measurement windows (hspice/xa only,
+    # 0 is the fine 5ps step everywhere)
+    coarse_time_step = 50
+    # How to run the simulator: "batch" starts it for each simulation,
+    # "session" keeps interactive simulators running between them (ngspice only),
+    # "mock" makes up results from a model (see characterizer/mock_sim.py) and
+    # "replay" reuses the results recorded in the simulation cache of sim_replay_dir
+    # and "queue" has workers on any host run them (see characterizer/sim_queue.py)
+    sim_backend = "batch"
+    # Kill a simulation that runs longer than this (seconds, 0 is no limit,
+    # which suits large arrays that simulate for hours) and retry a failed
+    # simulation this many times with relaxed options (another integration
+    # method, a looser reltol and, unless it timed out, smaller time steps)
+    # before its measurements count as failed
+    sim_timeout = 0
+    sim_retries = 2
+    # Save the waveforms of the measured nodes to a binary .raw file and
+    # measure them in Python instead of with .meas statements (batch
+    # ngspice only, see characterizer/raw_waveforms.py)
+    use_raw_waveforms = False
+    # The relative noise and random seed of the mock simulator
+    mock_noise = 0.01
+    mock_seed = 0
+    sim_replay_dir = ""
+    # The directory of the simulation jobs of the queue backend, shared with
+    # the workers ("" is a queue in the temp dir), how the workers run the
+    # simulations ("batch", "session" or "mock") and the number of worker
+    # processes to start on this host (0 if they run elsewhere, see sim_worker.py)
+    sim_queue_dir = ""
+    sim_queue_backend = "batch"
+    sim_queue_workers = 0
+    # The input slews and output loads of the lookup tables as multiples
+    # of the technology rise time and flip-flop input capacitance
+    # (e.g. [0.1, 0.25, 0.5, 1, 2, 4, 8] for 7x7 tables)
+    slew_scales = [0.25, 1, 8]
+    load_scales = [0.25, 1, 8]
+    # Simulate only some points of the tables and interpolate the others
+    # within a relative error tolerance (see characterizer/lut_sampler.py)
+    adaptive_lut = False
+    lut_tolerance = 0.02
+    lut_max_rounds = 20
+    # Reuse the results of unchanged simulations from an on-disk cache
+    use_sim_cache = True
+    sim_cache_dir = os.path.expanduser("~/.openram/sim_cache/")
+    # Maximum number of cached simulation results
+    sim_cache_size = 100000
+    # Start the feasible period search at the analytical delay times this
+    # safety factor (if it is longer than the technology's feasible period)
+    # and the min period search at the analytical min period, or both at
+    # the periods of an earlier run of the same configuration
+    period_warm_start = True
+    period_safety_factor = 5.0
+    # Characterize the read delay distribution of this many Monte Carlo
+    # variants of the simulated netlist (0 is none, see
+    # characterizer/monte_carlo.py). Each transistor gets a random Vth shift
+    # (Pelgrom coefficient in mV*um) and channel length (relative sigma).
+    # The variants are seeded by mc_seed and the report has these quantiles.
+    mc_samples = 0
+    mc_seed = 0
+    mc_vth_avt = 2.5
+    mc_length_sigma = 0.02
+    mc_quantiles = [0.001, 0.01, 0.5, 0.99, 0.999]
+    # Journal the finished characterization steps to this file ("" is no
+    # journal, openram.py uses <output>.ckpt) and skip them when resuming
+    checkpoint_file = ""
+    resume = False
+    # The (process, supply voltage, temperature) corners to characterize,
+    # e.g. [("SS", 0.9, 125), ("TT", 1.0, 25), ("FF", 1.1, -40)], with one
+    # .lib per corner. Empty is the nominal corner of the technology.
+    corners = []
     
 
     # These are the default modules that can be over-riden
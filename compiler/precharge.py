@@ -198,4 +198,13 @@ class precharge(pgate.pgate):
                       offset=ll_pos,
                       width=width,
                       height=height)
-        
+
+    def analytical_delay(self, slew, load=0.0, swing=0.5):
+        """ return the delay of the pmos restoring a bitline (load) that
+        swung down by swing. The pmos is sized by beta, so it drives
+        like a minimum nmos. """
+        from tech import spice
+        size = self.ptx_width/(self.beta*parameter["min_tx_size"])
+        r = spice["min_tx_r"]/size
+        c_para = spice["min_tx_drain_c"]*size
+        return self.cal_delay_with_rc(r = r, c =  c_para+load, slew = slew, swing = swing)
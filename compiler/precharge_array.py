@@ -74,3 +74,5 @@ class precharge_array(design.design):
             self.connect_inst(["bl[{0}]".format(i), "br[{0}]".format(i),
                                "en", "vdd"])
 
+    def analytical_delay(self, slew, load=0.0, swing=0.5):
+        return self.pc_cell.analytical_delay(slew=slew, load=load, swing=swing)
@@ -75,6 +75,12 @@ class ptx(design.design):
         self.spice.append("\n* ptx " + self.spice_device)
         # self.spice.append(".ENDS {0}".format(self.name))
 
+    def transistor_widths(self):
+        """ Returns the total width (um) of the fingers of the transistor. """
+        widths = {"nmos": 0.0, "pmos": 0.0}
+        widths[self.tx_type] = self.mults * self.tx_width
+        return widths
+
     def setup_layout_constants(self):
         """
         Pre-compute some handy layout parameters.
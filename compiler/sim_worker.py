@@ -0,0 +1,41 @@
+#!/usr/bin/env python2.7
+"""
+Simulation Worker
+
+Runs the simulation jobs that characterizations with the "queue"
+sim_backend write to a shared queue directory (see
+characterizer/sim_queue.py) until it is stopped. Start it on any host
+that can read and write the queue directory:
+
+sim_worker.py [-t tech] <queue dir> [number of processes]
+
+The technology must match the characterization. The simulator of each
+job is found in the PATH of this host.
+"""
+
+import sys
+import globals
+
+(OPTS, args) = globals.parse_args()
+
+# These depend on arguments, so don't load them until now.
+import debug
+
+if len(args) < 1 or len(args) > 2:
+    print(__doc__)
+    sys.exit(2)
+
+globals.setup_paths()
+globals.import_tech()
+
+# The simulator is found for each job, not when loading the characterizer
+OPTS.analytical_delay = True
+from characterizer import sim_queue
+
+num_workers = 1
+if len(args) == 2:
+    num_workers = int(args[1])
+
+# Each worker runs one simulation at a time, so the workers share the CPUs
+OPTS.num_sim_jobs = num_workers
+sim_queue.run_workers(args[0], num_workers)
@@ -1007,5 +1007,33 @@ class sram(design.design):
         sp.close()
 
     def analytical_delay(self,slew,load):
-        """ LH and HL are the same in analytical model. """
+        """ LH and HL are the same in analytical model. The slew and load
+        can be NumPy arrays to get the delays of a grid at once. """
         return self.bank.analytical_delay(slew,load)
+
+    def analytical_min_period(self,slew,load):
+        """ The minimum clock period (in ps) of the bank. """
+        return self.bank.analytical_min_period(slew,load)
+
+    def periphery_width(self):
+        """ The width (um) of the transistors of one bank and outside of
+        the banks, without the bitcell array. """
+        total = sum(self.transistor_widths().values())
+        bank = sum(self.bank.transistor_widths().values())
+        array = sum(self.bank.bitcell_array.transistor_widths().values())
+        return total - self.num_banks*bank + bank - array
+
+    def analytical_power(self,slew,load,vdd,temp):
+        """ Returns the minimum period (in ns) and the average read and
+        write power and the leakage power (in mW) at that period. Besides
+        the bitlines, wordline and flop inputs of the bank, a cycle
+        switches the internal nodes of the periphery, which the technology
+        gives per um of width. Only one bank switches in a cycle but every
+        bank leaks. """
+        period = self.analytical_min_period(slew,load)/1e3
+        (read_c, write_c) = self.bank.analytical_switched_c(load)
+        periphery_c = spice["periphery_switched_c"] * self.periphery_width()
+        leakage = self.analytical_leakage(vdd,temp)
+        read_power = self.cal_dynamic_power(read_c + periphery_c,vdd,period) + leakage
+        write_power = self.cal_dynamic_power(write_c + periphery_c,vdd,period) + leakage
+        return (period, read_power, write_power, leakage)
@@ -0,0 +1,60 @@
+#!/usr/bin/env python2.7
+"""
+Check that the analytical delay of a grid of slews and loads is the same
+as the delay of each point
+"""
+
+import unittest
+from testutils import header,openram_test
+import sys,os
+sys.path.append(os.path.join(sys.path[0],".."))
+import globals
+from globals import OPTS
+import debug
+
+class analytical_delay_test(openram_test):
+
+    def runTest(self):
+        globals.init_openram("config_20_{0}".format(OPTS.tech_name))
+        OPTS.check_lvsdrc = False
+
+        import sram
+        import tech
+        import numpy as np
+        from characterizer import delay
+
+        debug.info(1, "Analytical delay of sample 2 bit, 16 words SRAM with 1 bank")
+        s = sram.sram(word_size=2,
+                      num_words=OPTS.num_words,
+                      num_banks=OPTS.num_banks,
+                      name="sram_2_16_1_{0}".format(OPTS.tech_name))
+        OPTS.check_lvsdrc = True
+
+        slews = [0.25*tech.spice["rise_time"], tech.spice["rise_time"], 8*tech.spice["rise_time"]]
+        loads = [0.5*tech.spice["FF_in_cap"], 4*tech.spice["FF_in_cap"]]
+        data = delay.delay(s, None).analytical_model(s, slews, loads)
+
+        # The grid is in the order of the loads for each slew
+        points = [(slew, load) for slew in slews for load in loads]
+        self.assertEqual(len(data["delay1"]), len(points))
+        for (i, (slew, load)) in enumerate(points):
+            point = s.analytical_delay(slew, load)
+            self.assertEqual(type(data["delay1"][i]), float)
+            self.assertAlmostEqual(data["delay1"][i], point.delay/1e3)
+            self.assertAlmostEqual(data["delay0"][i], point.delay/1e3)
+            self.assertAlmostEqual(data["slew1"][i], point.slew/1e3)
+            self.assertAlmostEqual(data["slew0"][i], point.slew/1e3)
+
+        # The bank delay of an array of loads is an array
+        grid = s.analytical_delay(np.array(slews[1]), np.array(loads))
+        self.assertEqual(np.shape(grid.delay), (len(loads),))
+        self.assertTrue(grid.delay[1] > grid.delay[0])
+
+        globals.end_openram()
+
+# instantiate a copy of the class to actually run the test
+if __name__ == "__main__":
+    (OPTS, args) = globals.parse_args()
+    del sys.argv[1:]
+    header(__file__, OPTS.tech_name)
+    unittest.main()
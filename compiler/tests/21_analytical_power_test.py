@@ -0,0 +1,100 @@
+#!/usr/bin/env python2.7
+"""
+Check the analytical minimum period and power against golden spice
+results that the model wasn't fit to
+"""
+
+import unittest
+from testutils import header,openram_test
+import sys,os,re
+sys.path.append(os.path.join(sys.path[0],".."))
+import globals
+from globals import OPTS
+import debug
+
+# The largest error (a factor) of the minimum period and of the power.
+# The switched capacitance of the periphery is fit to the 2x16 SRAM of
+# the .lib golden, so the power is checked on the 1x16 SRAM of
+# 21_ngspice_delay_test instead. Its scn3me_subm power is 1.6x that of
+# the larger 2x16 SRAM, so the model is up to 2.5x lower there.
+max_error = {"freepdk45": (1.5, 1.5),
+             "scn3me_subm": (1.5, 2.5)}
+
+# The minimum period and the read and write power of the 1x16 SRAM at
+# twice the rise time and four flop loads (see 21_ngspice_delay_test)
+ngspice_golden = {"freepdk45": (0.781, [0.03308298, 0.03866541], [0.037257830000000006, 0.02695139]),
+                  "scn3me_subm": (4.688, [10.31395, 10.0321], [10.53758, 6.072756])}
+
+class analytical_power_test(openram_test):
+
+    def runTest(self):
+        globals.init_openram("config_20_{0}".format(OPTS.tech_name))
+        OPTS.check_lvsdrc = False
+
+        import sram
+        import tech
+        import numpy as np
+        from characterizer import delay
+        from characterizer.corner import corner
+
+        debug.info(1, "Analytical power of sample 2 and 1 bit, 16 words SRAMs with 1 bank")
+        s = sram.sram(word_size=2,
+                      num_words=OPTS.num_words,
+                      num_banks=OPTS.num_banks,
+                      name="sram_2_16_1_{0}".format(OPTS.tech_name))
+        small = sram.sram(word_size=1,
+                          num_words=OPTS.num_words,
+                          num_banks=OPTS.num_banks,
+                          name="sram_1_16_1_{0}".format(OPTS.tech_name))
+        OPTS.check_lvsdrc = True
+
+        slews = np.array(OPTS.slew_scales)*tech.spice["rise_time"]
+        loads = np.array(OPTS.load_scales)*tech.spice["FF_in_cap"]
+        data = delay.delay(s, None).analytical_model(s, slews, loads)
+
+        # The golden minimum period of the .lib file
+        golden = open("{0}/golden/{1}.lib".format(os.path.dirname(os.path.realpath(__file__)), s.name)).read()
+        golden_period = float(re.search(r'"minimum_period";.*?values\("([^"]+)"\)', golden, re.DOTALL).group(1))
+        (period_error, power_error) = max_error[OPTS.tech_name]
+        self.assertTrue(1/period_error < data["min_period"]/golden_period < period_error)
+
+        # The power is at the minimum period of the model. The simulations
+        # measured it at the feasible period, so the dynamic energy of a
+        # cycle is compared.
+        (period, read_power, write_power, leakage) = small.analytical_power(2*tech.spice["rise_time"],
+                                                                           4*tech.spice["FF_in_cap"],
+                                                                           tech.spice["supply_voltage"],
+                                                                           tech.spice["temp"])
+        (golden_period, golden_read, golden_write) = ngspice_golden[OPTS.tech_name]
+        self.assertTrue(1/period_error < period/golden_period < period_error)
+        for (power, golden_values) in [(write_power, golden_write), (read_power, golden_read)]:
+            energy = (power - leakage)*period
+            for value in golden_values:
+                golden_energy = (value - leakage)*tech.spice["feasible_period"]
+                self.assertTrue(1/power_error < energy/golden_energy < power_error)
+
+        # The leakage counts the transistors of the library cells and the
+        # generated ones and is part of the power
+        widths = s.bank.bitcell_array.cell.transistor_widths()
+        self.assertTrue(widths["nmos"] > 0 and widths["pmos"] > 0)
+        sram_widths = s.transistor_widths()
+        self.assertTrue(sram_widths["nmos"] > OPTS.num_words*s.word_size*widths["nmos"])
+        self.assertTrue(0 < data["leakage_power"] < data["read0_power"])
+
+        # It grows with the voltage and temperature of the corner
+        nominal = s.analytical_leakage(tech.spice["supply_voltage"], tech.spice["temp"])
+        self.isclose(data["leakage_power"], nominal)
+        self.isclose(s.analytical_leakage(tech.spice["supply_voltage"], tech.spice["temp"] + 20), 4*nominal)
+        hot = corner("TT", 1.1*tech.spice["supply_voltage"], 125)
+        hot_data = delay.delay(s, None, hot).analytical_model(s, slews, loads)
+        self.isclose(hot_data["leakage_power"], 1.1*2**10*nominal)
+        self.assertTrue(hot_data["write0_power"] > data["write0_power"])
+
+        globals.end_openram()
+
+# instantiate a copy of the class to actually run the test
+if __name__ == "__main__":
+    (OPTS, args) = globals.parse_args()
+    del sys.argv[1:]
+    header(__file__, OPTS.tech_name)
+    unittest.main()
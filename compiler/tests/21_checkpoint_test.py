@@ -0,0 +1,111 @@
+#!/usr/bin/env python2.7
+"""
+Check that a characterization resumes from its checkpoint on the mock
+simulator
+"""
+
+import unittest
+from testutils import header,openram_test
+import sys,os,json
+sys.path.append(os.path.join(sys.path[0],".."))
+import globals
+from globals import OPTS
+import debug
+
+class checkpoint_test(openram_test):
+
+    def runTest(self):
+        globals.init_openram("config_20_{0}".format(OPTS.tech_name))
+        OPTS.check_lvsdrc = False
+        OPTS.analytical_delay = False
+        saved = (OPTS.spice_name, OPTS.sim_backend, OPTS.use_sim_cache, OPTS.checkpoint_file, OPTS.resume)
+        OPTS.spice_name = "ngspice"
+        OPTS.sim_backend = "mock"
+        OPTS.use_sim_cache = False
+        OPTS.checkpoint_file = OPTS.openram_temp + "sram.ckpt"
+        OPTS.resume = False
+
+        # This is a hack to reload the characterizer __init__ with the backend
+        import characterizer
+        reload(characterizer)
+        from characterizer import delay,setup_hold,mock_sim,checkpoint
+        import sram
+        import tech
+
+        debug.info(1, "Testing the checkpoint of sample 2 bit, 16 words SRAM with 1 bank")
+        s = sram.sram(word_size=2,
+                      num_words=OPTS.num_words,
+                      num_banks=OPTS.num_banks,
+                      name="sram_2_16_1_{0}".format(OPTS.tech_name))
+        tempspice = OPTS.openram_temp + "temp.sp"
+        s.sp_write(tempspice)
+        mock_sim.register_model(s.name, mock_sim.analytical_model(s))
+
+        probe = ("1"*s.addr_size, s.word_size-1)
+        slews = [tech.spice["rise_time"], 4*tech.spice["rise_time"]]
+        loads = [tech.spice["FF_in_cap"], 4*tech.spice["FF_in_cap"]]
+
+        def characterize():
+            num_runs = mock_sim.num_runs
+            data = delay.delay(s, tempspice).analyze(probe[0], probe[1], slews, loads)
+            times = setup_hold.setup_hold().analyze(slews[:1], slews[:1])
+            return (data, times, mock_sim.num_runs - num_runs)
+
+        (data, times, full_runs) = characterize()
+        lines = open(OPTS.checkpoint_file).read().splitlines()
+
+        # A new run starts the journal over
+        checkpoint.journal = None
+        (new_data, new_times, runs) = characterize()
+        self.assertEqual(runs, full_runs)
+        self.assertEqual(len(open(OPTS.checkpoint_file).read().splitlines()), len(lines))
+
+        # A run that died half way (in the middle of a line) resumes from
+        # the finished steps with the same results
+        f = open(OPTS.checkpoint_file, "w")
+        f.write("\n".join(lines[:len(lines)/2]) + "\n" + lines[len(lines)/2][:10])
+        f.close()
+        OPTS.resume = True
+        checkpoint.journal = None
+        (resumed_data, resumed_times, runs) = characterize()
+        self.assertTrue(0 < runs < full_runs)
+        self.assertEqual(resumed_data, data)
+        self.assertEqual(resumed_times, times)
+        # The cut line isn't glued to the entries after it
+        resumed_lines = open(OPTS.checkpoint_file).read().splitlines()
+        self.assertEqual(resumed_lines[:len(lines)/2], lines[:len(lines)/2])
+        for line in resumed_lines:
+            self.assertEqual(len(json.loads(line)), 3)
+
+        # A finished run doesn't simulate again
+        checkpoint.journal = None
+        (resumed_data, resumed_times, runs) = characterize()
+        self.assertEqual(runs, 0)
+        self.assertEqual(resumed_data, data)
+        self.assertEqual(resumed_times, times)
+
+        # The first entry after a cut line is kept
+        f = open(OPTS.checkpoint_file, "w")
+        f.write('["a", "x", 1]\n["a", "z"')
+        f.close()
+        journal = checkpoint.checkpoint(OPTS.checkpoint_file, True)
+        journal.put("a", "w", 3)
+        journal.journal.close()
+        journal = checkpoint.checkpoint(OPTS.checkpoint_file, True)
+        self.assertEqual((journal.get("a", "x"), journal.get("a", "z"), journal.get("a", "w")), (1, None, 3))
+        journal.journal.close()
+        self.assertEqual(open(OPTS.checkpoint_file).read(), '["a", "x", 1]\n["a", "w", 3]\n')
+
+        checkpoint.journal = None
+        (OPTS.spice_name, OPTS.sim_backend, OPTS.use_sim_cache, OPTS.checkpoint_file, OPTS.resume) = saved
+        OPTS.check_lvsdrc = True
+        OPTS.analytical_delay = True
+        reload(characterizer)
+        globals.end_openram()
+
+# instantiate a copy of the class to actually run the test
+if __name__ == "__main__":
+    (OPTS, args) = globals.parse_args()
+    del sys.argv[1:]
+    header(__file__, OPTS.tech_name)
+    unittest.main()
@@ -0,0 +1,55 @@
+#!/usr/bin/env python2.7
+"""
+Check the adaptive sampling of a lookup table against smooth functions
+"""
+
+import unittest
+from testutils import header,openram_test
+import sys,os
+sys.path.append(os.path.join(sys.path[0],".."))
+import globals
+from globals import OPTS
+import debug
+
+class lut_sampler_test(openram_test):
+
+    def runTest(self):
+        globals.init_openram("config_20_{0}".format(OPTS.tech_name))
+        import characterizer
+        from characterizer.lut_sampler import lut_sampler
+        import numpy as np
+
+        slews = 0.005*np.array([0.1, 0.25, 0.5, 1, 2, 4, 8])
+        loads = 0.2091*np.array([0.1, 0.25, 0.5, 1, 2, 4, 8])
+        def table(slew, load):
+            # a delay and a slew that are roughly linear in the load
+            return (0.2 + 0.05*load + 0.4*slew + 0.2*np.sqrt(slew), 0.03 + 0.1*load + 0.05*slew)
+
+        simulated = []
+        def simulate(points):
+            simulated.extend(points)
+            return [table(slew, load) for (slew, load) in points]
+
+        results = lut_sampler(slews, loads, simulate, tolerance=0.01).sample()
+        self.assertEqual(len(results), 49)
+        self.assertTrue(len(simulated) < 49)
+        self.assertEqual(len(simulated), len(set(simulated)))
+        # The simulated points are exact and the others are close
+        expected = [table(slew, load) for slew in slews for load in loads]
+        for (result, value) in zip(results, expected):
+            for (x, y) in zip(result, value):
+                self.isclose(x, y, 0.02)
+
+        # A 3x3 table is simulated fully
+        simulated = []
+        results = lut_sampler(slews[:3], loads[:3], simulate).sample()
+        self.assertEqual(len(simulated), 9)
+
+        globals.end_openram()
+
+# instantiate a copy of the class to actually run the test
+if __name__ == "__main__":
+    (OPTS, args) = globals.parse_args()
+    del sys.argv[1:]
+    header(__file__, OPTS.tech_name)
+    unittest.main()
@@ -0,0 +1,75 @@
+#!/usr/bin/env python2.7
+"""
+Run the setup/hold characterization on the mock simulator, reuse its
+tables and replay it
+"""
+
+import unittest
+from testutils import header,openram_test
+import sys,os
+sys.path.append(os.path.join(sys.path[0],".."))
+import globals
+from globals import OPTS
+import debug
+
+class mock_sim_test(openram_test):
+
+    def runTest(self):
+        globals.init_openram("config_20_{0}".format(OPTS.tech_name))
+        OPTS.check_lvsdrc = False
+        OPTS.analytical_delay = False
+        saved = (OPTS.spice_name, OPTS.sim_backend, OPTS.use_sim_cache, OPTS.sim_cache_dir)
+        OPTS.spice_name = "ngspice"
+        OPTS.sim_backend = "mock"
+        # Record the mocked results in a cache to replay them
+        OPTS.use_sim_cache = True
+        OPTS.sim_cache_dir = OPTS.openram_temp + "recording/"
+
+        # This is a hack to reload the characterizer __init__ with the backend
+        import characterizer
+        reload(characterizer)
+        from characterizer import setup_hold,mock_sim
+        import tech
+
+        slews = [tech.spice["rise_time"]*2]
+        num_runs = mock_sim.num_runs
+        data = setup_hold.setup_hold().analyze(slews,slews)
+        self.assertTrue(mock_sim.num_runs > num_runs)
+
+        # The flip-flop of the mock simulator has the setup and hold times
+        # of the technology, which the search finds within its resolution
+        resolution = 0.1 * tech.spice["feasible_period"]
+        for k in ["setup_times_LH", "setup_times_HL"]:
+            self.assertTrue(abs(data[k][0] - tech.spice["msflop_setup"]/1e3) < resolution)
+        for k in ["hold_times_LH", "hold_times_HL"]:
+            self.assertTrue(abs(data[k][0] - tech.spice["msflop_hold"]/1e3) < resolution)
+
+        # The tables of the flip-flop are reused without simulating
+        num_runs = mock_sim.num_runs
+        self.assertEqual(setup_hold.setup_hold().analyze(slews,slews), data)
+        self.assertEqual(mock_sim.num_runs, num_runs)
+        # but not for other slews
+        setup_hold.setup_hold().analyze(slews,[2*slews[0]])
+        self.assertTrue(mock_sim.num_runs > num_runs)
+
+        # The replay gives the same results without the mock simulator
+        OPTS.use_sim_cache = False
+        OPTS.sim_backend = "replay"
+        OPTS.sim_replay_dir = OPTS.sim_cache_dir
+        num_runs = mock_sim.num_runs
+        replay_data = setup_hold.setup_hold().analyze(slews,slews)
+        self.assertEqual(mock_sim.num_runs, num_runs)
+        self.assertEqual(data, replay_data)
+
+        (OPTS.spice_name, OPTS.sim_backend, OPTS.use_sim_cache, OPTS.sim_cache_dir) = saved
+        OPTS.check_lvsdrc = True
+        OPTS.analytical_delay = True
+        reload(characterizer)
+        globals.end_openram()
+
+# instantiate a copy of the class to actually run the test
+if __name__ == "__main__":
+    (OPTS, args) = globals.parse_args()
+    del sys.argv[1:]
+    header(__file__, OPTS.tech_name)
+    unittest.main()
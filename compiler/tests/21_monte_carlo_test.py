@@ -0,0 +1,102 @@
+#!/usr/bin/env python2.7
+"""
+Check the Monte Carlo variants and their delay statistics
+"""
+
+import unittest
+from testutils import header,openram_test
+import sys,os
+sys.path.append(os.path.join(sys.path[0],".."))
+import globals
+from globals import OPTS
+import debug
+
+class monte_carlo_test(openram_test):
+
+    def runTest(self):
+        globals.init_openram("config_20_{0}".format(OPTS.tech_name))
+        OPTS.check_lvsdrc = False
+        saved = (OPTS.analytical_delay, OPTS.sim_backend, OPTS.use_sim_cache)
+        OPTS.analytical_delay = False
+        OPTS.sim_backend = "mock"
+        OPTS.use_sim_cache = False
+
+        import sram
+        import tech
+        import numpy as np
+        import characterizer
+        reload(characterizer)
+        from characterizer import lib,mock_sim,monte_carlo
+
+        debug.info(1, "Testing Monte Carlo of 2 bit, 16 words SRAM with 1 bank")
+        s = sram.sram(word_size=2,
+                      num_words=OPTS.num_words,
+                      num_banks=OPTS.num_banks,
+                      name="sram_2_16_1_{0}".format(OPTS.tech_name))
+        OPTS.check_lvsdrc = True
+        tempspice = OPTS.openram_temp + "temp.sp"
+        s.sp_write(tempspice)
+        (address, data_bit, netlist) = lib.simulation_netlists(s, tempspice)[0]
+        mc = monte_carlo.monte_carlo(s, netlist, address, data_bit)
+
+        # Every transistor of the netlist and its bitcells varies
+        (dvth, dl) = mc.sample(200)
+        self.assertEqual(dvth.shape, (200, len(mc.transistors)))
+        bitcell = [j for (j, i) in enumerate(mc.transistors) if "Xbitcell" in mc.devices[i][0]]
+        self.assertTrue(len(bitcell) >= 6)
+
+        # The variants are seeded, so the first ones don't depend on the
+        # number of samples
+        (dvth3, dl3) = mc.sample(3)
+        self.assertTrue(np.array_equal(dvth3, dvth[:3]) and np.array_equal(dl3, dl[:3]))
+
+        # The sigmas follow the Pelgrom law and the length sigma
+        sigma_vth = OPTS.mc_vth_avt * 1e-3 / np.sqrt(mc.widths * mc.lengths)
+        self.assertTrue(np.all(abs(dvth.std(axis=0) / sigma_vth - 1) < 0.25))
+        self.assertTrue(np.all(abs(dl.std(axis=0) / (OPTS.mc_length_sigma * mc.lengths) - 1) < 0.25))
+
+        # A variant netlist is flat with the variations of its transistors
+        variant = OPTS.openram_temp + "variant.sp"
+        mc.write_variant(variant, 0, dvth[0], dl[0])
+        lines = open(variant).read().splitlines()
+        self.assertEqual(lines[1].split()[1], s.name)
+        devices = [l.split() for l in lines if l[0].upper() == "M"]
+        self.assertEqual(len(devices), len(mc.transistors))
+        self.assertFalse(any(l.startswith("X") for l in lines))
+        for (words, shift) in zip(devices, dvth[0]):
+            self.assertAlmostEqual(float(words[-1].split("=")[1]), shift, places=6)
+
+        # The statistics of the NumPy stand-in
+        evaluator = monte_carlo.model_evaluator(0.5, 0.4)
+        report = mc.analyze(200, tech.spice["rise_time"], tech.spice["FF_in_cap"], evaluator)
+        overdrive = evaluator.vdd - evaluator.vth
+        factor = ((1 + dl / mc.lengths) * (overdrive / (overdrive - dvth))**evaluator.alpha).mean(axis=1)
+        for (name, nominal) in [("delay_lh", 0.5), ("delay_hl", 0.4)]:
+            self.isclose(report[name]["mean"], nominal * factor.mean())
+            self.isclose(report[name]["std"], nominal * factor.std(ddof=1))
+            self.isclose(report[name]["quantiles"]["0.5"], nominal * np.median(factor))
+            self.assertEqual(report[name]["failed"], 0)
+            self.assertTrue(report[name]["quantiles"]["0.01"] < report[name]["quantiles"]["0.99"])
+
+        # Failed variants don't count in the statistics
+        stats = monte_carlo.statistics([1.0, 2.0, np.nan, 3.0])
+        self.assertEqual((stats["failed"], stats["mean"], stats["std"]), (1, 2.0, 1.0))
+
+        # The variants are simulated at once on the pool
+        mock_sim.register_model(s.name, mock_sim.analytical_model(s))
+        report = mc.analyze(4, tech.spice["rise_time"], tech.spice["FF_in_cap"])
+        for name in ["delay_lh", "delay_hl"]:
+            self.assertEqual(report[name]["failed"], 0)
+            self.assertTrue(abs(report[name]["mean"] / report["nominal"][name] - 1) < 0.1)
+        report_name = monte_carlo.write_report(OPTS.openram_temp + "mc.json", report)
+        self.assertTrue(os.path.isfile(report_name))
+
+        (OPTS.analytical_delay, OPTS.sim_backend, OPTS.use_sim_cache) = saved
+        globals.end_openram()
+
+# instantiate a copy of the class to actually run the test
+if __name__ == "__main__":
+    (OPTS, args) = globals.parse_args()
+    del sys.argv[1:]
+    header(__file__, OPTS.tech_name)
+    unittest.main()
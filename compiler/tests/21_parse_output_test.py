@@ -0,0 +1,80 @@
+#!/usr/bin/env python2.7
+"""
+Check the parsing of spice measurements
+"""
+
+import unittest
+from testutils import header,openram_test
+import sys,os,time
+sys.path.append(os.path.join(sys.path[0],".."))
+import globals
+from globals import OPTS
+import debug
+
+class parse_output_test(openram_test):
+
+    def runTest(self):
+        globals.init_openram("config_20_{0}".format(OPTS.tech_name))
+        import characterizer
+        from characterizer import charutils as ch
+
+        spice_name = OPTS.spice_name
+        OPTS.spice_name = "ngspice"
+        lis = OPTS.openram_temp + "timing.lis"
+        f = open(lis, "w")
+        # ngspice style
+        f.write("delay0              =  3.258940e-10 targ=  2.532589e-08 trig=  2.500000e-08\n")
+        f.write("delay1              =  failed\n")
+        # hspice style
+        f.write(" slew0= 1.2345E-11  targ= 2.5E-08   trig= 2.4E-08\n")
+        f.write(" read0_power= -2.5m  from= 1.0000E-08     to= 1.5000E-08\n")
+        f.write("delay0 = 1.0e-9\n")
+        f.close()
+
+        m = ch.parse_measurements("timing")
+        self.assertEqual(m["delay0"], "3.258940e-10")
+        self.assertEqual(m["delay1"], "Failed")
+        self.assertEqual(m["slew0"], "1.2345E-11")
+        self.assertEqual(m["read0_power"], "-2.5m")
+        self.assertEqual(ch.parse_output("timing", "slew0"), "1.2345E-11")
+        self.assertEqual(ch.parse_output("timing", "slew1"), "Failed")
+        self.assertEqual(ch.get_measurement(m, "delay1"), False)
+
+        # Repeated measurements are the results of .ALTER blocks
+        time.sleep(0.01)
+        f = open(lis, "w")
+        f.write("delay0 = 1.0e-10\ndelay1 = 2.0e-10\n")
+        f.write("delay0 = 3.0e-10\ndelay1 = failed\n")
+        f.close()
+        m = ch.parse_measurements("timing")
+        self.assertEqual(m["delay0@1"], "3.0e-10")
+        sweep = ch.split_sweep(m, 2)
+        self.assertEqual(sweep[0], {"delay0": "1.0e-10", "delay1": "2.0e-10"})
+        self.assertEqual(sweep[1], {"delay0": "3.0e-10", "delay1": "Failed"})
+
+        # The file is parsed again when it changes
+        time.sleep(0.01)
+        f = open(lis, "w")
+        f.write("delay0 = 2.0e-10\n")
+        f.close()
+        self.assertEqual(ch.parse_output("timing", "delay0"), "2.0e-10")
+
+        # scientific notation and spice scale factors
+        self.isclose(ch.convert_to_float("1.5e-10"), 1.5e-10)
+        self.assertEqual(ch.convert_to_float("-2.5E+3"), -2.5e3)
+        self.isclose(ch.convert_to_float("2.5m"), 2.5e-3)
+        self.isclose(ch.convert_to_float("3meg"), 3e6)
+        self.isclose(ch.convert_to_float("4.1ns"), 4.1e-9)
+        self.isclose(ch.convert_to_float("7f"), 7e-15)
+        self.isclose(ch.convert_to_float(".5p"), 0.5e-12)
+        self.assertEqual(ch.convert_to_float("Failed"), False)
+
+        OPTS.spice_name = spice_name
+        globals.end_openram()
+
+# instantiate a copy of the class to actually run the test
+if __name__ == "__main__":
+    (OPTS, args) = globals.parse_args()
+    del sys.argv[1:]
+    header(__file__, OPTS.tech_name)
+    unittest.main()
@@ -0,0 +1,106 @@
+#!/usr/bin/env python2.7
+"""
+Check the analytical warm start of the period searches on the mock
+simulator and the record of the periods for later runs
+"""
+
+import unittest
+from testutils import header,openram_test
+import sys,os
+sys.path.append(os.path.join(sys.path[0],".."))
+import globals
+from globals import OPTS
+import debug
+
+class period_warm_start_test(openram_test):
+
+    def runTest(self):
+        globals.init_openram("config_20_{0}".format(OPTS.tech_name))
+        OPTS.check_lvsdrc = False
+        OPTS.analytical_delay = False
+        saved = (OPTS.spice_name, OPTS.sim_backend, OPTS.use_sim_cache, OPTS.sim_cache_dir)
+        OPTS.spice_name = "ngspice"
+        OPTS.sim_backend = "mock"
+        OPTS.use_sim_cache = False
+        OPTS.sim_cache_dir = OPTS.openram_temp + "cache/"
+
+        # This is a hack to reload the characterizer __init__ with the backend
+        import characterizer
+        reload(characterizer)
+        from characterizer import delay,mock_sim
+        import sram
+        import tech
+
+        debug.info(1, "Testing the periods of sample 2 bit, 16 words SRAM with 1 bank")
+        s = sram.sram(word_size=2,
+                      num_words=OPTS.num_words,
+                      num_banks=OPTS.num_banks,
+                      name="sram_2_16_1_{0}".format(OPTS.tech_name))
+        tempspice = OPTS.openram_temp + "temp.sp"
+        s.sp_write(tempspice)
+        mock_sim.register_model(s.name, mock_sim.analytical_model(s))
+
+        probe = ("1"*s.addr_size, s.word_size-1)
+        slews = [tech.spice["rise_time"]]
+        loads = [tech.spice["FF_in_cap"]]
+
+        # Without the warm start, the search starts at the technology's period
+        OPTS.period_warm_start = False
+        num_runs = mock_sim.num_runs
+        cold = delay.delay(s, tempspice).analyze(probe[0], probe[1], slews, loads)
+        cold_runs = mock_sim.num_runs - num_runs
+
+        # The warm start tries the analytical min period first and saves
+        # simulations. The feasible period doesn't go below the
+        # technology's period, so the delays are the same.
+        OPTS.period_warm_start = True
+        OPTS.use_sim_cache = True
+        d = delay.delay(s, tempspice)
+        d.set_probe(probe[0], probe[1])
+        analytical_delay = s.analytical_delay(slews[0], loads[0])
+        estimate = max(analytical_delay.delay, analytical_delay.slew) / 1e3
+        self.assertTrue(OPTS.period_safety_factor * estimate < tech.spice["feasible_period"])
+        self.assertEqual(d.initial_period(loads[0], slews[0]), tech.spice["feasible_period"])
+        # The search of a large SRAM starts at the analytical delay
+        OPTS.period_safety_factor = 2 * tech.spice["feasible_period"] / estimate
+        self.assertAlmostEqual(d.initial_period(loads[0], slews[0]), 2 * tech.spice["feasible_period"], places=3)
+        OPTS.period_safety_factor = 5.0
+        period = s.analytical_min_period(slews[0], loads[0]) / 1e3
+        self.assertAlmostEqual(d.min_period_guess(loads[0], slews[0]), period, places=3)
+        num_runs = mock_sim.num_runs
+        warm = d.analyze(probe[0], probe[1], slews, loads)
+        self.assertTrue(mock_sim.num_runs - num_runs < cold_runs)
+        self.assertTrue(abs(warm["min_period"] - cold["min_period"]) <= 0.05 * cold["min_period"])
+        self.assertEqual(warm["delay1"], cold["delay1"])
+        self.assertEqual(warm["read0_power"], cold["read0_power"])
+
+        # A later run starts at the recorded periods
+        record = d.load_periods(loads[0], slews[0])
+        self.assertAlmostEqual(record["min_period"], warm["min_period"], places=3)
+        d = delay.delay(s, tempspice)
+        d.set_probe(probe[0], probe[1])
+        self.assertEqual(d.initial_period(loads[0], slews[0]), record["feasible_period"])
+        self.assertEqual(d.min_period_guess(loads[0], slews[0]), record["min_period"])
+
+        # The feasible period of another netlist isn't used since the
+        # delays and power are measured at it, but its min period is
+        f = open(tempspice, "a")
+        f.write("* changed netlist\n")
+        f.close()
+        d.save_periods(loads[0], slews[0], 4 * tech.spice["feasible_period"], record["min_period"])
+        s.sp_write(tempspice)
+        self.assertEqual(d.initial_period(loads[0], slews[0]), tech.spice["feasible_period"])
+        self.assertEqual(d.min_period_guess(loads[0], slews[0]), record["min_period"])
+
+        (OPTS.spice_name, OPTS.sim_backend, OPTS.use_sim_cache, OPTS.sim_cache_dir) = saved
+        OPTS.check_lvsdrc = True
+        OPTS.analytical_delay = True
+        reload(characterizer)
+        globals.end_openram()
+
+# instantiate a copy of the class to actually run the test
+if __name__ == "__main__":
+    (OPTS, args) = globals.parse_args()
+    del sys.argv[1:]
+    header(__file__, OPTS.tech_name)
+    unittest.main()
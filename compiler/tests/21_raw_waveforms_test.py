@@ -0,0 +1,91 @@
+#!/usr/bin/env python2.7
+"""
+Check the measurements of the simulations from their binary .raw waveforms
+"""
+
+import unittest
+from testutils import header,openram_test
+import sys,os
+sys.path.append(os.path.join(sys.path[0],".."))
+import globals
+from globals import OPTS
+import debug
+
+class raw_waveforms_test(openram_test):
+
+    def runTest(self):
+        globals.init_openram("config_20_{0}".format(OPTS.tech_name))
+        import numpy as np
+        import characterizer
+        from characterizer import raw_waveforms,stimuli
+        from characterizer import charutils as ch
+
+        # A binary file reads back and its crossings are interpolated
+        time = np.linspace(0, 4e-9, 4001)
+        clk = 0.5 + 0.5*np.sin(2*np.pi*time/2e-9)
+        current = -1e-3*np.ones(len(time))
+        filename = OPTS.openram_temp + "test.raw"
+        raw_waveforms.write_raw(filename, time, {"v(clk)": clk, "i(vvdd)": current})
+        w = raw_waveforms.read_raw(filename)
+        self.assertTrue(np.array_equal(w.time, time))
+        self.assertTrue(np.array_equal(w["v(CLK)"], clk))
+        self.assertTrue("i(vvdd)" in w)
+        # sin(2pi t/2n) falls through 0.5 at 1n and 3n
+        self.assertEqual(len(w.crossings("v(clk)", 0.5, "fall")), 2)
+        self.isclose(w.crossing("v(clk)", 0.5, "fall", 1, 1.5e-9), 3e-9)
+        self.assertEqual(w.crossing("v(clk)", 0.5, "fall", 2, 1.5e-9), None)
+        self.isclose(w.statistic("avg", w.evaluate("par('(-1*v(clk)*I(vvdd))')"), 0, 2e-9), 0.5e-3)
+
+        # An ASCII file reads the same
+        f = open(filename, "w")
+        f.write("Title: ascii\nPlotname: Transient Analysis\nFlags: real\n")
+        f.write("No. Variables: 2\nNo. Points: 3\nVariables:\n\t0\ttime\ttime\n\t1\tclk\tvoltage\n")
+        f.write("Values:\n 0\t0.0\n\t0.0\n\n 1\t1e-9\n\t1.0\n\n 2\t2e-9\n\t0.0\n")
+        f.close()
+        w = raw_waveforms.read_raw(filename)
+        self.isclose(w.crossing("v(clk)", 0.5, "rise"), 0.5e-9)
+        self.isclose(w.crossing("v(clk)", 0.5, "fall"), 1.5e-9)
+
+        # The batch simulator saves the waveforms of the measured nodes
+        # and the measurements come from them
+        saved = (OPTS.spice_name, OPTS.spice_exe, OPTS.sim_backend, OPTS.use_sim_cache, OPTS.use_raw_waveforms)
+        OPTS.spice_name = "ngspice"
+        OPTS.spice_exe = "{0} {1}/spice_stub.py".format(sys.executable, os.path.dirname(os.path.abspath(__file__)))
+        OPTS.sim_backend = "batch"
+        OPTS.use_sim_cache = False
+        OPTS.use_raw_waveforms = True
+        f = open(OPTS.openram_temp + "stim.sp", "w")
+        f.write("* Stimulus\n")
+        f.write("Vclk clk 0 PWL (0n 1.0v 1n 1.0v 1.1n 0v )\n")
+        f.write("Vd d 0 PWL (0n 0v 1.2n 0v 1.4n 1.0v )\n")
+        f.write("Vvdd vdd 0.0 1.0\n")
+        stimuli.gen_meas_delay(f, "delay1", "clk", "d", 0.5, 0.5, "FALL", "RISE", 0, 0)
+        stimuli.gen_meas_delay(f, "slew1", "d", "d", 0.1, 0.9, "RISE", "RISE", 0, 0)
+        stimuli.gen_meas_delay(f, "missing", "clk", "d", 0.5, 0.5, "FALL", "FALL", 0, 0)
+        stimuli.gen_meas_power(f, "read_power", 0, 2)
+        f.write(".TRAN 5p 2n UIC\n")
+        f.write(".end\n")
+        f.close()
+        m = stimuli.run_sim()
+        self.isclose(ch.get_measurement(m, "delay1"), 0.25e-9)
+        self.isclose(ch.get_measurement(m, "slew1"), 0.16e-9)
+        self.assertEqual(ch.get_measurement(m, "missing"), False)
+        self.isclose(ch.get_measurement(m, "read_power"), 1e-3)
+
+        stim = open(OPTS.openram_temp + "raw_stim.sp").read()
+        self.assertTrue(".save i(vvdd) v(clk) v(d) v(vdd)\n" in stim)
+        self.assertFalse(".meas" in stim)
+
+        # More metrics come from the saved waveforms without simulating
+        w = raw_waveforms.load(OPTS.openram_temp)
+        self.isclose(w.statistic("max", w["v(d)"], 0, 2e-9), 1.0)
+
+        (OPTS.spice_name, OPTS.spice_exe, OPTS.sim_backend, OPTS.use_sim_cache, OPTS.use_raw_waveforms) = saved
+        globals.end_openram()
+
+# instantiate a copy of the class to actually run the test
+if __name__ == "__main__":
+    (OPTS, args) = globals.parse_args()
+    del sys.argv[1:]
+    header(__file__, OPTS.tech_name)
+    unittest.main()
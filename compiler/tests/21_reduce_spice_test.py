@@ -0,0 +1,68 @@
+#!/usr/bin/env python2.7
+"""
+Check the reduction of an SRAM netlist to the cone of influence of a bit
+"""
+
+import unittest
+from testutils import header,openram_test
+import sys,os,re
+sys.path.append(os.path.join(sys.path[0],".."))
+import globals
+from globals import OPTS
+import debug
+
+class reduce_spice_test(openram_test):
+
+    def runTest(self):
+        globals.init_openram("config_20_{0}".format(OPTS.tech_name))
+        OPTS.check_lvsdrc = False
+
+        import sram
+        from characterizer import reduce_spice
+
+        debug.info(1, "Reducing sample 2 bit, 16 words SRAM with 1 bank")
+        s = sram.sram(word_size=2,
+                      num_words=OPTS.num_words,
+                      num_banks=OPTS.num_banks,
+                      name="sram_2_16_1_{0}".format(OPTS.tech_name))
+        OPTS.check_lvsdrc = True
+
+        tempspice = OPTS.openram_temp + "temp.sp"
+        s.sp_write(tempspice)
+        reduced = OPTS.openram_temp + "reduced.sp"
+        reducer = reduce_spice.reduce_spice(tempspice, reduced)
+        reducer.set_configuration(s.num_banks, s.num_rows, s.num_cols, s.word_size)
+        reducer.trim("1"*s.addr_size, s.word_size-1)
+        lines = open(reduced).read().splitlines()
+
+        # The SRAM keeps its pins
+        top = [l for l in lines if l.startswith(".SUBCKT {0} ".format(s.name))]
+        self.assertEqual(len(top), 1)
+        self.assertEqual(top[0].split()[2:], reducer.top.pins)
+
+        # Only the probed bitcell of the array is kept
+        bitcells = [l.split() for l in lines if l.startswith("Xbank0_Xbitcell_array_")]
+        self.assertEqual(len(bitcells), 1)
+        (bl, br, wl) = bitcells[0][1:4]
+        self.assertTrue(bl.endswith("bl[1]") and wl.endswith("wl[15]"))
+
+        # The other bitcells of the column and row are lumped loads
+        cell = bitcells[0][-1]
+        (bl_role, bl_c) = reducer.leaf_pins[cell][0]
+        (wl_role, wl_c) = reducer.leaf_pins[cell][2]
+        self.assertEqual((bl_role, wl_role), ("channel", "gate"))
+        loads = dict((l.split()[1], l.split()[3]) for l in lines if l.startswith("Cload"))
+        self.assertAlmostEqual(float(loads[bl].rstrip("f")), (s.num_rows - 1) * bl_c)
+        self.assertAlmostEqual(float(loads[wl].rstrip("f")), (s.num_cols - 1) * wl_c)
+
+        # It is smaller than the whole netlist
+        self.assertTrue(len(lines) < len(open(tempspice).read().splitlines()))
+
+        globals.end_openram()
+
+# instantiate a copy of the class to actually run the test
+if __name__ == "__main__":
+    (OPTS, args) = globals.parse_args()
+    del sys.argv[1:]
+    header(__file__, OPTS.tech_name)
+    unittest.main()
@@ -0,0 +1,74 @@
+#!/usr/bin/env python2.7
+"""
+Check the simulation result cache
+"""
+
+import unittest
+from testutils import header,openram_test
+import sys,os,time
+sys.path.append(os.path.join(sys.path[0],".."))
+import globals
+from globals import OPTS
+import debug
+
+class sim_cache_test(openram_test):
+
+    def runTest(self):
+        globals.init_openram("config_20_{0}".format(OPTS.tech_name))
+        import characterizer
+        from characterizer import sim_cache
+
+        cache_dir = OPTS.openram_temp + "sim_cache/"
+        c = sim_cache.sim_cache(cache_dir, 4)
+
+        netlist = OPTS.openram_temp + "netlist.sp"
+        self.write_file(netlist, "* netlist\n")
+        stim = OPTS.openram_temp + "stim.sp"
+        self.write_file(stim, ".include \"{0}\"\n.end\n".format(netlist))
+
+        # The same stimulus and netlist give the same key
+        key = c.key(stim)
+        self.assertEqual(key, c.key(stim))
+        self.assertEqual(c.get(key), None)
+        c.put(key, {"delay0": "1.0e-10"})
+        self.assertEqual(c.get(key), {"delay0": "1.0e-10"})
+
+        # A netlist with the same contents in another place gives the same key
+        netlist2 = OPTS.openram_temp + "netlist2.sp"
+        self.write_file(netlist2, "* netlist\n")
+        self.write_file(stim, ".include \"{0}\"\n.end\n".format(netlist2))
+        self.assertEqual(key, c.key(stim))
+
+        # The threads of the simulator don't change the key
+        self.write_file(stim, ".include \"{0}\"\n.OPTIONS method=gear num_threads=4\n.end\n".format(netlist2))
+        threads_key = c.key(stim)
+        self.write_file(stim, ".include \"{0}\"\n.OPTIONS method=gear num_threads=1\n.end\n".format(netlist2))
+        self.assertEqual(threads_key, c.key(stim))
+        self.write_file(stim, ".include \"{0}\"\n.end\n".format(netlist2))
+
+        # A changed netlist gives a new key
+        time.sleep(0.01)
+        self.write_file(netlist2, "* changed netlist\n")
+        self.assertNotEqual(key, c.key(stim))
+
+        # The least recently used entries are evicted
+        for i in range(4):
+            os.utime(c.entry_name(key), None)
+            c.put("key{0}".format(i), {"delay0": str(i)})
+        self.assertNotEqual(c.get(key), None)
+        self.assertEqual(c.get("key0"), None)
+        self.assertTrue(len(c.entries()) <= 4)
+
+        globals.end_openram()
+
+    def write_file(self, name, contents):
+        f = open(name, "w")
+        f.write(contents)
+        f.close()
+
+# instantiate a copy of the class to actually run the test
+if __name__ == "__main__":
+    (OPTS, args) = globals.parse_args()
+    del sys.argv[1:]
+    header(__file__, OPTS.tech_name)
+    unittest.main()
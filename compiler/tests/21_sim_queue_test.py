@@ -0,0 +1,135 @@
+#!/usr/bin/env python2.7
+"""
+Check the queue of simulation jobs with local worker processes, the
+requeue of the jobs of dead workers and the deadlines of the jobs
+"""
+
+import unittest
+from testutils import header,openram_test
+import sys,os,time,threading,json
+sys.path.append(os.path.join(sys.path[0],".."))
+import globals
+from globals import OPTS
+import debug
+
+class sim_queue_test(openram_test):
+
+    def runTest(self):
+        globals.init_openram("config_20_{0}".format(OPTS.tech_name))
+        import characterizer
+        from characterizer import sim_pool,sim_queue
+        from characterizer import charutils as ch
+
+        saved = (OPTS.spice_name, OPTS.spice_exe, OPTS.sim_backend, OPTS.use_sim_cache,
+                 OPTS.sim_queue_dir, OPTS.sim_queue_backend, OPTS.sim_queue_workers,
+                 OPTS.sim_timeout, OPTS.sim_retries)
+        OPTS.spice_name = "ngspice"
+        OPTS.spice_exe = "{0} {1}/spice_stub.py".format(sys.executable, os.path.dirname(os.path.abspath(__file__)))
+        OPTS.use_sim_cache = False
+        OPTS.sim_backend = "queue"
+        OPTS.sim_queue_dir = OPTS.openram_temp + "queue"
+        OPTS.sim_queue_backend = "batch"
+        OPTS.sim_queue_workers = 2
+
+        # The included file is copied to the queue, so the workers don't
+        # need the temp dir
+        included = OPTS.openram_temp + "included.sp"
+        f = open(included, "w")
+        f.write("* included subckts\n")
+        f.close()
+
+        # The jobs run on the workers and their measurements come back
+        loads = [1, 2, 3, 4, 5, 6]
+        sim_dirs = []
+        for load in loads:
+            sim_dir = sim_pool.get_sim_dir("load{0}".format(load))
+            self.write_stim(sim_dir, load, included)
+            sim_dirs.append(sim_dir)
+        results = sim_pool.sim_pool(4).run(sim_dirs)
+        for (load, m) in zip(loads, results):
+            self.isclose(ch.get_measurement(m, "delay0"), load*1e-12)
+            self.isclose(ch.get_measurement(m, "delay1"), load*1e-12)
+
+        queue = sim_queue.get_queue()
+        for subdir in ["jobs", "pending", "running", "done"]:
+            self.assertEqual(os.listdir(queue.path(subdir)), [])
+        copies = os.listdir(queue.path("files"))
+        self.assertEqual(len(copies), 1)
+        self.assertEqual(open(queue.path("files", copies[0])).read(), "* included subckts\n")
+
+        # A job that fails on a worker fails the simulation
+        OPTS.sim_queue_backend = "queue"
+        sim_dir = sim_pool.get_sim_dir("failed")
+        self.write_stim(sim_dir, 1, included)
+        self.assertRaises(AssertionError, sim_pool.sim_pool(1).run, [sim_dir])
+
+        # The claim of a worker that died (it stopped touching it) is
+        # queued again and another worker runs the job
+        OPTS.sim_queue_backend = "batch"
+        sim_queue.stale_time = 3.0
+        sim_dir = sim_pool.get_sim_dir("stale")
+        self.write_stim(sim_dir, 2, included)
+        job_id = queue.submit(sim_dir + "stim.sp")
+        claim = queue.path("running", job_id + ".json")
+        os.rename(queue.path("pending", job_id + ".json"), claim)
+        os.utime(claim, (time.time() - 100, time.time() - 100))
+        result = queue.collect(job_id)
+        self.isclose(ch.get_measurement(result["measurements"], "delay0"), 2e-12)
+
+        # A job that a live worker doesn't finish in time has no result.
+        # The clock of the worker is behind, but its touches advance.
+        (OPTS.sim_timeout, OPTS.sim_retries) = (0.5, 0)
+        job_id = queue.submit(sim_dir + "stim.sp")
+        claim = queue.path("running", job_id + ".json")
+        os.rename(queue.path("pending", job_id + ".json"), claim)
+        skewed_time = time.time() - 100
+        os.utime(claim, (skewed_time, skewed_time))
+        heartbeat = threading.Timer(2.0, os.utime, (claim, (skewed_time + 2, skewed_time + 2)))
+        heartbeat.start()
+        self.assertEqual(queue.collect(job_id), None)
+        heartbeat.join()
+        self.assertFalse(os.path.isfile(queue.path("jobs", job_id + ".sp")))
+        self.assertFalse(os.path.isfile(claim))
+
+        # A job fails soon if no worker runs the jobs
+        sim_queue.stop_workers()
+        OPTS.sim_queue_workers = 0
+        start_time = time.time()
+        self.assertRaises(AssertionError, sim_pool.sim_pool(1).run, [sim_dir])
+        self.assertTrue(time.time() - start_time < 10)
+        for subdir in ["jobs", "pending", "running", "done"]:
+            self.assertEqual(os.listdir(queue.path(subdir)), [])
+
+        # The worker of a requeued job may still write its result. The
+        # job is collected without leaving its new claim behind.
+        job_id = queue.submit(sim_dir + "stim.sp")
+        sim_queue.write_atomic(queue.path("done", job_id + ".json"),
+                               json.dumps({"id": job_id, "return_code": 0, "measurements": {}}))
+        self.assertEqual(queue.collect(job_id)["return_code"], 0)
+        for subdir in ["jobs", "pending", "running", "done"]:
+            self.assertEqual(os.listdir(queue.path(subdir)), [])
+
+        sim_queue.stale_time = 30.0
+        (OPTS.spice_name, OPTS.spice_exe, OPTS.sim_backend, OPTS.use_sim_cache,
+         OPTS.sim_queue_dir, OPTS.sim_queue_backend, OPTS.sim_queue_workers,
+         OPTS.sim_timeout, OPTS.sim_retries) = saved
+        globals.end_openram()
+
+    def write_stim(self, sim_dir, load, included):
+        f = open(sim_dir + "stim.sp", "w")
+        f.write("* Stimulus for load={0}fF\n".format(load))
+        f.write(".include \"{0}\"\n".format(included))
+        f.write("Va a 0 PWL (0n 0v 1n 0v 1.1n 1.0v )\n")
+        f.write("C1 a 0 {0}f\n".format(load))
+        f.write(".meas tran delay0 TRIG v(a) VAL=0.5 RISE=1 TARG v(a) VAL=0.9 RISE=1\n")
+        f.write(".meas tran delay1 TRIG v(a) VAL=0.1 RISE=1 TARG v(a) VAL=0.9 RISE=1\n")
+        f.write(".TRAN 5p 2n UIC\n")
+        f.write(".end\n")
+        f.close()
+
+# instantiate a copy of the class to actually run the test
+if __name__ == "__main__":
+    (OPTS, args) = globals.parse_args()
+    del sys.argv[1:]
+    header(__file__, OPTS.tech_name)
+    unittest.main()
@@ -0,0 +1,95 @@
+#!/usr/bin/env python2.7
+"""
+Check the simulator backends with a scripted stand-in for ngspice
+"""
+
+import unittest
+from testutils import header,openram_test
+import sys,os,signal
+sys.path.append(os.path.join(sys.path[0],".."))
+import globals
+from globals import OPTS
+import debug
+
+class sim_session_test(openram_test):
+
+    def runTest(self):
+        globals.init_openram("config_20_{0}".format(OPTS.tech_name))
+        import characterizer
+        from characterizer import stimuli,sim_backend
+        from characterizer import charutils as ch
+
+        saved = (OPTS.spice_name, OPTS.spice_exe, OPTS.sim_backend, OPTS.use_sim_cache)
+        OPTS.spice_name = "ngspice"
+        OPTS.spice_exe = "{0} {1}/spice_stub.py".format(sys.executable, os.path.dirname(os.path.abspath(__file__)))
+        OPTS.use_sim_cache = False
+        log = OPTS.openram_temp + "stub.log"
+        os.environ["SPICE_STUB_LOG"] = log
+
+        # The batch backend runs the stand-in once per stimulus
+        OPTS.sim_backend = "batch"
+        self.write_stim(load=5)
+        m = stimuli.run_sim()
+        self.isclose(ch.get_measurement(m, "delay0"), 5e-12)
+
+        # The session loads the circuit once and then only alters the loads
+        OPTS.sim_backend = "session"
+        self.write_stim(load=5)
+        m = stimuli.run_sim()
+        self.isclose(ch.get_measurement(m, "delay0"), 5e-12)
+        self.write_stim(load=10, slew=0.2)
+        m = stimuli.run_sim()
+        self.isclose(ch.get_measurement(m, "delay0"), 10e-12)
+        self.isclose(ch.get_measurement(m, "delay1"), 10e-12)
+        self.assertEqual(self.count(log, "source"), 1)
+        self.assertEqual(self.count(log, "alter"), 2)
+
+        # A changed circuit is loaded again
+        self.write_stim(load=10, extra="C2 b 0 1f\n")
+        m = stimuli.run_sim()
+        self.isclose(ch.get_measurement(m, "delay0"), 11e-12)
+        self.assertEqual(self.count(log, "source"), 2)
+        self.assertEqual(self.count(log, "remcirc"), 1)
+
+        # A session that died fails its simulation, which is retried on a
+        # new session
+        os.killpg(sim_backend.idle_sessions[0].process.pid, signal.SIGKILL)
+        sim_backend.idle_sessions[0].process.wait()
+        m = stimuli.run_sim()
+        self.isclose(ch.get_measurement(m, "delay0"), 11e-12)
+
+        # Other errors aren't failed simulations
+        f = open(OPTS.openram_temp + "stim.sp", "w")
+        f.write("* Stimulus without a transient\n.end\n")
+        f.close()
+        self.assertRaises(AssertionError, stimuli.run_sim)
+
+        sim_backend.close_sessions()
+        del os.environ["SPICE_STUB_LOG"]
+        (OPTS.spice_name, OPTS.spice_exe, OPTS.sim_backend, OPTS.use_sim_cache) = saved
+        globals.end_openram()
+
+    def write_stim(self, load, slew=0.1, extra=""):
+        f = open(OPTS.openram_temp + "stim.sp", "w")
+        f.write("* Stimulus for load={0}fF\n".format(load))
+        f.write("Va a 0 PWL (0n 0v 1n 0v {0}n 1.0v )\n".format(1+slew))
+        f.write("C1 a 0 {0}f\n".format(load))
+        f.write(extra)
+        f.write(".meas tran delay0 TRIG v(a) VAL=0.5 RISE=1 TARG v(a) VAL=0.9 RISE=1\n")
+        f.write(".meas tran delay1 TRIG v(a) VAL=0.1 RISE=1 TARG v(a) VAL=0.9 RISE=1\n")
+        f.write(".TRAN 5p 2n UIC\n")
+        f.write(".end\n")
+        f.close()
+
+    def count(self, log, cmd):
+        f = open(log, "r")
+        cmds = [line.split()[0] for line in f if line.strip()]
+        f.close()
+        return cmds.count(cmd)
+
+# instantiate a copy of the class to actually run the test
+if __name__ == "__main__":
+    (OPTS, args) = globals.parse_args()
+    del sys.argv[1:]
+    header(__file__, OPTS.tech_name)
+    unittest.main()
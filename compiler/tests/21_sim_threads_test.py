@@ -0,0 +1,74 @@
+#!/usr/bin/env python2.7
+"""
+Check the split of the CPU cores between simulations and simulator threads
+"""
+
+import unittest
+from testutils import header,openram_test
+import sys,os
+sys.path.append(os.path.join(sys.path[0],".."))
+import globals
+from globals import OPTS
+import debug
+
+class sim_threads_test(openram_test):
+
+    def runTest(self):
+        globals.init_openram("config_20_{0}".format(OPTS.tech_name))
+        import characterizer
+        from characterizer import sim_pool,sim_backend,stimuli
+        from characterizer import charutils as ch
+
+        saved = (OPTS.spice_name, OPTS.spice_exe, OPTS.sim_backend, OPTS.use_sim_cache,
+                 OPTS.num_sim_jobs, OPTS.sim_threads)
+        saved_env = dict((name, os.environ.pop(name)) for name in sim_pool.scheduler_cpus
+                         if name in os.environ)
+
+        # The CPUs of a batch scheduler job are shared out
+        os.environ["SLURM_CPUS_PER_TASK"] = "8"
+        self.assertEqual(sim_pool.num_cpus(), 8)
+        for (jobs, threads, split) in [(0, 0, (4, 2)),
+                                       (0, 2, (4, 2)),
+                                       (2, 0, (2, 4)),
+                                       (3, 0, (3, 2)),
+                                       (16, 0, (16, 1)),
+                                       (2, 2, (2, 2))]:
+            (OPTS.num_sim_jobs, OPTS.sim_threads) = (jobs, threads)
+            self.assertEqual(sim_pool.split(), split)
+
+        # The simulators are started with the threads of each job
+        (OPTS.num_sim_jobs, OPTS.sim_threads) = (2, 0)
+        OPTS.spice_name = "hspice"
+        OPTS.spice_exe = "hspice"
+        (cmd, valid_retcode) = sim_backend.batch_backend().command("stim.sp", OPTS.openram_temp)
+        self.assertTrue(" -mt 4 " in cmd)
+
+        # ngspice takes its threads from the options of the deck, so the
+        # .spiceinit of the user still applies
+        OPTS.spice_name = "ngspice"
+        OPTS.spice_exe = "{0} {1}/spice_stub.py".format(sys.executable, os.path.dirname(os.path.abspath(__file__)))
+        OPTS.sim_backend = "batch"
+        OPTS.use_sim_cache = False
+        f = open(OPTS.openram_temp + "stim.sp", "w")
+        f.write("* Stimulus\n")
+        f.write("C1 a 0 5f\n")
+        f.write(".meas tran delay0 TRIG v(a) VAL=0.5 RISE=1 TARG v(a) VAL=0.9 RISE=1\n")
+        stimuli.write_control(f, 2)
+        f.close()
+        self.assertTrue(" num_threads=4\n" in open(OPTS.openram_temp + "stim.sp").read())
+        m = stimuli.run_sim()
+        self.isclose(ch.get_measurement(m, "delay0"), 5e-12)
+        self.assertFalse(os.path.isfile(OPTS.openram_temp + ".spiceinit"))
+
+        del os.environ["SLURM_CPUS_PER_TASK"]
+        os.environ.update(saved_env)
+        (OPTS.spice_name, OPTS.spice_exe, OPTS.sim_backend, OPTS.use_sim_cache,
+         OPTS.num_sim_jobs, OPTS.sim_threads) = saved
+        globals.end_openram()
+
+# instantiate a copy of the class to actually run the test
+if __name__ == "__main__":
+    (OPTS, args) = globals.parse_args()
+    del sys.argv[1:]
+    header(__file__, OPTS.tech_name)
+    unittest.main()
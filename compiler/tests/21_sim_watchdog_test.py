@@ -0,0 +1,86 @@
+#!/usr/bin/env python2.7
+"""
+Check the timeout and the retries of failed simulations
+"""
+
+import unittest
+from testutils import header,openram_test
+import sys,os,time,subprocess
+sys.path.append(os.path.join(sys.path[0],".."))
+import globals
+from globals import OPTS
+import debug
+
+class sim_watchdog_test(openram_test):
+
+    def runTest(self):
+        globals.init_openram("config_20_{0}".format(OPTS.tech_name))
+        import characterizer
+        from characterizer import stimuli,telemetry
+        from characterizer import charutils as ch
+
+        saved = (OPTS.spice_name, OPTS.spice_exe, OPTS.sim_backend, OPTS.use_sim_cache,
+                 OPTS.sim_timeout, OPTS.sim_retries)
+        OPTS.spice_name = "ngspice"
+        OPTS.spice_exe = "{0} {1}/spice_stub.py".format(sys.executable, os.path.dirname(os.path.abspath(__file__)))
+        OPTS.sim_backend = "batch"
+        OPTS.use_sim_cache = False
+
+        # A hung simulator is killed (with the processes it started) and
+        # the retry with the other integration method works
+        (OPTS.sim_timeout, OPTS.sim_retries) = (2, 1)
+        self.write_stim("* stub: hang unless method=trap\n")
+        start_time = time.time()
+        m = stimuli.run_sim()
+        self.assertTrue(time.time() - start_time < 30)
+        self.isclose(ch.get_measurement(m, "delay0"), 5e-12)
+        self.assertEqual(telemetry.get_records()[-1]["return_code"], 0)
+        self.assertNotEqual(subprocess.call("ps -eo args | grep -q '^sleep 613'", shell=True), 0)
+
+        # A retry after a timeout doesn't have smaller time steps
+        (OPTS.sim_timeout, OPTS.sim_retries) = (1, 2)
+        self.write_stim("* stub: hang unless reltol=0.01\n")
+        m = stimuli.run_sim()
+        self.isclose(ch.get_measurement(m, "delay0"), 5e-12)
+        tran = [l for l in open(OPTS.openram_temp + "stim_retry2.sp") if l.startswith(".TRAN")]
+        self.assertEqual(tran, [".TRAN 5e-12 2n UIC\n"])
+
+        # The later retries after failures have a looser tolerance and
+        # smaller time steps
+        (OPTS.sim_timeout, OPTS.sim_retries) = (0, 2)
+        self.write_stim("* stub: fail unless reltol=0.01\n")
+        m = stimuli.run_sim()
+        self.isclose(ch.get_measurement(m, "delay0"), 5e-12)
+        tran = [l for l in open(OPTS.openram_temp + "stim_retry2.sp") if l.startswith(".TRAN")]
+        self.assertEqual(tran, [".TRAN 2.5e-12 2n UIC\n"])
+
+        # A simulation that always fails has no measurements instead of
+        # stopping the characterization
+        self.write_stim("* stub: fail unless never\n")
+        m = stimuli.run_sim()
+        self.assertEqual(m, {})
+        self.assertEqual(ch.get_measurement(m, "delay0"), False)
+        record = telemetry.get_records()[-1]
+        self.assertEqual((record["return_code"], record["converged"]), (None, False))
+
+        (OPTS.spice_name, OPTS.spice_exe, OPTS.sim_backend, OPTS.use_sim_cache,
+         OPTS.sim_timeout, OPTS.sim_retries) = saved
+        globals.end_openram()
+
+    def write_stim(self, extra):
+        f = open(OPTS.openram_temp + "stim.sp", "w")
+        f.write("* Stimulus\n")
+        f.write(extra)
+        f.write("C1 a 0 5f\n")
+        f.write(".meas tran delay0 TRIG v(a) VAL=0.5 RISE=1 TARG v(a) VAL=0.9 RISE=1\n")
+        f.write(".TRAN 5p 2n UIC\n")
+        f.write(".OPTIONS POST=1 RUNLVL=4 PROBE method=gear\n")
+        f.write(".end\n")
+        f.close()
+
+# instantiate a copy of the class to actually run the test
+if __name__ == "__main__":
+    (OPTS, args) = globals.parse_args()
+    del sys.argv[1:]
+    header(__file__, OPTS.tech_name)
+    unittest.main()
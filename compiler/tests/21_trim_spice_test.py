@@ -0,0 +1,66 @@
+#!/usr/bin/env python2.7
+"""
+Check the trimming of the bitcells and column cells of a netlist
+"""
+
+import unittest
+from testutils import header,openram_test
+import sys,os
+sys.path.append(os.path.join(sys.path[0],".."))
+import globals
+from globals import OPTS
+import debug
+
+class trim_spice_test(openram_test):
+
+    def runTest(self):
+        globals.init_openram("config_20_{0}".format(OPTS.tech_name))
+        from characterizer import trim_spice
+
+        # A 4 row, 4 column array with 2 words per row
+        spfile = OPTS.openram_temp + "array.sp"
+        sp = open(spfile, "w")
+        sp.write(".SUBCKT bitcell_array bl[0] br[0] bl[1] br[1] bl[2] br[2] bl[3] br[3]\n")
+        for row in range(4):
+            for col in range(4):
+                sp.write("Xbit_r{0}_c{1} bl[{1}] br[{1}] wl[{0}] vdd gnd cell_6t\n".format(row, col))
+        sp.write(".ENDS bitcell_array\n\n")
+        sp.write(".SUBCKT precharge_array bl[0] br[0] bl[1] br[1] bl[2] br[2] bl[3] br[3]\n")
+        for col in range(4):
+            sp.write("Xpre{0} bl[{0}] br[{0}] en vdd precharge\n".format(col))
+        sp.write(".ENDS precharge_array\n\n")
+        sp.write(".SUBCKT write_driver_array data[0] data[1]\n")
+        for bit in range(2):
+            sp.write("Xwrite_driver{0} data[{0}] bl[{1}] br[{1}] en vdd gnd write_driver\n".format(bit, 2*bit))
+        sp.write(".ENDS write_driver_array\n")
+        sp.close()
+
+        reduced = OPTS.openram_temp + "reduced.sp"
+        trimsp = trim_spice.trim_spice(spfile, reduced)
+        trimsp.set_configuration(1, 4, 4, 2)
+
+        # Address 101 is row 1 and data bit 1 is on bl[2]
+        trimsp.trim("101", 1)
+        lines = open(reduced).read().splitlines()
+        bitcells = [l.split()[0] for l in lines if l.startswith("Xbit")]
+        self.assertEqual(bitcells, ["Xbit_r0_c2", "Xbit_r1_c0", "Xbit_r1_c1", "Xbit_r1_c2",
+                                    "Xbit_r1_c3", "Xbit_r2_c2", "Xbit_r3_c2"])
+        self.assertEqual([l.split()[0] for l in lines if l.startswith("Xpre")], ["Xpre2"])
+        self.assertEqual([l.split()[0] for l in lines if l.startswith("Xwrite")], ["Xwrite_driver1"])
+        self.assertEqual(len([l for l in lines if l.startswith(".ENDS")]), 3)
+
+        # Another probe starts from the original netlist
+        trimsp.trim("000", 0)
+        lines = open(reduced).read().splitlines()
+        self.assertEqual(len([l for l in lines if l.startswith("* WARNING")]), 1)
+        self.assertEqual([l.split()[0] for l in lines if l.startswith("Xpre")], ["Xpre0"])
+        self.assertEqual(len([l for l in lines if l.startswith("Xbit")]), 7)
+
+        globals.end_openram()
+
+# instantiate a copy of the class to actually run the test
+if __name__ == "__main__":
+    (OPTS, args) = globals.parse_args()
+    del sys.argv[1:]
+    header(__file__, OPTS.tech_name)
+    unittest.main()
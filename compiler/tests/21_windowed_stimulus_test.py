@@ -0,0 +1,93 @@
+#!/usr/bin/env python2.7
+"""
+Check that the delay stimulus only simulates the cycles and time windows
+of its measurements
+"""
+
+import unittest
+from testutils import header,openram_test
+import sys,os,re
+sys.path.append(os.path.join(sys.path[0],".."))
+import globals
+from globals import OPTS
+import debug
+
+class windowed_stimulus_test(openram_test):
+
+    def runTest(self):
+        globals.init_openram("config_20_{0}".format(OPTS.tech_name))
+        OPTS.check_lvsdrc = False
+        saved = OPTS.spice_name
+
+        import sram
+        import tech
+        from characterizer import delay
+
+        debug.info(1, "Stimulus of sample 2 bit, 16 words SRAM with 1 bank")
+        s = sram.sram(word_size=2,
+                      num_words=OPTS.num_words,
+                      num_banks=OPTS.num_banks,
+                      name="sram_2_16_1_{0}".format(OPTS.tech_name))
+        OPTS.check_lvsdrc = True
+
+        tempspice = OPTS.openram_temp + "temp.sp"
+        s.sp_write(tempspice)
+        d = delay.delay(s, tempspice)
+        d.set_probe("1"*s.addr_size, s.word_size-1)
+        period = tech.spice["feasible_period"]
+        load = tech.spice["FF_in_cap"]
+        slew = tech.spice["rise_time"]
+        stim_name = OPTS.openram_temp + "stim.sp"
+
+        def tran_card():
+            stim = open(stim_name).read()
+            return (stim, re.search(r"^\.TRAN (.*) UIC$", stim, re.MULTILINE).group(1).split())
+
+        # The power is measured in all the cycles
+        OPTS.spice_name = "ngspice"
+        d.write_stimulus(period, load, slew)
+        (stim, tran) = tran_card()
+        self.assertEqual(len(re.findall(r"^\.meas tran \w+_POWER", stim, re.MULTILINE)), 4)
+        self.assertEqual(len(d.cycle_times), 10)
+        # It stops at the end of the idle cycle after the last read, so a
+        # delay and a slew of a period each are still measured
+        self.assertEqual(tran, ["5p", "{0}n".format(d.cycle_times[d.read1_cycle] + 2*period)])
+        self.assertEqual(tran, ["5p", "{0}n".format(10*period)])
+
+        # The delays don't need the cycle that initializes the cell
+        d.write_stimulus(period, load, slew, measure_power=False)
+        (stim, tran) = tran_card()
+        self.assertEqual(len(re.findall(r"^\.meas tran \w+_POWER", stim, re.MULTILINE)), 0)
+        self.assertEqual(len(d.cycle_times), 9)
+        self.assertEqual(tran, ["5p", "{0}n".format(9*period)])
+        # Each read window fits a delay of a period after the negative
+        # edge and a slew of a period
+        for (cycle, (start, end)) in zip([d.read0_cycle, d.read1_cycle], d.measure_windows(period)):
+            self.assertEqual(start, d.cycle_times[cycle] + 0.5*period)
+            self.assertTrue(end - start >= 1.5*period)
+
+        # hspice simulates outside the read windows with the coarse step
+        OPTS.spice_name = "hspice"
+        d.write_stimulus(period, load, slew, measure_power=False)
+        (stim, tran) = tran_card()
+        steps = ["{0}p".format(OPTS.coarse_time_step), "5p"] * 2
+        self.assertEqual(tran[0::2], steps)
+        self.assertEqual(float(tran[-1].rstrip("n")), 9*period)
+
+        # The windows can be turned off
+        OPTS.windowed_transient = False
+        d.write_stimulus(period, load, slew, measure_power=False)
+        (stim, tran) = tran_card()
+        self.assertEqual(len(d.cycle_times), 10)
+        self.assertEqual(tran, ["5p", "{0}n".format(10*period)])
+
+        OPTS.windowed_transient = True
+        OPTS.spice_name = saved
+        globals.end_openram()
+
+# instantiate a copy of the class to actually run the test
+if __name__ == "__main__":
+    (OPTS, args) = globals.parse_args()
+    del sys.argv[1:]
+    header(__file__, OPTS.tech_name)
+    unittest.main()
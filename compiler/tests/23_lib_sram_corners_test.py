@@ -0,0 +1,85 @@
+#!/usr/bin/env python2.7
+"""
+Check the .lib files and simulation records of several corners of an SRAM
+on the mock simulator
+"""
+
+import unittest
+from testutils import header,openram_test
+import sys,os,re,json
+sys.path.append(os.path.join(sys.path[0],".."))
+import globals
+from globals import OPTS
+import debug
+
+class lib_corners_test(openram_test):
+
+    def runTest(self):
+        globals.init_openram("config_20_{0}".format(OPTS.tech_name))
+        OPTS.check_lvsdrc = False
+        OPTS.analytical_delay = False
+        saved = (OPTS.spice_name, OPTS.sim_backend, OPTS.use_sim_cache, OPTS.corners)
+        OPTS.spice_name = "ngspice"
+        OPTS.sim_backend = "mock"
+        OPTS.use_sim_cache = False
+
+        # This is a hack to reload the characterizer __init__ with the backend
+        import characterizer
+        reload(characterizer)
+        from characterizer import lib,mock_sim
+        import sram
+        import tech
+
+        vdd = tech.spice["supply_voltage"]
+        OPTS.corners = [("TT", 0.9*vdd, 125), ("TT", vdd, -40)]
+
+        debug.info(1, "Testing the corners of sample 2 bit, 16 words SRAM with 1 bank")
+        s = sram.sram(word_size=2,
+                      num_words=OPTS.num_words,
+                      num_banks=OPTS.num_banks,
+                      name="sram_2_16_1_{0}".format(OPTS.tech_name))
+
+        tempspice = OPTS.openram_temp + "temp.sp"
+        s.sp_write(tempspice)
+        mock_sim.register_model(OPTS.openram_temp + "reduced.sp", mock_sim.analytical_model(s))
+
+        libnames = lib.write_libs(OPTS.openram_temp + s.name, s, tempspice, use_model=False)
+        self.assertEqual(len(libnames), len(OPTS.corners))
+        for (libname, (process, voltage, temperature)) in zip(libnames, OPTS.corners):
+            name = re.search(r"_([^_]+_[^_]+_[^_]+)\.lib$", libname).group(1)
+            self.assertTrue(name.startswith(process))
+            contents = open(libname).read()
+            self.assertTrue("operating_conditions({0})".format(name) in contents)
+            self.assertTrue("voltage : {0} ;".format(voltage) in contents)
+            self.assertTrue("temperature : {0:.3f} ;".format(temperature) in contents)
+            # The stimuli of the corner are in its own directory
+            stim = open(OPTS.openram_temp + name + "/stim.sp").read()
+            self.assertTrue(".TEMP {0}\n".format(temperature) in stim)
+            self.assertTrue("Vvdd vdd 0.0 {0}\n".format(voltage) in stim)
+            # The simulations of the corner are recorded next to its .lib
+            report = json.load(open(libname.replace(".lib", ".sim.json")))
+            self.assertEqual(report["corner"], name)
+            purposes = set(sim["purpose"] for sim in report["simulations"])
+            self.assertTrue(set(["feasible_period", "min_period", "delay_table", "setup", "hold"]) <= purposes)
+            self.assertEqual(report["summary"]["delay_table"]["count"],
+                             len(OPTS.slew_scales) * len(OPTS.load_scales))
+            # A period that is too short has missing delays but it
+            # still converged
+            for sim in report["simulations"]:
+                self.assertEqual(sim["corner"], name)
+                self.assertEqual(sim["return_code"], 0)
+                self.assertTrue(sim["converged"])
+                self.assertTrue(sim["wall_time"] >= 0)
+
+        (OPTS.spice_name, OPTS.sim_backend, OPTS.use_sim_cache, OPTS.corners) = saved
+        OPTS.check_lvsdrc = True
+        OPTS.analytical_delay = True
+        reload(characterizer)
+        globals.end_openram()
+
+# instantiate a copy of the class to actually run the test
+if __name__ == "__main__":
+    (OPTS, args) = globals.parse_args()
+    del sys.argv[1:]
+    header(__file__, OPTS.tech_name)
+    unittest.main()
@@ -0,0 +1,77 @@
+#!/usr/bin/env python2.7
+"""
+Check the worst case .lib of several probes of an SRAM on the mock simulator
+"""
+
+import unittest
+from testutils import header,openram_test
+import sys,os
+sys.path.append(os.path.join(sys.path[0],".."))
+import globals
+from globals import OPTS
+import debug
+
+class lib_probes_test(openram_test):
+
+    def runTest(self):
+        globals.init_openram("config_20_{0}".format(OPTS.tech_name))
+        OPTS.check_lvsdrc = False
+        OPTS.analytical_delay = False
+        saved = (OPTS.spice_name, OPTS.sim_backend, OPTS.use_sim_cache, OPTS.worst_case_probes)
+        OPTS.spice_name = "ngspice"
+        OPTS.sim_backend = "mock"
+        OPTS.use_sim_cache = False
+        OPTS.worst_case_probes = True
+
+        # This is a hack to reload the characterizer __init__ with the backend
+        import characterizer
+        reload(characterizer)
+        from characterizer import lib,delay,mock_sim
+        import sram
+
+        debug.info(1, "Testing the probes of sample 2 bit, 16 words SRAM with 1 bank")
+        s = sram.sram(word_size=2,
+                      num_words=OPTS.num_words,
+                      num_banks=OPTS.num_banks,
+                      name="sram_2_16_1_{0}".format(OPTS.tech_name))
+
+        tempspice = OPTS.openram_temp + "temp.sp"
+        s.sp_write(tempspice)
+
+        # The far and near corners (the bank and column mux probes of a
+        # single bank without a column mux are the far corner)
+        probes = lib.get_probes(s)
+        self.assertEqual(probes, [("1"*s.addr_size, s.word_size-1), ("0"*s.addr_size, 0)])
+
+        # The near corner is made slower to be the worst case
+        model = mock_sim.analytical_model(s)
+        mock_sim.register_model(OPTS.openram_temp + "reduced.sp", model)
+        mock_sim.register_model(OPTS.openram_temp + "reduced_probe1.sp",
+                                lambda slew, load: tuple(2*x for x in model(slew, load)))
+
+        l = lib.lib(OPTS.openram_temp + s.name + ".lib", s, tempspice, use_model=False)
+        self.assertEqual([netlist for (address, data_bit, netlist) in l.netlists],
+                         [OPTS.openram_temp + "reduced.sp", OPTS.openram_temp + "reduced_probe1.sp"])
+        for index in range(len(probes)):
+            self.assertTrue(os.path.isfile(OPTS.openram_temp + "probe{0}/stim.sp".format(index)))
+
+        # The .lib has the worst case of the probes
+        results = [l.analyze_probe(index, probe) for (index, probe) in enumerate(l.netlists)]
+        self.assertEqual(l.delay, delay.worst_case(results))
+        for key in ["delay1", "delay0", "slew1", "slew0"]:
+            self.assertEqual(l.delay[key], results[1][key])
+            for (far, near) in zip(results[0][key], results[1][key]):
+                self.assertTrue(near > far)
+
+        (OPTS.spice_name, OPTS.sim_backend, OPTS.use_sim_cache, OPTS.worst_case_probes) = saved
+        OPTS.check_lvsdrc = True
+        OPTS.analytical_delay = True
+        reload(characterizer)
+        globals.end_openram()
+
+# instantiate a copy of the class to actually run the test
+if __name__ == "__main__":
+    (OPTS, args) = globals.parse_args()
+    del sys.argv[1:]
+    header(__file__, OPTS.tech_name)
+    unittest.main()
@@ -0,0 +1,173 @@
+#!/usr/bin/env python2.7
+"""
+A scripted stand-in for ngspice so that the simulator backends can be
+tested without a simulator. It runs a stimulus in batch mode (-b -o) or
+reads commands from its input in pipe mode (-p) like ngspice does.
+Every measurement is the total capacitance of the circuit times 1000,
+so altering a capacitor changes the results. Each command is appended
+to the file named by SPICE_STUB_LOG, if it is set. A stimulus with a
+"* stub: hang unless <text>" or "* stub: fail unless <text>" comment
+hangs or fails in batch mode unless it contains the text. In batch mode
+with -r, the waveforms of the .save nodes that are driven by sources are
+written to a binary .raw file and each source supplies a constant 1mA.
+"""
+
+import os
+import re
+import sys
+import struct
+import subprocess
+
+scale_factors = {"meg": 1e6, "t": 1e12, "g": 1e9, "k": 1e3, "m": 1e-3,
+                 "u": 1e-6, "n": 1e-9, "p": 1e-12, "f": 1e-15, "a": 1e-18}
+
+def to_float(value):
+    m = re.match(r"^([-+]?[\d.]+(?:e[-+]?\d+)?)(meg|[tgkmunpfa])?", value.lower())
+    scale = scale_factors.get(m.group(2), 1.0)
+    return float(m.group(1)) * scale
+
+
+class stub():
+
+    def __init__(self):
+        # the values of the elements by name
+        self.elements = None
+        self.log = os.environ.get("SPICE_STUB_LOG")
+
+    def write_log(self, cmd):
+        if self.log:
+            f = open(self.log, "a")
+            f.write(cmd + "\n")
+            f.close()
+
+    def source(self, filename):
+        """ Loads a circuit. The first line is the title. """
+        self.elements = {}
+        lines = open(filename).read().splitlines()[1:]
+        for line in lines:
+            words = line.split(None, 3)
+            if len(words) == 4 and words[0][0].lower() in "cv":
+                self.elements[words[0].lower()] = words[3]
+        return [".meas" + line.strip()[5:] for line in lines if line.strip().lower().startswith(".meas")]
+
+    def measure(self, cmd):
+        """ Returns the result line of a measurement command. """
+        name = cmd.split()[2]
+        if self.elements == None:
+            return "Error: no circuit loaded"
+        total = sum(to_float(value) for (element, value) in self.elements.items()
+                    if element.startswith("c"))
+        return "{0:<20}=  {1:e}".format(name, total * 1e3)
+
+    def alter(self, cmd):
+        m = re.match(r"^alter\s+(\S+)\s*(\w*)\s*=\s*(.*)$", cmd)
+        name = m.group(1).lower()
+        if self.elements == None or name not in self.elements:
+            return "Error: no such device {0}".format(name)
+        if m.group(2) == "" or m.group(2) == "dc":
+            self.elements[name] = m.group(3)
+        else:
+            self.elements[name] = "{0} ({1})".format(m.group(2), m.group(3).strip("[] "))
+        return None
+
+    def command(self, cmd):
+        """ Runs an interactive command and returns its output lines. """
+        self.write_log(cmd)
+        words = cmd.split()
+        if len(words) == 0:
+            return []
+        if words[0] == "echo":
+            return [" ".join(words[1:])]
+        if words[0] == "source":
+            self.source(words[1])
+            return ["Circuit: stub"]
+        if words[0] == "remcirc":
+            self.elements = None
+            return []
+        if words[0] == "alter":
+            return [x for x in [self.alter(cmd)] if x]
+        if words[0] == "meas":
+            return [self.measure(cmd)]
+        if words[0] == "tran":
+            return ["Doing analysis at TEMP = 27.000000"]
+        return []
+
+    def write_raw(self, stim, filename):
+        """ Writes the piecewise linear waveforms of the saved nodes. """
+        sources = {}
+        saved = []
+        end_time = 0.0
+        for line in open(stim).read().splitlines()[1:]:
+            words = line.replace("(", " ").replace(")", " ").split()
+            if len(words) == 0:
+                continue
+            if words[0].lower() == ".save":
+                saved.extend(w.lower() for w in line.split()[1:])
+            elif words[0].lower() == ".tran":
+                end_time = to_float(words[2])
+            elif words[0][0].lower() == "v" and len(words) > 3:
+                if words[3].lower() == "pwl":
+                    values = [to_float(w) for w in words[4:]]
+                    sources[words[1].lower()] = (words[0].lower(), zip(values[0::2], values[1::2]))
+                else:
+                    sources[words[1].lower()] = (words[0].lower(), [(0.0, to_float(words[-1]))])
+        times = sorted(set([0.0, end_time] + [t for (name, points) in sources.values() for (t, v) in points]))
+        times = [t for t in times if t <= end_time]
+
+        def value(points, t):
+            if t <= points[0][0]:
+                return points[0][1]
+            for ((t0, v0), (t1, v1)) in zip(points[:-1], points[1:]):
+                if t <= t1:
+                    return v0 + (v1 - v0) * (t - t0) / (t1 - t0)
+            return points[-1][1]
+
+        vectors = []
+        for name in saved:
+            m = re.match(r"^([vi])\((.*)\)$", name)
+            if m.group(1) == "v" and m.group(2) in sources:
+                vectors.append((name, "voltage", [value(sources[m.group(2)][1], t) for t in times]))
+            elif m.group(1) == "i":
+                vectors.append((m.group(2) + "#branch", "current", [-1e-3 for t in times]))
+        f = open(filename, "wb")
+        f.write("Title: stub\nPlotname: Transient Analysis\nFlags: real\n")
+        f.write("No. Variables: {0}\nNo. Points: {1}\nVariables:\n".format(len(vectors) + 1, len(times)))
+        f.write("\t0\ttime\ttime\n")
+        for (i, (name, kind, values)) in enumerate(vectors):
+            f.write("\t{0}\t{1}\t{2}\n".format(i + 1, name, kind))
+        f.write("Binary:\n")
+        for (i, t) in enumerate(times):
+            f.write(struct.pack("<{0}d".format(len(vectors) + 1), t, *[values[i] for (name, kind, values) in vectors]))
+        f.close()
+
+    def batch(self, stim, output, raw=None):
+        text = open(stim).read()
+        m = re.search(r"^\* stub: (hang|fail) unless (\S+)", text, re.MULTILINE)
+        if m and m.group(2) not in text.replace(m.group(0), ""):
+            if m.group(1) == "hang":
+                subprocess.call(["sleep", "613"])
+            sys.exit(2)
+        if raw:
+            self.write_raw(stim, raw)
+        measures = self.source(stim)
+        f = open(output, "w")
+        for meas in measures:
+            f.write(self.measure(meas[1:]) + "\n")
+        f.close()
+
+    def pipe(self):
+        while True:
+            line = sys.stdin.readline()
+            if line == "" or line.strip() == "quit":
+                break
+            for out in self.command(line.strip()):
+                sys.stdout.write(out + "\n")
+            sys.stdout.flush()
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    if "-p" in args:
+        stub().pipe()
+    else:
+        stub().batch(args[-1], args[args.index("-o") + 1], args[args.index("-r") + 1] if "-r" in args else None)
@@ -1,13 +1,48 @@
 import os
+import re
 import gdsMill
 import tech
 import math
 import globals
+import debug
 from vector import vector
 from pin_layout import pin_layout
 
 OPTS = globals.OPTS
 
+# A number with an optional exponent and an optional unit suffix
+number_re = re.compile(r"^([-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?)([a-zA-Z]*)$")
+# The spice scale factors (meg must be checked before m)
+scale_factors = [("meg", 1e6),
+                 ("t", 1e12),
+                 ("g", 1e9),
+                 ("k", 1e3),
+                 ("m", 1e-3),
+                 ("u", 1e-6),
+                 ("n", 1e-9),
+                 ("p", 1e-12),
+                 ("f", 1e-15),
+                 ("a", 1e-18)]
+
+def spice_number(value):
+    """
+    Returns the value of a spice number with a scale factor such as
+    135.00n or a quoted product of them such as '5.4*1u'. Any letters
+    after the scale factor (e.g. a unit) are ignored.
+    """
+    result = 1.0
+    for factor in value.strip().strip("'\"").split("*"):
+        number = number_re.match(factor.strip())
+        if number == None:
+            debug.error("Invalid spice number: {0}".format(value),1)
+        result *= float(number.group(1))
+        suffix = number.group(2).lower()
+        for (scale_factor, scale) in scale_factors:
+            if suffix.startswith(scale_factor):
+                result *= scale
+                break
+    return result
+
 def ceil(decimal):
     """
     Performs a ceiling function on the decimal place specified by the DRC grid.
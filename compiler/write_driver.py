@@ -23,3 +23,10 @@ class write_driver(design.design):
         self.height = write_driver.height
         self.pin_map = write_driver.pin_map
 
+    def analytical_delay(self, slew, load=0.0):
+        """ return the delay of driving a bitline (load) all the way to
+        the other rail, which a write needs to flip the cell. """
+        from tech import spice
+        r = spice["min_tx_r"]
+        c_para = spice["min_tx_drain_c"]
+        return self.cal_delay_with_rc(r = r, c =  c_para+load, slew = slew, swing = 0.9)
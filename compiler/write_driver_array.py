@@ -101,5 +101,6 @@ class write_driver_array(design.design):
                             offset=self.driver_insts[0].get_pin("gnd").ll().scale(0,1),
                             width=self.width,
                             height=drc['minwidth_metal1'])
-                       
 
+    def analytical_delay(self, slew, load=0.0):
+        return self.driver.analytical_delay(slew=slew, load=load)
@@ -240,6 +240,17 @@ spice["pmos"] = "pmos_vtg"
 SPICE_MODEL_DIR=os.environ.get("SPICE_MODEL_DIR")
 spice["fet_models"] = [SPICE_MODEL_DIR+"/NMOS_VTG.inc",
                        SPICE_MODEL_DIR+"/PMOS_VTG.inc"]
+# The models of each process corner (the other corners of the kit are
+# next to the nominal models)
+spice["process_models"] = {"TT": spice["fet_models"],
+                           "FF": [SPICE_MODEL_DIR+"/../models_ff/NMOS_VTG.inc",
+                                  SPICE_MODEL_DIR+"/../models_ff/PMOS_VTG.inc"],
+                           "SS": [SPICE_MODEL_DIR+"/../models_ss/NMOS_VTG.inc",
+                                  SPICE_MODEL_DIR+"/../models_ss/PMOS_VTG.inc"],
+                           "FS": [SPICE_MODEL_DIR+"/../models_fs/NMOS_VTG.inc",
+                                  SPICE_MODEL_DIR+"/../models_fs/PMOS_VTG.inc"],
+                           "SF": [SPICE_MODEL_DIR+"/../models_sf/NMOS_VTG.inc",
+                                  SPICE_MODEL_DIR+"/../models_sf/PMOS_VTG.inc"]}
 
 #spice stimulus related variables
 spice["feasible_period"] = 5 # estimated feasible period in ns
@@ -280,6 +291,9 @@ spice["msflop_setup"] = 9        # DFF setup time in ps
 spice["msflop_hold"] = 1         # DFF hold time in ps
 spice["msflop_delay"] = 20.5     # DFF Clk-to-q delay in ps
 spice["msflop_slew"] = 13.1      # DFF output slew in ps w/ no load
+spice["nmos_leakage"] = 100.0    # Off nmos leakage current in nA per um of width
+spice["pmos_leakage"] = 50.0     # Off pmos leakage current in nA per um of width
+spice["periphery_switched_c"] = 1.1 # Capacitance that a cycle switches per um of periphery width in ff (fit to the energy of a cycle of the simulated 2x16 SRAM)
 
 
 ###################################################
@@ -196,6 +196,8 @@ spice={}
 spice["nmos"]="n"
 spice["pmos"]="p"
 spice["fet_models"] = [os.environ.get("SPICE_MODEL_DIR")+"/on_c5n.sp"]
+# The models of each process corner (only typical models are available)
+spice["process_models"] = {"TT": spice["fet_models"]}
 
 #spice stimulus related variables
 spice["feasible_period"] = 5         # estimated feasible period in ns
@@ -237,6 +239,9 @@ spice["msflop_setup"] = 9        # DFF setup time in ps
 spice["msflop_hold"] = 1         # DFF hold time in ps
 spice["msflop_delay"] = 20.5     # DFF Clk-to-q delay in ps
 spice["msflop_slew"] = 13.1      # DFF output slew in ps w/ no load
+spice["nmos_leakage"] = 0.001    # Off nmos leakage current in nA per um of width
+spice["pmos_leakage"] = 0.0005   # Off pmos leakage current in nA per um of width
+spice["periphery_switched_c"] = 0.65 # Capacitance that a cycle switches per um of periphery width in ff (fit to the energy of a cycle of the simulated 2x16 SRAM)
 
 
 ###################################################